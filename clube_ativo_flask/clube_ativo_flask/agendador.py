@@ -0,0 +1,269 @@
+import os
+import json
+import time
+import uuid
+import threading
+import click
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone, timedelta
+from flask import current_app
+from sqlalchemy import select, update, delete, or_
+from nucleo import bp, db, configuracao, extensao, dialeto_dml, escrever
+from modelos import Tarefa
+
+# --- TAREFAS EM SEGUNDO PLANO (AGENDADOR) ---
+# Tarefas recorrentes (cron de 5 campos, JOBS_AGENDA) ou únicas (adiar()) na tabela tarefa. Cada processo
+# reserva as vencidas com um lease (dono + travada_ate), então só um worker executa cada uma; falhas voltam
+# com backoff. JOBS_ENABLED=false deixa a execução para 'flask jobs-worker' ou 'flask jobs-run'.
+@configuracao
+def configurar_tarefas(app):
+    app.config.setdefault('JOBS_ENABLED', os.getenv('JOBS_ENABLED', 'true').lower() in ['true', '1', 't'])
+    app.config.setdefault('JOBS_WORKERS', int(os.getenv('JOBS_WORKERS', 2)))
+    app.config.setdefault('JOBS_POLL_S', float(os.getenv('JOBS_POLL_S', 5)))
+    app.config.setdefault('JOBS_LEASE_S', int(os.getenv('JOBS_LEASE_S', 300)))
+    app.config.setdefault('JOBS_MAX_TENTATIVAS', 5)
+    app.config.setdefault('JOBS_BACKOFF', 30.0)
+    app.config.setdefault('JOBS_RETENCAO_DIAS', 7)
+    app.config.setdefault('JOBS_AGENDA', dict(AGENDA_PADRAO))  # nome -> cron; None desliga a tarefa
+    app.config.setdefault('MEDIA_ORFA_CARENCIA_H', 24)
+AGENDA_PADRAO = {
+    'recontar-contadores': '30 3 * * *',
+    'recalcular-selos': '45 3 * * *',
+    'limpar-midia-orfa': '15 4 * * *',
+    'expirar-eventos': '*/10 * * * *',
+    'analisar-banco': '0 5 * * *',
+    'vacuum-banco': '30 5 * * 0',
+    'limpar-tarefas': '0 6 * * *',
+}
+CRON_ATALHOS = {'@hourly': '0 * * * *', '@daily': '0 0 * * *', '@weekly': '0 0 * * 0', '@monthly': '0 0 1 * *'}
+CRON_LIMITES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+TAREFAS = {}
+
+class CronInvalido(ValueError):
+    pass
+
+def tarefa(nome):
+    def decorator(f):
+        TAREFAS[nome] = f
+        return f
+    return decorator
+
+def ler_cron(expressao):
+    """[minutos, horas, dias, meses, dias da semana (0 = domingo)] como conjuntos; aceita *, a-b, a,b e /passo."""
+    campos = CRON_ATALHOS.get(expressao.strip(), expressao).split()
+    if len(campos) != 5: raise CronInvalido(f'{expressao!r}: são 5 campos (minuto hora dia mês dia-da-semana).')
+    conjuntos = []
+    for campo, (menor, maior) in zip(campos, CRON_LIMITES):
+        valores = set()
+        for parte in campo.split(','):
+            faixa, _, passo = parte.partition('/')
+            try:
+                if faixa == '*': inicio, fim = menor, maior
+                elif '-' in faixa: inicio, fim = map(int, faixa.split('-', 1))
+                else: inicio = fim = int(faixa)
+                if passo and faixa != '*' and '-' not in faixa: fim = maior
+                passo = int(passo or 1)
+            except ValueError: raise CronInvalido(f'{expressao!r}: campo {campo!r} inválido.') from None
+            if not menor <= inicio <= fim <= maior or passo < 1: raise CronInvalido(f'{expressao!r}: campo {campo!r} fora de {menor}-{maior}.')
+            valores.update(range(inicio, fim + 1, passo))
+        conjuntos.append(valores)
+    if 7 in conjuntos[4]: conjuntos[4] = (conjuntos[4] - {7}) | {0}
+    return conjuntos
+
+def proxima_cron(expressao, depois=None):
+    """Primeiro minuto (em UTC) depois de 'depois' que casa com a expressão, avaliada na hora local."""
+    minutos, horas, dias, meses, semana = ler_cron(expressao)
+    # Como no cron: se dia do mês e dia da semana forem ambos restritos, basta casar um deles.
+    ou = len(dias) < 31 and len(semana) < 7
+    momento = (depois or datetime.now(timezone.utc)).astimezone().replace(tzinfo=None, second=0, microsecond=0) + timedelta(minutes=1)
+    limite = momento + timedelta(days=366 * 8)
+    while momento < limite:
+        if momento.month not in meses:
+            momento = (momento.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            continue
+        casa_dia, casa_semana = momento.day in dias, (momento.weekday() + 1) % 7 in semana
+        if not ((casa_dia or casa_semana) if ou else (casa_dia and casa_semana)):
+            momento = momento.replace(hour=0, minute=0) + timedelta(days=1)
+        elif momento.hour not in horas: momento = momento.replace(minute=0) + timedelta(hours=1)
+        elif momento.minute not in minutos: momento += timedelta(minutes=1)
+        else: return momento.astimezone(timezone.utc)
+    raise CronInvalido(f'{expressao!r} nunca acontece.')
+
+def inserir_tarefa(conn, valores):
+    return conn.execute(dialeto_dml(conn).insert(Tarefa.__table__).values(**valores).on_conflict_do_nothing()).rowcount
+
+def adiar(nome, quando=None, chave=None, **args):
+    """Agenda uma execução única de nome(**args) para quando (datetime ou segundos; padrão: agora).
+    Com chave, não cria outra enquanto uma pendente com a mesma chave existir."""
+    if nome not in TAREFAS: raise KeyError(f'Tarefa desconhecida: {nome}')
+    agora = datetime.now(timezone.utc)
+    if quando is None or isinstance(quando, (int, float)): quando = agora + timedelta(seconds=quando or 0)
+    escrever(inserir_tarefa, {'nome': nome, 'args': json.dumps(args), 'chave': chave, 'proxima_execucao': quando, 'tentativas': 0})
+    if current_app.config['JOBS_ENABLED']: agendador().acordar.set()
+
+def sincronizar_agenda():
+    """Cria, atualiza e remove as linhas das tarefas recorrentes conforme JOBS_AGENDA (pode rodar em vários processos)."""
+    agenda = {nome: cron for nome, cron in current_app.config['JOBS_AGENDA'].items() if cron}
+    for nome, cron in agenda.items():
+        if nome not in TAREFAS: raise KeyError(f'Tarefa desconhecida em JOBS_AGENDA: {nome}')
+        ler_cron(cron)
+    tc = Tarefa.__table__.c
+    with db.engine.begin() as conn:
+        atuais = dict(conn.execute(select(tc.nome, tc.cron).where(tc.cron.is_not(None))).all())
+        for nome, cron in agenda.items():
+            if atuais.get(nome) == cron: continue
+            if nome in atuais: conn.execute(update(Tarefa.__table__).where(tc.chave == f'cron:{nome}').values(cron=cron, proxima_execucao=proxima_cron(cron)))
+            else: inserir_tarefa(conn, {'nome': nome, 'chave': f'cron:{nome}', 'cron': cron, 'args': '{}', 'proxima_execucao': proxima_cron(cron), 'tentativas': 0})
+        removidas = [nome for nome in atuais if nome not in agenda]
+        if removidas: conn.execute(delete(Tarefa.__table__).where(tc.cron.is_not(None), tc.nome.in_(removidas)))
+
+def reservar_tarefas(dono, limite, nomes=None):
+    """Pega o lease de até 'limite' tarefas vencidas e livres; retorna os ids que este dono conseguiu."""
+    if limite <= 0: return []
+    tc, agora = Tarefa.__table__.c, datetime.now(timezone.utc)
+    livre = or_(tc.travada_ate.is_(None), tc.travada_ate < agora)
+    with db.engine.begin() as conn:
+        candidatas = conn.execute(select(tc.id).where(tc.concluida_em.is_(None), tc.proxima_execucao <= agora, livre, *([tc.nome.in_(nomes)] if nomes else []))
+                                  .order_by(tc.proxima_execucao).limit(limite)).scalars().all()
+    reservadas = []
+    for tarefa_id in candidatas:
+        # Outro processo pode ter reservado entre o SELECT e aqui: o UPDATE só pega se ainda estiver livre.
+        with db.engine.begin() as conn:
+            if conn.execute(update(Tarefa.__table__).where(tc.id == tarefa_id, tc.concluida_em.is_(None), livre)
+                            .values(dono=dono, travada_ate=agora + timedelta(seconds=current_app.config['JOBS_LEASE_S']),
+                                    tentativas=tc.tentativas + 1)).rowcount:
+                reservadas.append(tarefa_id)
+    return reservadas
+
+def renovar_leases(dono, ids):
+    tc = Tarefa.__table__.c
+    with db.engine.begin() as conn:
+        conn.execute(update(Tarefa.__table__).where(tc.id.in_(ids), tc.dono == dono)
+                     .values(travada_ate=datetime.now(timezone.utc) + timedelta(seconds=current_app.config['JOBS_LEASE_S'])))
+
+def executar_tarefa(tarefa_id, dono):
+    """Roda uma tarefa reservada por dono e a devolve à fila (recorrente), conclui ou reagenda; retorna (nome, erro)."""
+    tc = Tarefa.__table__.c
+    with db.engine.connect() as conn: linha = conn.execute(select(Tarefa.__table__).where(tc.id == tarefa_id)).first()
+    inicio, erro = time.perf_counter(), None
+    try:
+        TAREFAS[linha.nome](**json.loads(linha.args))
+    except Exception as excecao:
+        db.session.rollback()
+        current_app.logger.exception('Tarefa %s (%d) falhou na tentativa %d', linha.nome, tarefa_id, linha.tentativas)
+        erro = f'{type(excecao).__name__}: {excecao}'
+    agora = datetime.now(timezone.utc)
+    valores = {'dono': None, 'travada_ate': None, 'ultima_execucao': agora, 'erro': erro}
+    if erro is not None and linha.tentativas < current_app.config['JOBS_MAX_TENTATIVAS']:
+        valores['proxima_execucao'] = agora + timedelta(seconds=current_app.config['JOBS_BACKOFF'] * 2 ** (linha.tentativas - 1))
+    elif linha.cron:
+        valores.update(proxima_execucao=proxima_cron(linha.cron, agora), tentativas=0)
+    else:
+        # Sem a chave, uma nova tarefa com a mesma chave pode ser adiada; o erro final fica registrado.
+        valores.update(concluida_em=agora, chave=None)
+    with db.engine.begin() as conn:
+        conn.execute(update(Tarefa.__table__).where(tc.id == tarefa_id, tc.dono == dono).values(**valores))
+    current_app.logger.info(json.dumps({'tarefa': linha.nome, 'id': tarefa_id, 'ms': round((time.perf_counter() - inicio) * 1000, 1), 'erro': erro}))
+    return linha.nome, erro
+
+def rodar_pendentes(nomes=None):
+    """Executa neste processo, uma por vez, as tarefas vencidas (só as de nomes, se dado); retorna [(nome, erro)]."""
+    dono, feitas = f'cli-{os.getpid()}-{uuid.uuid4().hex[:8]}', []
+    while ids := reservar_tarefas(dono, 1, nomes): feitas.append(executar_tarefa(ids[0], dono))
+    return feitas
+
+class Agendador:
+    def __init__(self, app):
+        self.app = app
+        self.dono = f'{os.getpid()}-{uuid.uuid4().hex[:8]}'
+        self.lock, self.thread, self.executor, self.em_execucao = threading.Lock(), None, None, set()
+        self.acordar, self.parada = threading.Event(), threading.Event()
+
+    def iniciar(self):
+        # Como na fila de e-mail, a thread nasce já dentro do processo worker (depois do fork).
+        if self.thread is not None and self.thread.is_alive(): return
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive(): return
+            self.parada.clear()
+            self.executor = ThreadPoolExecutor(max_workers=self.app.config['JOBS_WORKERS'], thread_name_prefix='tarefa')
+            self.thread = threading.Thread(target=self._agendar, name='agendador', daemon=True)
+            self.thread.start()
+
+    def parar(self):
+        self.parada.set()
+        self.acordar.set()
+        if self.thread is not None: self.thread.join()
+        if self.executor is not None: self.executor.shutdown(wait=True)
+
+    def _agendar(self):
+        proxima_agenda = 0
+        with self.app.app_context():
+            while not self.parada.is_set():
+                try:
+                    # A agenda é conferida de tempos em tempos: o banco pode ter sido recriado (seed-db --recriar).
+                    if time.monotonic() >= proxima_agenda:
+                        sincronizar_agenda()
+                        proxima_agenda = time.monotonic() + 600
+                    self._ciclo()
+                except Exception:  # tabela ainda não criada, banco ocupado...: tenta de novo no próximo ciclo
+                    current_app.logger.exception('Agendador: ciclo falhou')
+                self.acordar.wait(self.app.config['JOBS_POLL_S'])
+                self.acordar.clear()
+
+    def _ciclo(self):
+        with self.lock: rodando = list(self.em_execucao)
+        if rodando: renovar_leases(self.dono, rodando)
+        for tarefa_id in reservar_tarefas(self.dono, self.app.config['JOBS_WORKERS'] - len(rodando)):
+            with self.lock: self.em_execucao.add(tarefa_id)
+            self.executor.submit(self._rodar, tarefa_id)
+
+    def _rodar(self, tarefa_id):
+        try:
+            with self.app.app_context(): executar_tarefa(tarefa_id, self.dono)
+        finally:
+            with self.lock: self.em_execucao.discard(tarefa_id)
+            self.acordar.set()
+
+def agendador(): return extensao('agendador', Agendador)
+
+@bp.before_app_request
+def iniciar_agendador():
+    if current_app.config['JOBS_ENABLED']: agendador().iniciar()
+
+@bp.cli.command('jobs-list')
+@click.option('--todas', is_flag=True, help='Inclui as tarefas únicas já concluídas.')
+def jobs_list_command(todas):
+    """Lista as tarefas recorrentes e pendentes, com a próxima execução, o lease e o último erro."""
+    tc = Tarefa.__table__.c
+    linhas = db.session.execute(select(Tarefa.__table__).where(*([] if todas else [tc.concluida_em.is_(None)])).order_by(tc.proxima_execucao)).all()
+    if not linhas:
+        print("Nenhuma tarefa na fila (as recorrentes são criadas pelo agendador ou por 'flask jobs-run').")
+        return
+    print(f"{'id':>5} {'tarefa':<22} {'cron':<15} {'próxima (UTC)':<17} {'tent.':>5}  situação")
+    for t in linhas:
+        situacao = (f'concluída {t.concluida_em:%d/%m %H:%M}' if t.concluida_em else f'com {t.dono} até {t.travada_ate:%H:%M:%S}' if t.dono else 'na fila')
+        print(f"{t.id:>5} {t.nome:<22} {t.cron or '-':<15} {t.proxima_execucao:%Y-%m-%d %H:%M} {t.tentativas:>5}  {situacao}" + (f"  erro: {t.erro}" if t.erro else ''))
+
+@bp.cli.command('jobs-run')
+@click.argument('nomes', nargs=-1)
+def jobs_run_command(nomes):
+    """Executa agora, neste processo, as tarefas vencidas; com NOMES, só essas, vencidas ou não (ex.: do cron do sistema)."""
+    desconhecidas = set(nomes) - set(TAREFAS)
+    if desconhecidas: raise click.BadParameter(f"{', '.join(sorted(desconhecidas))} (conhecidas: {', '.join(sorted(TAREFAS))})", param_hint='NOMES')
+    sincronizar_agenda()
+    for nome in nomes: adiar(nome)
+    feitas = rodar_pendentes(nomes or None)
+    for nome, erro in feitas: print(f"{nome}: {'falhou: ' + erro if erro else 'ok'}")
+    print(f"{len(feitas)} tarefas executadas.")
+
+@bp.cli.command('jobs-worker')
+def jobs_worker_command():
+    """Roda o agendador em primeiro plano até Ctrl+C (para usar com JOBS_ENABLED=false nos workers web)."""
+    execucao = agendador()
+    execucao.iniciar()
+    print(f"Agendador {execucao.dono} rodando com {current_app.config['JOBS_WORKERS']} threads; Ctrl+C para sair.")
+    try:
+        while execucao.thread.is_alive(): execucao.thread.join(1)
+    except KeyboardInterrupt:
+        print("Esperando as tarefas em andamento...")
+        execucao.parar()
@@ -0,0 +1,148 @@
+import os
+import json
+import queue
+import time
+import threading
+from collections import defaultdict
+from datetime import datetime, timezone, timedelta
+from flask import Response, current_app, render_template
+from sqlalchemy import func, select, insert, delete
+from sqlalchemy.exc import OperationalError
+from nucleo import db, configuracao, extensao
+from modelos import mensagem_ao_vivo_tabela, Evento
+
+# --- EVENTOS AO VIVO (SSE) ---
+# Respostas de um tópico e vagas de um evento via Server-Sent Events, publicadas depois do commit num canal
+# ('topico:<id>', 'evento:<id>'). LIVE_BROKER 'memoria' entrega no processo; 'banco' alcança os outros workers.
+@configuracao
+def configurar_ao_vivo(app):
+    app.config.setdefault('LIVE_BROKER', os.getenv('LIVE_BROKER', 'memoria'))  # ou 'banco' (vários workers)
+    app.config.setdefault('LIVE_POLL_S', float(os.getenv('LIVE_POLL_S', 0.5)))
+    app.config.setdefault('LIVE_RETENCAO_S', int(os.getenv('LIVE_RETENCAO_S', 300)))
+    app.config.setdefault('LIVE_KEEPALIVE_S', float(os.getenv('LIVE_KEEPALIVE_S', 15)))
+    app.config.setdefault('LIVE_DURACAO_MAX_S', float(os.getenv('LIVE_DURACAO_MAX_S', 300)))
+    app.config.setdefault('LIVE_MAX_CONEXOES', int(os.getenv('LIVE_MAX_CONEXOES', 50)))
+    app.config.setdefault('LIVE_FILA_MAX', int(os.getenv('LIVE_FILA_MAX', 100)))
+
+class BrokerMemoria:
+    """Pub/sub dentro do processo: cada assinante tem uma fila limitada; quem não consome é desconectado."""
+
+    def __init__(self, app):
+        self.app, self.lock, self.assinantes = app, threading.Lock(), defaultdict(set)
+
+    def assinar(self, canal):
+        """Devolve a fila do novo assinante, ou None se o teto de conexões já foi atingido."""
+        with self.lock:
+            if self.conexoes() >= self.app.config['LIVE_MAX_CONEXOES']: return None
+            fila = queue.Queue(self.app.config['LIVE_FILA_MAX'])
+            self.assinantes[canal].add(fila)
+        return fila
+
+    def cancelar(self, canal, fila):
+        with self.lock:
+            self.assinantes[canal].discard(fila)
+            if not self.assinantes[canal]: del self.assinantes[canal]
+
+    def conexoes(self): return sum(map(len, self.assinantes.values()))
+
+    def publicar(self, canal, mensagem): self.entregar(canal, mensagem)
+
+    def entregar(self, canal, mensagem):
+        with self.lock: filas = list(self.assinantes.get(canal, ()))
+        for fila in filas:
+            try: fila.put_nowait(mensagem)
+            except queue.Full:
+                # assinante lento: esvazia e encerra o stream; na reconexão ele recupera pelo Last-Event-ID
+                with fila.mutex: fila.queue.clear()
+                fila.put_nowait(None)
+
+class BrokerBanco(BrokerMemoria):
+    """Publica na tabela mensagem_ao_vivo; uma thread lê as linhas novas e entrega aos assinantes locais."""
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.thread, self.parada = None, threading.Event()
+
+    def publicar(self, canal, mensagem):
+        with db.engine.begin() as conn:
+            conn.execute(insert(mensagem_ao_vivo_tabela).values(canal=canal, dados=json.dumps(mensagem)))
+
+    def assinar(self, canal):
+        self.iniciar()
+        return super().assinar(canal)
+
+    def iniciar(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.parada.clear()
+                self.thread = threading.Thread(target=self._ler, name='broker-sse', daemon=True)
+                self.thread.start()
+
+    def parar(self):
+        self.parada.set()
+        if self.thread is not None: self.thread.join()
+
+    def _ler(self):
+        mv = mensagem_ao_vivo_tabela.c
+        with self.app.app_context():
+            with db.engine.connect() as conn:
+                ultimo = conn.execute(select(func.max(mv.id))).scalar() or 0
+            proxima_limpeza = 0
+            while not self.parada.wait(self.app.config['LIVE_POLL_S']):
+                try:
+                    with db.engine.begin() as conn:
+                        for linha in conn.execute(select(mv.id, mv.canal, mv.dados).where(mv.id > ultimo).order_by(mv.id)):
+                            ultimo = linha.id
+                            self.entregar(linha.canal, json.loads(linha.dados))
+                        if time.monotonic() >= proxima_limpeza:
+                            limite = datetime.now(timezone.utc) - timedelta(seconds=self.app.config['LIVE_RETENCAO_S'])
+                            conn.execute(delete(mensagem_ao_vivo_tabela).where(mv.criado_em < limite))
+                            proxima_limpeza = time.monotonic() + 60
+                except OperationalError as erro:  # banco ocupado: tenta de novo no próximo ciclo
+                    current_app.logger.warning('Broker SSE: leitura falhou: %s', erro)
+
+def broker_ao_vivo():
+    return extensao('broker_ao_vivo', lambda app: BrokerBanco(app) if app.config['LIVE_BROKER'] == 'banco' else BrokerMemoria(app))
+
+def formatar_sse(mensagem):
+    linhas = [f"id: {mensagem['id']}"] if mensagem.get('id') is not None else []
+    linhas += [f"event: {mensagem['evento']}", f"data: {json.dumps(mensagem['dados'])}"]
+    return '\n'.join(linhas) + '\n\n'
+
+def resposta_sse(canal, iniciais=(), filtro=None):
+    """Abre o stream do canal: envia as mensagens iniciais e depois as publicadas, passando por filtro()."""
+    broker = broker_ao_vivo()
+    fila = broker.assinar(canal)
+    if fila is None: return Response('retry: 10000\n\n', status=503, mimetype='text/event-stream')
+    keepalive, fim = current_app.config['LIVE_KEEPALIVE_S'], time.monotonic() + current_app.config['LIVE_DURACAO_MAX_S']
+
+    def gerar():
+        try:
+            yield 'retry: 3000\n\n'
+            for mensagem in iniciais: yield formatar_sse(mensagem)
+            while (restante := fim - time.monotonic()) > 0:
+                try: mensagem = fila.get(timeout=min(keepalive, restante))
+                except queue.Empty:
+                    yield ': ping\n\n'
+                    continue
+                if mensagem is None: break
+                if filtro: mensagem = filtro(mensagem)
+                if mensagem: yield formatar_sse(mensagem)
+        finally:
+            broker.cancelar(canal, fila)
+
+    return Response(gerar(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def mensagem_post(post):
+    return {'evento': 'post', 'id': post.id, 'dados': {'html': render_template('partials/forum_post.html', post=post)}}
+
+def publicar_post(topico_id, mensagem):
+    """Publica a mensagem já renderizada (mensagem_post antes do commit, com post e autor ainda carregados)."""
+    broker_ao_vivo().publicar(f'topico:{topico_id}', mensagem)
+
+def publicar_vagas(evento_ids):
+    """Publica as vagas restantes atuais dos eventos (depois do commit da inscrição ou cancelamento)."""
+    if not evento_ids: return
+    ev = Evento.__table__.c
+    for evento_id, restantes in db.session.execute(select(ev.id, ev.vagas - ev.inscritos_count).where(ev.id.in_(evento_ids))):
+        broker_ao_vivo().publicar(f'evento:{evento_id}', {'evento': 'vagas', 'dados': {'vagas_restantes': restantes}})
@@ -0,0 +1,178 @@
+import os
+import json
+import hashlib
+import importlib.util
+from collections import namedtuple
+from datetime import datetime, timezone, date
+from flask import Response, current_app, request, g
+from sqlalchemy import select
+from nucleo import bp, db, configuracao, paginar_keyset
+from modelos import Clube, Evento, Noticia, ForumTopico, CardapioRU, CalendarioAcademico, respostas_por_topico
+from identidade import membro_do_clube
+from fragmentos import cache_fragmentos
+
+# --- API JSON (/api/v1) ---
+# Os dados das páginas em JSON compacto: ?campos=a,b escolhe as colunas do SELECT, listas são paginadas por
+# cursor e a ETag sai da geração das tabelas, compartilhada pelos workers (fragmentos.py); um If-None-Match válido recebe 304.
+@configuracao
+def configurar_api(app):
+    app.config.setdefault('API_MAX_POR_PAGINA', int(os.getenv('API_MAX_POR_PAGINA', 100)))
+    app.config.setdefault('API_COMPRIMIR_MIN_BYTES', int(os.getenv('API_COMPRIMIR_MIN_BYTES', 1024)))
+    app.config.setdefault('API_GZIP_NIVEL', 6)
+    app.config.setdefault('API_BROTLI_QUALIDADE', 5)
+RecursoApi = namedtuple('RecursoApi', 'modelo campos padrao ordem desc filtros tabelas publico')
+
+def ler_instante(valor):
+    instante = datetime.fromisoformat(valor)
+    return instante.astimezone(timezone.utc) if instante.tzinfo else instante
+
+RECURSOS_API = {
+    'clubes': RecursoApi(Clube, {'nome': Clube.nome, 'descricao': Clube.descricao, 'categoria': Clube.categoria,
+                                 'lider_id': Clube.lider_id, 'membros': Clube.member_count},
+                         ('nome', 'categoria', 'membros'), Clube.nome, False, {'categoria': lambda v: Clube.categoria == v}, ('clube',), False),
+    'eventos': RecursoApi(Evento, {'titulo': Evento.titulo, 'descricao': Evento.descricao, 'data_evento': Evento.data_evento,
+                                   'clube_id': Evento.clube_id, 'vagas': Evento.vagas, 'inscritos': Evento.inscritos_count,
+                                   'vagas_restantes': Evento.vagas - Evento.inscritos_count},
+                          ('titulo', 'data_evento', 'clube_id', 'vagas_restantes'), Evento.data_evento, False,
+                          {'clube_id': lambda v: Evento.clube_id == int(v), 'desde': lambda v: Evento.data_evento >= ler_instante(v),
+                           'ate': lambda v: Evento.data_evento < ler_instante(v)}, ('evento',), False),
+    'noticias': RecursoApi(Noticia, {'titulo': Noticia.titulo, 'conteudo': Noticia.conteudo, 'data_publicacao': Noticia.data_publicacao,
+                                     'evento_id': Noticia.evento_id},
+                           ('titulo', 'data_publicacao', 'evento_id'), Noticia.data_publicacao, True,
+                           {'evento_id': lambda v: Noticia.evento_id == int(v)}, ('noticia',), False),
+    'cardapio': RecursoApi(CardapioRU, {nome: getattr(CardapioRU, nome) for nome in ('data', 'prato_principal', 'vegetariano', 'acompanhamento', 'salada', 'sobremesa')},
+                           ('data', 'prato_principal', 'vegetariano', 'acompanhamento', 'salada', 'sobremesa'), CardapioRU.data, False,
+                           {'desde': lambda v: CardapioRU.data >= date.fromisoformat(v), 'ate': lambda v: CardapioRU.data <= date.fromisoformat(v)},
+                           ('cardapio_ru',), True),
+    'calendario': RecursoApi(CalendarioAcademico, {'data': CalendarioAcademico.data, 'descricao': CalendarioAcademico.descricao, 'tipo': CalendarioAcademico.tipo},
+                             ('data', 'descricao', 'tipo'), CalendarioAcademico.data, False,
+                             {'desde': lambda v: CalendarioAcademico.data >= date.fromisoformat(v), 'ate': lambda v: CalendarioAcademico.data <= date.fromisoformat(v),
+                              'tipo': lambda v: CalendarioAcademico.tipo == v}, ('calendario_academico',), True),
+}
+# Tópicos só existem dentro de um clube e só para os membros dele: /api/v1/clubes/<id>/topicos.
+RECURSO_TOPICOS = RecursoApi(ForumTopico, {'titulo': ForumTopico.titulo, 'conteudo': ForumTopico.conteudo, 'data_criacao': ForumTopico.data_criacao,
+                                           'user_id': ForumTopico.user_id, 'respostas': respostas_por_topico()},
+                             ('titulo', 'data_criacao', 'user_id', 'respostas'), ForumTopico.data_criacao, True, {}, ('forum_topico', 'forum_post'), False)
+
+class PedidoApiInvalido(ValueError):
+    pass
+
+_brotli = None
+
+def brotli_disponivel():
+    global _brotli
+    if _brotli is None: _brotli = importlib.util.find_spec('brotli') is not None
+    return _brotli
+
+def valor_json(valor):
+    # Datas e horas são gravadas em UTC sem fuso; na API saem com o fuso explícito.
+    if isinstance(valor, datetime): return (valor if valor.tzinfo else valor.replace(tzinfo=timezone.utc)).isoformat()
+    if isinstance(valor, date): return valor.isoformat()
+    raise TypeError(f'{type(valor).__name__} não é serializável')
+
+def erro_api(status, mensagem):
+    return Response(json.dumps({'erro': mensagem}, ensure_ascii=False), status=status, mimetype='application/json')
+
+@bp.app_errorhandler(PedidoApiInvalido)
+def pedido_api_invalido(erro): return erro_api(400, str(erro))
+
+def campos_pedidos(recurso):
+    if 'campos' not in request.args: return list(recurso.padrao)
+    campos = [c for c in request.args['campos'].split(',') if c and c != 'id']
+    desconhecidos = [c for c in campos if c not in recurso.campos]
+    if desconhecidos: raise PedidoApiInvalido(f"Campos desconhecidos: {', '.join(desconhecidos)}. Disponíveis: id, {', '.join(recurso.campos)}.")
+    return list(dict.fromkeys(campos))
+
+def consulta_api(recurso, campos, *condicoes):
+    """select() só das colunas pedidas, do id e da coluna de ordenação, com os filtros da query string."""
+    colunas = [recurso.modelo.id, *(recurso.campos[c].label(c) for c in campos)]
+    if recurso.ordem.key not in campos: colunas.append(recurso.ordem)
+    for nome, valor in request.args.items():
+        if nome not in recurso.filtros: continue
+        try: condicoes += (recurso.filtros[nome](valor),)
+        except ValueError: raise PedidoApiInvalido(f'Valor inválido para o filtro {nome}: {valor!r}.') from None
+    return select(*colunas).where(*condicoes)
+
+def etag_api(recurso):
+    """ETag da URL pedida na geração atual das tabelas do recurso, igual em todos os workers; None sem cache de fragmentos."""
+    cache = cache_fragmentos()
+    if cache is None: return None
+    partes = [request.full_path, *(f'{t}.{cache.geracao(t)}' for t in recurso.tabelas)]
+    return hashlib.sha1('|'.join(partes).encode()).hexdigest()[:16]
+
+def comprimir(resposta):
+    corpo = resposta.get_data()
+    if len(corpo) < current_app.config['API_COMPRIMIR_MIN_BYTES']: return resposta
+    codificacao = request.accept_encodings.best_match(['br', 'gzip'] if brotli_disponivel() else ['gzip'])
+    if codificacao == 'br':
+        import brotli
+        resposta.set_data(brotli.compress(corpo, quality=current_app.config['API_BROTLI_QUALIDADE']))
+    elif codificacao == 'gzip':
+        import gzip
+        resposta.set_data(gzip.compress(corpo, compresslevel=current_app.config['API_GZIP_NIVEL']))
+    else: return resposta
+    resposta.headers['Content-Encoding'] = codificacao
+    return resposta
+
+def resposta_api(recurso, montar):
+    """Responde 304 se a ETag do cliente ainda vale; senão serializa montar() e comprime."""
+    etag = etag_api(recurso)
+    cabecalhos = {'Cache-Control': 'public, no-cache' if recurso.publico else 'private, no-cache', 'Vary': 'Cookie, Accept-Encoding'}
+    if etag is not None and request.if_none_match.contains_weak(etag):
+        resposta = Response(status=304, headers=cabecalhos)
+        resposta.set_etag(etag, weak=True)
+        return resposta
+    dados = montar()
+    if dados is None: return erro_api(404, 'Não encontrado.')
+    resposta = Response(json.dumps(dados, ensure_ascii=False, separators=(',', ':'), default=valor_json), mimetype='application/json', headers=cabecalhos)
+    if etag is None:
+        resposta.add_etag(weak=True)
+        resposta.make_conditional(request)
+        if resposta.status_code == 304: return resposta
+    else: resposta.set_etag(etag, weak=True)
+    return comprimir(resposta)
+
+def listar_api(recurso, *condicoes):
+    campos = campos_pedidos(recurso)
+    limite = min(request.args.get('limite', current_app.config['ITENS_POR_PAGINA'], type=int), current_app.config['API_MAX_POR_PAGINA'])
+    if limite < 1: raise PedidoApiInvalido('limite deve ser pelo menos 1.')
+    def montar():
+        linhas, proximo_cursor = paginar_keyset(consulta_api(recurso, campos, *condicoes), recurso.ordem, request.args.get('cursor'), recurso.desc, limite)
+        return {'itens': [{'id': linha.id, **{c: getattr(linha, c) for c in campos}} for linha in linhas], 'proximo_cursor': proximo_cursor}
+    return resposta_api(recurso, montar)
+
+def detalhar_api(recurso, item_id, *condicoes):
+    campos = campos_pedidos(recurso) if 'campos' in request.args else list(recurso.campos)
+    def montar():
+        linha = db.session.execute(consulta_api(recurso, campos, recurso.modelo.id == item_id, *condicoes)).first()
+        return None if linha is None else {'id': linha.id, **{c: getattr(linha, c) for c in campos}}
+    return resposta_api(recurso, montar)
+
+def recurso_api(nome):
+    recurso = RECURSOS_API.get(nome)
+    if recurso is None: return None, erro_api(404, f"Recurso desconhecido. Disponíveis: {', '.join(RECURSOS_API)}.")
+    if not recurso.publico and g.user is None: return None, erro_api(401, 'Faça login para usar a API.')
+    return recurso, None
+
+@bp.route('/api/v1/<recurso>')
+def api_listar(recurso):
+    recurso, erro = recurso_api(recurso)
+    return erro or listar_api(recurso)
+
+@bp.route('/api/v1/<recurso>/<int:item_id>')
+def api_detalhar(recurso, item_id):
+    recurso, erro = recurso_api(recurso)
+    return erro or detalhar_api(recurso, item_id)
+
+def topicos_permitidos(clube_id):
+    if g.user is None: return erro_api(401, 'Faça login para usar a API.')
+    if not membro_do_clube(g.user.id, clube_id): return erro_api(403, 'Apenas membros do clube podem ver o fórum.')
+    return None
+
+@bp.route('/api/v1/clubes/<int:clube_id>/topicos')
+def api_listar_topicos(clube_id):
+    return topicos_permitidos(clube_id) or listar_api(RECURSO_TOPICOS, ForumTopico.clube_id == clube_id)
+
+@bp.route('/api/v1/clubes/<int:clube_id>/topicos/<int:topico_id>')
+def api_detalhar_topico(clube_id, topico_id):
+    return topicos_permitidos(clube_id) or detalhar_api(RECURSO_TOPICOS, topico_id, ForumTopico.clube_id == clube_id)
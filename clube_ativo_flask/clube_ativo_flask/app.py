@@ -1,172 +1,64 @@
 import os
+import re
+import math
+import json
+import random
+import itertools
+import hashlib
+import time
 import uuid
+import shutil
+import tempfile
+import threading
+from collections import Counter, defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
 from datetime import datetime, timezone, date, timedelta
-from dotenv import load_dotenv
-from flask import Flask, render_template, request, redirect, url_for, flash, session, g
-from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
-from werkzeug.utils import secure_filename
-from werkzeug.security import generate_password_hash, check_password_hash
-from flask_mail import Mail, Message
-from itsdangerous import URLSafeTimedSerializer, SignatureExpired
-
-# Carrega as variáveis de ambiente do arquivo .env
-load_dotenv()
-
-# --- 1. CONFIGURAÇÃO DA APLICAÇÃO ---
-app = Flask(__name__)
-try:
-    os.makedirs(app.instance_path)
-except OSError:
-    pass
-
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(app.instance_path, 'database.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SECRET_KEY'] = '77cd9b0684a5113200d4810755f4a9e5455a3c860df49cf7'
-
-app.config['MAIL_SERVER'] = os.getenv('MAIL_SERVER', 'smtp.googlemail.com')
-app.config['MAIL_PORT'] = int(os.getenv('MAIL_PORT', 587))
-app.config['MAIL_USE_TLS'] = os.getenv('MAIL_USE_TLS', 'true').lower() in ['true', '1', 't']
-app.config['MAIL_USERNAME'] = os.getenv('MAIL_USERNAME')
-app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSWORD')
-app.config['MAIL_DEFAULT_SENDER'] = ('Hub Comunitário', os.getenv('MAIL_USERNAME'))
-
-mail = Mail(app)
-serializer = URLSafeTimedSerializer(app.config['SECRET_KEY'])
-db = SQLAlchemy(app)
-migrate = Migrate(app, db)
-
-# --- CONFIGURAÇÃO DE UPLOADS ---
-UPLOAD_FOLDER = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'static/profile_pics')
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-
-CLUB_MEDIA_FOLDER = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'static/club_media')
-ALLOWED_MEDIA_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'pdf', 'mp4', 'mov', 'webp'}
-app.config['CLUB_MEDIA_FOLDER'] = CLUB_MEDIA_FOLDER
-os.makedirs(CLUB_MEDIA_FOLDER, exist_ok=True)
-
-def allowed_file(filename, allowed_set):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in allowed_set
-
-# --- 3. MODELOS DA BASE DE DADOS ---
-inscricao_evento_tabela = db.Table('inscricao_evento',
-    db.Column('user_id', db.Integer, db.ForeignKey('user.id'), primary_key=True),
-    db.Column('evento_id', db.Integer, db.ForeignKey('evento.id'), primary_key=True)
-)
-membros_clube_tabela = db.Table('membros_clube',
-    db.Column('user_id', db.Integer, db.ForeignKey('user.id'), primary_key=True),
-    db.Column('clube_id', db.Integer, db.ForeignKey('clube.id'), primary_key=True)
-)
-user_badges_tabela = db.Table('user_badges',
-    db.Column('user_id', db.Integer, db.ForeignKey('user.id'), primary_key=True),
-    db.Column('badge_id', db.Integer, db.ForeignKey('badge.id'), primary_key=True)
-)
-
-class User(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    email = db.Column(db.String(120), unique=True, nullable=False)
-    username = db.Column(db.String(12), unique=True, nullable=False)
-    password_hash = db.Column(db.String(256), nullable=False)
-    image_file = db.Column(db.String(100), nullable=False, default='default.jpg')
-    eventos_inscritos = db.relationship('Evento', secondary=inscricao_evento_tabela, back_populates='alunos_inscritos', lazy='dynamic')
-    clubes_membro = db.relationship('Clube', secondary=membros_clube_tabela, back_populates='membros', lazy='dynamic')
-    clubes_liderados = db.relationship('Clube', backref='lider', lazy='dynamic', foreign_keys='Clube.lider_id')
-    topicos_criados = db.relationship('ForumTopico', backref='autor', lazy='dynamic', cascade="all, delete-orphan")
-    posts_criados = db.relationship('ForumPost', backref='autor', lazy='dynamic', cascade="all, delete-orphan")
-    badges = db.relationship('Badge', secondary=user_badges_tabela, back_populates='users', lazy='dynamic')
-    def get_reset_token(self, expires_sec=1800): return serializer.dumps({'user_id': self.id}, salt='password-reset-salt')
-    @staticmethod
-    def verify_reset_token(token, expires_sec=1800):
-        try:
-            data = serializer.loads(token, salt='password-reset-salt', max_age=expires_sec)
-            return User.query.get(data['user_id'])
-        except (SignatureExpired, Exception): return None
-
-class Clube(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    nome = db.Column(db.String(100), unique=True, nullable=False)
-    descricao = db.Column(db.Text, nullable=False)
-    categoria = db.Column(db.String(50), nullable=False)
-    lider_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
-    membros = db.relationship('User', secondary=membros_clube_tabela, back_populates='clubes_membro', lazy='dynamic')
-    eventos = db.relationship('Evento', backref='clube_organizador', lazy='dynamic', cascade="all, delete-orphan")
-    forum_topicos = db.relationship('ForumTopico', backref='clube', lazy='dynamic', cascade="all, delete-orphan")
-    media_files = db.relationship('ClubeMedia', backref='clube', lazy='dynamic', cascade="all, delete-orphan")
-
-class Evento(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    titulo = db.Column(db.String(200), nullable=False)
-    descricao = db.Column(db.Text, nullable=False)
-    vagas = db.Column(db.Integer, nullable=False)
-    data_evento = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
-    clube_id = db.Column(db.Integer, db.ForeignKey('clube.id'), nullable=False)
-    alunos_inscritos = db.relationship('User', secondary=inscricao_evento_tabela, back_populates='eventos_inscritos', lazy='dynamic')
-    noticias = db.relationship('Noticia', backref='evento', lazy='dynamic', cascade="all, delete-orphan")
-    @property
-    def vagas_restantes(self): return self.vagas - self.alunos_inscritos.count()
-
-class Noticia(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    titulo = db.Column(db.String(200), nullable=False)
-    conteudo = db.Column(db.Text, nullable=False)
-    data_publicacao = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
-    evento_id = db.Column(db.Integer, db.ForeignKey('evento.id'), nullable=True)
-
-class ForumTopico(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    titulo = db.Column(db.String(200), nullable=False)
-    conteudo = db.Column(db.Text, nullable=False)
-    data_criacao = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    clube_id = db.Column(db.Integer, db.ForeignKey('clube.id'), nullable=False)
-    posts = db.relationship('ForumPost', backref='topico', lazy='dynamic', cascade="all, delete-orphan")
-
-class ForumPost(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    conteudo = db.Column(db.Text, nullable=False)
-    data_criacao = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    topico_id = db.Column(db.Integer, db.ForeignKey('forum_topico.id'), nullable=False)
-
-class Badge(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    nome = db.Column(db.String(50), unique=True, nullable=False)
-    descricao = db.Column(db.String(200), nullable=False)
-    icon_class = db.Column(db.String(50), nullable=False)
-    users = db.relationship('User', secondary=user_badges_tabela, back_populates='badges', lazy='dynamic')
-
-class CardapioRU(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    data = db.Column(db.Date, unique=True, nullable=False)
-    prato_principal = db.Column(db.String(150), nullable=False)
-    vegetariano = db.Column(db.String(150), nullable=False)
-    acompanhamento = db.Column(db.String(200), nullable=False)
-    salada = db.Column(db.String(150), nullable=False)
-    sobremesa = db.Column(db.String(100), nullable=False)
-
-class CalendarioAcademico(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    data = db.Column(db.Date, nullable=False)
-    descricao = db.Column(db.String(200), nullable=False)
-    tipo = db.Column(db.String(50), nullable=False)
-
-class ClubeMedia(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    filename = db.Column(db.String(200), nullable=False)
-    descricao = db.Column(db.String(200), nullable=True)
-    data_upload = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
-    clube_id = db.Column(db.Integer, db.ForeignKey('clube.id'), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    uploader = db.relationship('User', backref='uploaded_media')
+import click
+from flask import Flask, current_app, has_app_context, render_template, request, redirect, url_for, flash, session, g, abort
+from sqlalchemy import event, func, select, insert, update, delete, exists, literal, bindparam, tuple_, create_engine, inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import joinedload
+from nucleo import CONFIGURACOES, bp, db, configuracao, extensao, dialeto_dml, paginar_keyset, FilaEscrita, escrever
+from modelos import inscricao_evento_tabela, membros_clube_tabela, lista_espera_tabela, user_badges_tabela, User, Clube, Evento, Noticia, ForumTopico, ForumPost, Badge, CardapioRU, CalendarioAcademico, ClubeMedia, FeedItem, Tarefa, perfil_forum
+from instrumentacao import iniciar_medicao, query_budget, percentil
+from identidade import carregar_identidade, invalidar_identidade, membro_do_clube
+from midia import ALLOWED_EXTENSIONS, ALLOWED_MEDIA_EXTENSIONS, allowed_file, MIME_TYPES, UploadInvalido, salvar_upload, agendar_variantes, asset_url
+from busca import BUSCA_MODELOS, documento_busca, rowid_busca, gravar_busca, reindexar_busca, url_resultado, buscar
+from feed import distribuir_feed, preencher_feed
+from visoes import periodo, deslocar_periodo, periodo_pedido, materializar_visoes, visao_calendario, feed_calendario
+from fragmentos import cache_fragmentos, fragmento
+from correio import enviar_email, anunciar_evento
+from ao_vivo import resposta_sse, mensagem_post, publicar_post, publicar_vagas
+from senhas import senhas, limitador, espera_tentativa, tentativas_esgotadas
+from agendador import tarefa, adiar
+from ranking import RANKING_METRICAS, get_ranking, invalidar_ranking
+import api, importacao  # noqa: F401 - registram rotas e comandos no blueprint
 
 # --- 4. LÓGICA AUXILIAR E DECORATORS ---
-@app.before_request
+_esquema_lock = threading.Lock()
+
+# Registrado antes de load_logged_in_user, que já lê colunas novas de user.
+@bp.before_app_request
+def sincronizar_esquema_no_inicio():
+    app = current_app._get_current_object()
+    if not app.config['DB_SINCRONIZAR_ESQUEMA'] or 'esquema' in app.extensions: return
+    # Lock próprio, não o de extensao(): os commits daqui criam outras extensões (cache de fragmentos).
+    with _esquema_lock:
+        if 'esquema' in app.extensions: return
+        for coluna in preparar_esquema(): app.logger.warning('Coluna criada: %s', coluna)
+        app.extensions['esquema'] = True
+    iniciar_medicao()  # a sincronização não entra no Server-Timing nem no orçamento de consultas da requisição
+
+@bp.before_app_request
 def load_logged_in_user():
+    if request.endpoint in ('static', 'main.asset'): return
     user_id = session.get('user_id')
-    g.user = User.query.get(user_id) if user_id else None
+    g.identidade = carregar_identidade(user_id) if user_id else None
+    # merge(load=False) anexa a cópia em cache à sessão atual sem ir ao banco
+    g.user = db.session.merge(g.identidade.user, load=False) if g.identidade else None
     if user_id and g.user is None: session.clear()
 
 def login_required(f):
@@ -174,7 +66,7 @@ def login_required(f):
     def decorated_function(*args, **kwargs):
         if g.user is None:
             flash('Você precisa fazer login para acessar esta página.', 'warning')
-            return redirect(url_for('login'))
+            return redirect(url_for('main.login'))
         return f(*args, **kwargs)
     return decorated_function
 
@@ -186,7 +78,7 @@ def club_leader_required(clube_id_arg='clube_id'):
             clube = Clube.query.get_or_404(clube_id)
             if g.user is None or clube.lider_id != g.user.id:
                 flash('Acesso restrito ao líder do clube.', 'danger')
-                return redirect(url_for('detalhe_clube', clube_id=clube.id))
+                return redirect(url_for('main.detalhe_clube', clube_id=clube.id))
             return f(*args, **kwargs)
         return decorated_function
     return decorator
@@ -196,72 +88,330 @@ def club_member_required(clube_id_arg='clube_id'):
         @wraps(f)
         def decorated_function(*args, **kwargs):
             clube_id = kwargs.get(clube_id_arg)
-            clube = Clube.query.get_or_404(clube_id)
-            if g.user is None or clube not in g.user.clubes_membro.all():
+            if g.user is None or not membro_do_clube(g.user.id, clube_id):
                 flash('Você precisa ser membro deste clube para acessar esta área.', 'warning')
-                return redirect(url_for('detalhe_clube', clube_id=clube.id))
+                return redirect(url_for('main.detalhe_clube', clube_id=clube_id))
             return f(*args, **kwargs)
         return decorated_function
     return decorator
 
-def user_has_badge(user, badge_name): return user.badges.filter_by(nome=badge_name).count() > 0
-
-def award_badge(user, badge_name, show_flash=True):
-    if not user_has_badge(user, badge_name):
-        badge = Badge.query.filter_by(nome=badge_name).first()
-        if badge:
-            user.badges.append(badge)
-            db.session.commit()
-            if show_flash:
-                flash(f'Selo Desbloqueado: "{badge.nome}"!', 'special')
-
-@app.context_processor
+@bp.app_context_processor
 def inject_utils():
     return dict(
         current_user_data=g.user,
         current_year=datetime.now(timezone.utc).year,
+        asset_url=asset_url,
         timedelta=timedelta
     )
 
+# --- SELOS (BADGES) ---
+# Regras por gatilho avaliadas sobre contadores lidos do banco na transação da ação que as disparou;
+# a concessão é INSERT ... ON CONFLICT DO NOTHING.
+RegraSelo = namedtuple('RegraSelo', 'selo gatilho condicao')
+REGRAS_SELOS = [
+    RegraSelo('Membro Pioneiro', 'cadastro', lambda c: c['user_id'] <= 10),
+    RegraSelo('Explorador de Clubes', 'clube', lambda c: c['clubes'] >= 1),
+    RegraSelo('Socialite do Campus', 'clube', lambda c: c['clubes'] >= 3),
+    RegraSelo('Participante Ativo', 'evento', lambda c: c['eventos'] >= 1),
+    RegraSelo('Entusiasta de Eventos', 'evento', lambda c: c['eventos'] >= 5),
+    RegraSelo('Organizador de Eventos', 'evento_criado', lambda c: c['eventos_criados'] >= 1),
+    RegraSelo('Pioneiro do Fórum', 'topico', lambda c: c['topicos'] >= 1),
+]
+def cache_selos(): return extensao('selos', lambda app: {'ids': None})
+
+def selos_por_nome(conn):
+    cache = cache_selos()
+    ids = cache['ids']
+    # Selo de regra ausente também relê: pode ter sido criado (seed, outro processo) depois de o cache encher.
+    if ids is None or any(r.selo not in ids for r in REGRAS_SELOS):
+        ids = cache['ids'] = dict(conn.execute(select(Badge.nome, Badge.id)).all())
+    return ids
+
+def invalidar_selos(): cache_selos()['ids'] = None
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def marcar_selos_alterados(conn, cursor, statement, parameters, context, executemany):
+    if context is None or context.compiled is None or not (context.isinsert or context.isupdate or context.isdelete): return
+    if getattr(getattr(context.compiled.statement, 'table', None), 'name', None) == Badge.__tablename__: conn.info['selos_alterados'] = True
+
+@event.listens_for(Engine, 'commit')
+def confirmar_selos_alterados(conn):
+    if conn.info.pop('selos_alterados', False) and has_app_context(): invalidar_selos()
+
+@event.listens_for(Engine, 'rollback')
+def descartar_selos_alterados(conn): conn.info.pop('selos_alterados', None)
+
+def selos_devidos(gatilhos, contadores, ja_tem, selos):
+    return [r.selo for r in REGRAS_SELOS if r.gatilho in gatilhos and r.selo in selos and selos[r.selo] not in ja_tem and r.condicao(contadores)]
+
+def contadores_selos(user_id):
+    contar = lambda tabela, coluna: select(func.count()).select_from(tabela).where(coluna == user_id).scalar_subquery()
+    return {'clubes': contar(membros_clube_tabela, membros_clube_tabela.c.user_id),
+            'eventos': contar(inscricao_evento_tabela, inscricao_evento_tabela.c.user_id),
+            'topicos': contar(ForumTopico.__table__, ForumTopico.__table__.c.user_id),
+            'eventos_criados': select(func.count(Evento.id)).join(Clube, Evento.clube_id == Clube.id).where(Clube.lider_id == user_id).scalar_subquery()}
+
+def conceder_selos(conn, user_id, gatilho):
+    """Grava, na transação de conn, os selos cujas regras do gatilho passam; retorna os nomes que o usuário ainda não tinha."""
+    contadores = dict(conn.execute(select(*(sub.label(nome) for nome, sub in contadores_selos(user_id).items()))).mappings().one(), user_id=user_id)
+    selos, novos = selos_por_nome(conn), []
+    for nome in selos_devidos({gatilho}, contadores, frozenset(), selos):
+        inserir = dialeto_dml(conn).insert(user_badges_tabela).values(user_id=user_id, badge_id=selos[nome]).on_conflict_do_nothing()
+        if conn.execute(inserir).rowcount: novos.append(nome)
+    return novos
+
+def avisar_selos(nomes):
+    for nome in nomes: flash(f'Selo Desbloqueado: "{nome}"!', 'special')
+
+def entrar_clube_com_selos(conn, user_id, clube_id):
+    """entrar_clube() seguido dos selos do gatilho 'clube'; retorna None se o usuário já era membro."""
+    return conceder_selos(conn, user_id, 'clube') if entrar_clube(conn, user_id, clube_id) else None
+
+def reservar_vaga_com_selos(conn, user_id, evento_id):
+    """(resultado de reservar_vaga(), selos concedidos) na mesma transação."""
+    resultado = reservar_vaga(conn, user_id, evento_id)
+    return resultado, conceder_selos(conn, user_id, 'evento') if resultado == INSCRITO else []
+
+def recalcular_selos(lote=500):
+    """Backfill: avalia todas as regras para todos os usuários, em lotes de ids; retorna quantos selos foram concedidos."""
+    def contagem(coluna, *filtros):
+        return dict(db.session.execute(select(coluna, func.count()).where(coluna.in_(ids), *filtros).group_by(coluna)).all())
+    concedidos, ultimo_id, selos = 0, 0, selos_por_nome(db.session.connection())
+    while True:
+        ids = db.session.scalars(select(User.id).where(User.id > ultimo_id).order_by(User.id).limit(lote)).all()
+        if not ids: return concedidos
+        clubes = contagem(membros_clube_tabela.c.user_id)
+        eventos = contagem(inscricao_evento_tabela.c.user_id)
+        topicos = contagem(ForumTopico.user_id)
+        eventos_criados = dict(db.session.execute(select(Clube.lider_id, func.count(Evento.id)).join(Evento, Evento.clube_id == Clube.id)
+                                                  .where(Clube.lider_id.in_(ids)).group_by(Clube.lider_id)).all())
+        ja_tem = defaultdict(set)
+        for user_id, badge_id in db.session.execute(select(user_badges_tabela.c.user_id, user_badges_tabela.c.badge_id).where(user_badges_tabela.c.user_id.in_(ids))):
+            ja_tem[user_id].add(badge_id)
+        linhas = []
+        for user_id in ids:
+            contadores = {'user_id': user_id, 'clubes': clubes.get(user_id, 0), 'eventos': eventos.get(user_id, 0),
+                          'topicos': topicos.get(user_id, 0), 'eventos_criados': eventos_criados.get(user_id, 0)}
+            linhas += [{'user_id': user_id, 'badge_id': selos[nome]} for nome in selos_devidos({r.gatilho for r in REGRAS_SELOS}, contadores, ja_tem[user_id], selos)]
+        if linhas: concedidos += db.session.execute(dialeto_dml(db.session.connection()).insert(user_badges_tabela).on_conflict_do_nothing(), linhas).rowcount
+        db.session.commit()
+        ultimo_id = ids[-1]
+
+# --- CONTADORES DESNORMALIZADOS ---
+# Clube.member_count / Evento.inscritos_count, incrementados no próprio UPDATE (atômico entre requisições).
+def ajustar_contador(coluna, obj_id, delta):
+    modelo = coluna.class_
+    modelo.query.filter(modelo.id == obj_id).update({coluna: coluna + delta})
+
+def rebuild_counters():
+    membros = select(func.count()).select_from(membros_clube_tabela).where(membros_clube_tabela.c.clube_id == Clube.id).scalar_subquery()
+    inscritos = select(func.count()).select_from(inscricao_evento_tabela).where(inscricao_evento_tabela.c.evento_id == Evento.id).scalar_subquery()
+    db.session.execute(update(Clube).values(member_count=membros))
+    db.session.execute(update(Evento).values(inscritos_count=inscritos))
+    db.session.commit()
+
+def sincronizar_esquema():
+    """Acrescenta às tabelas existentes as colunas declaradas nos modelos que ainda faltam (create_all só cria
+    tabelas novas) e recalcula os contadores se eles acabaram de ser criados; retorna ['tabela.coluna', ...]."""
+    inspetor, adicionadas = inspect(db.engine), []
+    with db.engine.begin() as conn:
+        nome = conn.dialect.identifier_preparer.quote
+        for tabela in db.metadata.sorted_tables:
+            if not inspetor.has_table(tabela.name): continue
+            existentes = {coluna['name'] for coluna in inspetor.get_columns(tabela.name)}
+            for coluna in tabela.columns:
+                if coluna.name in existentes: continue
+                # Sem DEFAULT no servidor a coluna entra anulável: as linhas antigas não têm valor para ela.
+                padrao = f" DEFAULT {coluna.server_default.arg} NOT NULL" if coluna.server_default is not None else ''
+                conn.execute(text(f"ALTER TABLE {nome(tabela.name)} ADD COLUMN {nome(coluna.name)} {coluna.type.compile(conn.dialect)}{padrao}"))
+                adicionadas.append(f'{tabela.name}.{coluna.name}')
+    if {'clube.member_count', 'evento.inscritos_count'} & set(adicionadas): rebuild_counters()
+    return adicionadas
+
+# Tabelas e colunas novas dos modelos entram no primeiro request de cada aplicação, em vez de viajarem no
+# .db versionado; índices de tabelas já existentes ficam com 'flask db-audit --fix' e reset_db.py.
+@configuracao
+def configurar_esquema(app):
+    app.config.setdefault('DB_SINCRONIZAR_ESQUEMA', os.getenv('DB_SINCRONIZAR_ESQUEMA', 'true').lower() in ['true', '1', 't'])
+
+def preparar_esquema():
+    for tentativa in range(2):
+        try:
+            db.create_all()
+            return sincronizar_esquema()
+        except OperationalError:  # outro worker alterou a tabela junto: a segunda passada já encontra as colunas
+            if tentativa: raise
+
+def entrar_clube(conn, user_id, clube_id):
+    """Matricula o usuário e soma no contador; retorna False se ele já era membro."""
+    mc, cc = membros_clube_tabela.c, Clube.__table__.c
+    ja_membro = exists().where(mc.user_id == user_id, mc.clube_id == clube_id)
+    novo = conn.execute(insert(membros_clube_tabela).from_select(['user_id', 'clube_id', 'data_entrada'],
+                        select(literal(user_id), literal(clube_id), literal(datetime.now(timezone.utc), db.DateTime)).where(~ja_membro))).rowcount
+    if novo: conn.execute(update(Clube.__table__).where(cc.id == clube_id).values(member_count=cc.member_count + 1))
+    return bool(novo)
+
+def sair_clube(conn, user_id, clube_id):
+    mc, cc = membros_clube_tabela.c, Clube.__table__.c
+    saiu = conn.execute(delete(membros_clube_tabela).where(mc.user_id == user_id, mc.clube_id == clube_id)).rowcount
+    if saiu: conn.execute(update(Clube.__table__).where(cc.id == clube_id).values(member_count=cc.member_count - 1))
+    return bool(saiu)
+
+# --- INSCRIÇÃO EM EVENTOS ---
+# A vaga é reservada por um UPDATE condicional (inscritos_count < vagas); com o evento lotado o usuário
+# entra na lista de espera e é promovido quando uma vaga abre. As funções rodam na transação de conn.
+INSCRITO, LISTA_ESPERA = 'inscrito', 'lista_espera'
+
+def reservar_vaga(conn, user_id, evento_id):
+    """Retorna INSCRITO, LISTA_ESPERA ou None se o usuário já estava inscrito. Com vaga sobrando a inscrição
+    duplicada levanta IntegrityError no INSERT (o chamador faz rollback, o que devolve a vaga)."""
+    ev = Evento.__table__.c
+    reservada = conn.execute(update(Evento.__table__).where(ev.id == evento_id, ev.inscritos_count < ev.vagas)
+                             .values(inscritos_count=ev.inscritos_count + 1)).rowcount
+    if reservada:
+        conn.execute(insert(inscricao_evento_tabela).values(user_id=user_id, evento_id=evento_id))
+        return INSCRITO
+    ic = inscricao_evento_tabela.c
+    if conn.execute(select(ic.user_id).where(ic.user_id == user_id, ic.evento_id == evento_id)).first(): return None
+    le = lista_espera_tabela.c
+    ja_na_fila = exists().where(le.user_id == user_id, le.evento_id == evento_id)
+    conn.execute(insert(lista_espera_tabela).from_select(['user_id', 'evento_id', 'data_entrada'],
+                 select(literal(user_id), literal(evento_id), literal(datetime.now(timezone.utc), db.DateTime)).where(~ja_na_fila)))
+    return LISTA_ESPERA
+
+def cancelar_inscricao(conn, user_id, evento_id):
+    """Libera a vaga (ou o lugar na fila) e promove o primeiro da lista de espera; retorna o id promovido."""
+    le = lista_espera_tabela.c
+    conn.execute(delete(lista_espera_tabela).where(le.user_id == user_id, le.evento_id == evento_id))
+    ic = inscricao_evento_tabela.c
+    if not conn.execute(delete(inscricao_evento_tabela).where(ic.user_id == user_id, ic.evento_id == evento_id)).rowcount: return None
+    while True:
+        proximo = conn.execute(select(le.user_id).where(le.evento_id == evento_id).order_by(le.data_entrada, le.user_id).limit(1)).scalar()
+        if proximo is None:
+            ev = Evento.__table__.c
+            conn.execute(update(Evento.__table__).where(ev.id == evento_id).values(inscritos_count=ev.inscritos_count - 1))
+            return None
+        if conn.execute(delete(lista_espera_tabela).where(le.user_id == proximo, le.evento_id == evento_id)).rowcount:
+            conn.execute(insert(inscricao_evento_tabela).values(user_id=proximo, evento_id=evento_id))
+            return proximo
+
+# --- TAREFAS DE MANUTENÇÃO ---
+@tarefa('recontar-contadores')
+def recontar_contadores_tarefa():
+    rebuild_counters()
+    invalidar_ranking()
+
+@tarefa('recalcular-selos')
+def recalcular_selos_tarefa(): recalcular_selos()
+
+@tarefa('limpar-midia-orfa')
+def limpar_midia_orfa_tarefa():
+    """Apaga de CLUB_MEDIA_FOLDER os arquivos que nenhuma ClubeMedia usa (original, miniatura ou capa) e uploads interrompidos."""
+    pasta = current_app.config['CLUB_MEDIA_FOLDER']
+    if not os.path.isdir(pasta): return 0
+    # Carência: o upload grava o arquivo antes do commit da linha, e as variantes chegam depois dele.
+    limite = time.time() - current_app.config['MEDIA_ORFA_CARENCIA_H'] * 3600
+    antigos = [e for e in os.scandir(pasta) if e.is_file() and not e.name.startswith('.') and e.stat().st_mtime < limite]
+    if not antigos: return 0
+    usados = set()
+    for linha in db.session.execute(select(ClubeMedia.filename, ClubeMedia.thumb_filename, ClubeMedia.poster_filename)): usados.update(linha)
+    apagados = 0
+    for entrada in antigos:
+        if entrada.name in usados: continue
+        try:
+            os.remove(entrada.path)
+            apagados += 1
+        except OSError: pass
+    if apagados: current_app.logger.info('%d arquivos órfãos apagados de %s', apagados, pasta)
+    return apagados
+
+@tarefa('expirar-eventos')
+def expirar_eventos_tarefa():
+    """Tira os eventos que já começaram das listas quentes: apaga as listas de espera deles e, se algum passou
+    desde a última execução, renova o hub (próximos eventos) e o ranking (eventos realizados)."""
+    agora = datetime.now(timezone.utc)
+    desde = db.session.execute(select(Tarefa.ultima_execucao).where(Tarefa.chave == 'cron:expirar-eventos')).scalar()
+    le = lista_espera_tabela.c
+    with db.engine.begin() as conn:
+        conn.execute(delete(lista_espera_tabela).where(le.evento_id.in_(select(Evento.id).where(Evento.data_evento <= agora))))
+    passaram = select(Evento.id).where(Evento.data_evento <= agora, *([Evento.data_evento > desde] if desde else [])).limit(1)
+    if db.session.execute(passaram).first():
+        cache = cache_fragmentos()
+        if cache is not None: cache.incrementar('evento')
+        invalidar_ranking()
+
+@tarefa('analisar-banco')
+def analisar_banco_tarefa():
+    """Atualiza as estatísticas usadas pelo planejador de consultas."""
+    with db.engine.begin() as conn:
+        conn.exec_driver_sql('ANALYZE')
+        if conn.dialect.name == 'sqlite': conn.exec_driver_sql('PRAGMA optimize')
+
+@tarefa('vacuum-banco')
+def vacuum_banco_tarefa():
+    """Compacta o banco; VACUUM não roda dentro de transação. No SQLite o WAL também é truncado."""
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        conn.exec_driver_sql('VACUUM')
+        if conn.dialect.name == 'sqlite': conn.exec_driver_sql('PRAGMA wal_checkpoint(TRUNCATE)')
+
+@tarefa('limpar-tarefas')
+def limpar_tarefas_tarefa():
+    limite = datetime.now(timezone.utc) - timedelta(days=current_app.config['JOBS_RETENCAO_DIAS'])
+    with db.engine.begin() as conn: conn.execute(delete(Tarefa.__table__).where(Tarefa.__table__.c.concluida_em < limite))
+
+@tarefa('anunciar-evento')
+def anunciar_evento_tarefa(evento_id, link):
+    evento = db.session.get(Evento, evento_id)
+    if evento is not None: anunciar_evento(evento.clube_organizador, evento, link)
+
 # --- 5. ROTAS DE AUTENTICAÇÃO E CONTA ---
-@app.route('/')
-def index(): return redirect(url_for('login')) if g.user is None else redirect(url_for('noticias'))
+@bp.route('/')
+def index(): return redirect(url_for('main.login')) if g.user is None else redirect(url_for('main.noticias'))
 
-@app.route('/register', methods=['GET', 'POST'])
+@bp.route('/register', methods=['GET', 'POST'])
 def register():
-    if g.user: return redirect(url_for('noticias'))
+    if g.user: return redirect(url_for('main.noticias'))
     if request.method == 'POST':
         email, username = request.form.get('email'), request.form.get('username')
         password = request.form.get('password')
+        espera = espera_tentativa()
+        if espera: return tentativas_esgotadas(espera, 'register.html')
         if User.query.filter_by(email=email).first(): flash('Este e-mail já está em uso.', 'warning')
         elif User.query.filter_by(username=username).first(): flash('Esta matrícula já está registrada.', 'warning')
         else:
-            novo_user = User(email=email, username=username, password_hash=generate_password_hash(password))
+            novo_user = User(email=email, username=username, password_hash=senhas().gerar(password))
             db.session.add(novo_user)
+            db.session.flush()
+            avisar_selos(conceder_selos(db.session.connection(), novo_user.id, 'cadastro'))
             db.session.commit()
-            if User.query.count() <= 10: award_badge(novo_user, 'Membro Pioneiro')
             flash('Conta criada com sucesso! Pode fazer o login.', 'success')
-            return redirect(url_for('login'))
+            return redirect(url_for('main.login'))
     return render_template('register.html')
 
-@app.route('/login', methods=['GET', 'POST'])
+@bp.route('/login', methods=['GET', 'POST'])
 def login():
-    if g.user: return redirect(url_for('noticias'))
+    if g.user: return redirect(url_for('main.noticias'))
     if request.method == 'POST':
-        user = User.query.filter_by(username=request.form.get('username')).first()
-        if user and check_password_hash(user.password_hash, request.form.get('password')):
+        username, password = request.form.get('username') or '', request.form.get('password')
+        espera = espera_tentativa(username)
+        if espera: return tentativas_esgotadas(espera, 'login.html')
+        user = User.query.filter_by(username=username).first()
+        if user and senhas().verificar(user.password_hash, password):
+            if senhas().precisa_refazer(user.password_hash):
+                user.password_hash = senhas().gerar(password)
+                db.session.commit()
             session.clear(); session['user_id'] = user.id
-            return redirect(url_for('noticias'))
+            return redirect(url_for('main.noticias'))
         else: flash('Matrícula ou senha inválidos.', 'danger')
     return render_template('login.html')
 
-@app.route('/logout')
+@bp.route('/logout')
 def logout():
     session.clear()
     flash('Você saiu da sua conta.', 'info')
-    return redirect(url_for('login'))
+    return redirect(url_for('main.login'))
 
-@app.route('/account', methods=['GET', 'POST'])
+@bp.route('/account', methods=['GET', 'POST'])
 @login_required
 def account():
     if request.method == 'POST':
@@ -270,169 +420,246 @@ def account():
             file = request.files['picture']
             if file.filename == '': flash('Nenhum arquivo selecionado.', 'warning')
             elif file and allowed_file(file.filename, ALLOWED_EXTENSIONS):
-                ext = os.path.splitext(file.filename)[1]
-                filename = secure_filename(f"{g.user.username}{ext}")
-                file.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
-                g.user.image_file = filename
-                db.session.commit()
-                flash('Foto de perfil atualizada com sucesso!', 'success')
+                try:
+                    filename, tipo, _ = salvar_upload(file, current_app.config['UPLOAD_FOLDER'], {'png', 'jpg', 'gif'})
+                    g.user.image_file, g.user.image_thumb = filename, None
+                    db.session.commit()
+                    invalidar_identidade(g.user.id)
+                    agendar_variantes('avatar', g.user.id, current_app.config['UPLOAD_FOLDER'], filename, tipo)
+                    flash('Foto de perfil atualizada com sucesso!', 'success')
+                except UploadInvalido as erro: flash(str(erro), 'danger')
             else: flash('Tipo de arquivo inválido. Use png, jpg, jpeg ou gif.', 'danger')
-        return redirect(url_for('account'))
-    image_file = url_for('static', filename='profile_pics/' + g.user.image_file)
+        return redirect(url_for('main.account'))
+    image_file = asset_url('static', filename='profile_pics/' + g.user.image_file)
     return render_template('account.html', image_file=image_file, eventos=g.user.eventos_inscritos)
 
 def send_reset_email(user):
     token = user.get_reset_token()
-    msg = Message('Redefinição de Senha - Hub Comunitário', recipients=[user.email])
-    msg.html = f'''<p>Para redefinir sua senha, visite o seguinte link:</p>
-<a href="{url_for('reset_password', token=token, _external=True)}">
-    {url_for('reset_password', token=token, _external=True)}
+    html = f'''<p>Para redefinir sua senha, visite o seguinte link:</p>
+<a href="{url_for('main.reset_password', token=token, _external=True)}">
+    {url_for('main.reset_password', token=token, _external=True)}
 </a>
 <p>Se você não fez esta solicitação, ignore este e-mail.</p>
 '''
-    mail.send(msg)
+    enviar_email('Redefinição de Senha - Hub Comunitário', html, recipients=[user.email])
 
-@app.route('/forgot_password', methods=['GET', 'POST'])
+@bp.route('/forgot_password', methods=['GET', 'POST'])
 def forgot_password():
-    if g.user: return redirect(url_for('noticias'))
+    if g.user: return redirect(url_for('main.noticias'))
     if request.method == 'POST':
         user = User.query.filter_by(email=request.form.get('email')).first()
         if user:
             send_reset_email(user)
             flash('Um e-mail com instruções para redefinir sua senha foi enviado.', 'info')
-            return redirect(url_for('login'))
+            return redirect(url_for('main.login'))
         else:
             flash('Nenhuma conta encontrada com este e-mail.', 'warning')
     return render_template('forgot_password.html')
 
-@app.route('/reset_password/<token>', methods=['GET', 'POST'])
+@bp.route('/reset_password/<token>', methods=['GET', 'POST'])
 def reset_password(token):
-    if g.user: return redirect(url_for('noticias'))
+    if g.user: return redirect(url_for('main.noticias'))
     user = User.verify_reset_token(token)
     if not user:
         flash('O token é inválido ou expirou.', 'warning')
-        return redirect(url_for('forgot_password'))
+        return redirect(url_for('main.forgot_password'))
     if request.method == 'POST':
-        user.password_hash = generate_password_hash(request.form.get('password'))
+        user.password_hash = senhas().gerar(request.form.get('password'))
         db.session.commit()
+        invalidar_identidade(user.id)
         flash('Sua senha foi atualizada! Você já pode fazer login.', 'success')
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
     return render_template('reset_password.html', token=token)
 
-@app.route('/account/change_password', methods=['POST'])
+@bp.route('/account/change_password', methods=['POST'])
 @login_required
 def change_password():
-    if not check_password_hash(g.user.password_hash, request.form.get('old_password')):
+    espera = limitador('USUARIO').consumir(g.user.username)
+    if espera:
+        flash(f'Muitas tentativas. Tente novamente em {math.ceil(espera)} segundo(s).', 'danger')
+        return redirect(url_for('main.account'))
+    db.session.refresh(g.user)  # como em delete_account: o hash em cache pode ser de antes de uma troca em outro worker
+    if not senhas().verificar(g.user.password_hash, request.form.get('old_password')):
         flash('A senha antiga está incorreta.', 'danger')
     elif request.form.get('new_password') != request.form.get('confirm_password'):
         flash('A nova senha e a confirmação não correspondem.', 'danger')
     else:
-        g.user.password_hash = generate_password_hash(request.form.get('new_password'))
+        g.user.password_hash = senhas().gerar(request.form.get('new_password'))
         db.session.commit()
+        invalidar_identidade(g.user.id)
         flash('Senha alterada com sucesso!', 'success')
-    return redirect(url_for('account'))
+    return redirect(url_for('main.account'))
 
-@app.route('/account/delete', methods=['POST'])
+@bp.route('/account/delete', methods=['POST'])
 @login_required
 def delete_account():
-    if not check_password_hash(g.user.password_hash, request.form.get('password')):
+    espera = limitador('USUARIO').consumir(g.user.username)
+    if espera:
+        flash(f'Muitas tentativas. Tente novamente em {math.ceil(espera)} segundo(s).', 'danger')
+        return redirect(url_for('main.account'))
+    db.session.refresh(g.user)  # a cópia em cache pode ter o hash de antes de uma troca de senha feita em outro worker
+    if not senhas().verificar(g.user.password_hash, request.form.get('password')):
         flash('Senha incorreta. A exclusão da conta foi cancelada.', 'danger')
-        return redirect(url_for('account'))
+        return redirect(url_for('main.account'))
     user_to_delete = g.user
     session.clear()
+    # clubes e eventos vêm do banco, na mesma transação que apaga a conta (não do cache de identidade)
+    clubes_ids = select(membros_clube_tabela.c.clube_id).where(membros_clube_tabela.c.user_id == user_to_delete.id)
+    Clube.query.filter(Clube.id.in_(clubes_ids)).update({Clube.member_count: Clube.member_count - 1}, synchronize_session=False)
+    conn = db.session.connection()
+    ic = inscricao_evento_tabela.c
+    evento_ids = conn.execute(select(ic.evento_id).where(ic.user_id == user_to_delete.id)).scalars().all()
+    promovidos = [cancelar_inscricao(conn, user_to_delete.id, evento_id) for evento_id in evento_ids]
+    conn.execute(delete(lista_espera_tabela).where(lista_espera_tabela.c.user_id == user_to_delete.id))
     db.session.delete(user_to_delete)
     db.session.commit()
+    for user_id in [user_to_delete.id] + [p for p in promovidos if p]: invalidar_identidade(user_id)
+    invalidar_ranking()
+    publicar_vagas([evento_id for evento_id, promovido in zip(evento_ids, promovidos) if not promovido])
     flash('Sua conta foi excluída permanentemente.', 'info')
-    return redirect(url_for('login'))
+    return redirect(url_for('main.login'))
 
 
 # --- 6. ROTAS PRINCIPAIS DA APLICAÇÃO ---
-@app.route('/noticias')
+@bp.route('/noticias')
 @login_required
 def noticias():
-    todas_noticias = Noticia.query.order_by(Noticia.data_publicacao.desc()).all()
-    return render_template('noticias.html', noticias=todas_noticias)
+    cursor = request.args.get('cursor')
+    def renderizar():
+        noticias, proximo_cursor = paginar_keyset(Noticia.query.options(joinedload(Noticia.evento)), Noticia.data_publicacao, cursor, desc=True)
+        return render_template('partials/noticias_conteudo.html', noticias=noticias, proximo_cursor=proximo_cursor)
+    return render_template('noticias.html', conteudo=fragmento('noticias', ('noticia', 'evento'), renderizar, cursor))
 
-@app.route('/clubes')
+@bp.route('/feed')
+@login_required
+def feed():
+    itens, proximo_cursor = paginar_keyset(FeedItem.query.filter_by(user_id=g.user.id), FeedItem.criado_em, request.args.get('cursor'), desc=True)
+    return render_template('feed.html', itens=itens, proximo_cursor=proximo_cursor, url_resultado=url_resultado)
+
+@bp.route('/clubes')
 @login_required
 def clubes():
-    todos_clubes = Clube.query.order_by(Clube.nome).all()
-    return render_template('clubes.html', clubes=todos_clubes)
+    renderizar = lambda: render_template('partials/clubes_conteudo.html', clubes=Clube.query.order_by(Clube.nome).all())
+    return render_template('clubes.html', conteudo=fragmento('clubes', ('clube',), renderizar))
 
-@app.route('/clube/<int:clube_id>')
+@bp.route('/clube/<int:clube_id>')
 @login_required
 def detalhe_clube(clube_id):
     clube = Clube.query.get_or_404(clube_id)
     agora = datetime.now(timezone.utc)
     eventos_futuros = clube.eventos.filter(Evento.data_evento >= agora).order_by(Evento.data_evento.asc()).all()
     eventos_passados = clube.eventos.filter(Evento.data_evento < agora).order_by(Evento.data_evento.desc()).all()
-    is_member = g.user in clube.membros
+    is_member = clube.id in g.identidade.clube_ids
     is_leader = g.user.id == clube.lider_id
     return render_template('detalhe_clube.html', clube=clube, eventos_futuros=eventos_futuros, eventos_passados=eventos_passados, is_member=is_member, is_leader=is_leader)
 
-@app.route('/ranking')
+@bp.route('/ranking')
 @login_required
 def ranking():
-    clubes_rankeados = sorted(Clube.query.all(), key=lambda c: c.membros.count(), reverse=True)
-    return render_template('ranking.html', clubes=clubes_rankeados)
+    metrica = request.args.get('metrica', 'membros')
+    if metrica not in RANKING_METRICAS: metrica = 'membros'
+    return render_template('ranking.html', clubes=get_ranking(metrica), metrica=metrica, metricas=RANKING_METRICAS)
+
+@bp.route('/busca')
+@login_required
+def busca():
+    termos = request.args.get('q', '').strip()
+    resultados, proximo_cursor = buscar(termos, g.user.id, request.args.get('cursor')) if termos else ([], None)
+    return render_template('busca.html', termos=termos, resultados=resultados, proximo_cursor=proximo_cursor)
 
-@app.route('/hub_servicos')
+@bp.route('/hub_servicos')
 @login_required
 def hub_servicos():
-    eventos_futuros = Evento.query.filter(Evento.data_evento >= datetime.now(timezone.utc)).order_by(Evento.data_evento.asc()).limit(3).all()
-    return render_template('hub_servicos.html', eventos_futuros=eventos_futuros)
+    def renderizar():
+        eventos_futuros = Evento.query.filter(Evento.data_evento >= datetime.now(timezone.utc)).order_by(Evento.data_evento.asc()).limit(3).all()
+        return render_template('partials/hub_servicos_conteudo.html', eventos_futuros=eventos_futuros)
+    return render_template('hub_servicos.html', conteudo=fragmento('hub_servicos', ('evento',), renderizar))
 
-@app.route('/eventos')
+@bp.route('/eventos')
 @login_required
 def eventos():
-    todos_eventos = Evento.query.order_by(Evento.data_evento.asc()).all()
-    return render_template('eventos.html', eventos=todos_eventos)
+    eventos, proximo_cursor = paginar_keyset(Evento.query, Evento.data_evento, request.args.get('cursor'))
+    return render_template('eventos.html', eventos=eventos, proximo_cursor=proximo_cursor)
 
-@app.route('/evento/<int:evento_id>')
+@bp.route('/evento/<int:evento_id>')
 @login_required
 def detalhe_evento(evento_id):
     evento = Evento.query.get_or_404(evento_id)
-    ja_inscrito = evento in g.user.eventos_inscritos.all()
-    return render_template('detalhe_evento.html', evento=evento, ja_inscrito=ja_inscrito)
+    ja_inscrito = evento.id in g.identidade.evento_ids
+    na_lista_espera = not ja_inscrito and evento.vagas_restantes <= 0 and db.session.execute(
+        select(lista_espera_tabela.c.user_id).where(lista_espera_tabela.c.user_id == g.user.id, lista_espera_tabela.c.evento_id == evento.id)).first() is not None
+    return render_template('detalhe_evento.html', evento=evento, ja_inscrito=ja_inscrito, na_lista_espera=na_lista_espera)
 
-@app.route('/evento/<int:evento_id>/inscrever', methods=['POST'])
+@bp.route('/evento/<int:evento_id>/inscrever', methods=['POST'])
 @login_required
 def inscrever_evento(evento_id):
     evento = Evento.query.get_or_404(evento_id)
-    if evento in g.user.eventos_inscritos.all(): flash('Você já está inscrito neste evento.', 'info')
-    elif evento.vagas_restantes <= 0: flash('Vagas esgotadas para este evento!', 'danger')
-    else:
-        g.user.eventos_inscritos.append(evento)
-        if g.user.eventos_inscritos.count() == 1: award_badge(g.user, 'Participante Ativo')
-        if g.user.eventos_inscritos.count() == 5: award_badge(g.user, 'Entusiasta de Eventos')
-        db.session.commit()
-        flash('Inscrição realizada com sucesso!', 'success')
-    return redirect(url_for('detalhe_evento', evento_id=evento_id))
+    try: resultado, novos_selos = escrever(reservar_vaga_com_selos, g.user.id, evento.id)
+    except IntegrityError: resultado = None
+    if resultado is None:
+        invalidar_identidade(g.user.id)
+        flash('Você já está inscrito neste evento.', 'info')
+        return redirect(url_for('main.detalhe_evento', evento_id=evento_id))
+    avisar_selos(novos_selos)
+    invalidar_identidade(g.user.id)
+    if resultado == INSCRITO: publicar_vagas([evento.id])
+    if resultado == INSCRITO: flash('Inscrição realizada com sucesso!', 'success')
+    else: flash('Vagas esgotadas! Você entrou na lista de espera e será inscrito se uma vaga abrir.', 'warning')
+    return redirect(url_for('main.detalhe_evento', evento_id=evento_id))
+
+@bp.route('/evento/<int:evento_id>/cancelar', methods=['POST'])
+@login_required
+def cancelar_inscricao_evento(evento_id):
+    evento = Evento.query.get_or_404(evento_id)
+    promovido = escrever(cancelar_inscricao, g.user.id, evento.id)
+    invalidar_identidade(g.user.id)
+    if promovido: invalidar_identidade(promovido)
+    else: publicar_vagas([evento.id])
+    flash('Sua inscrição foi cancelada.', 'info')
+    return redirect(url_for('main.detalhe_evento', evento_id=evento_id))
+
+@bp.route('/evento/<int:evento_id>/stream')
+@login_required
+def stream_evento(evento_id):
+    """SSE com as vagas restantes do evento; só envia quando o número muda, junto com a diferença."""
+    ev = Evento.__table__.c
+    restantes = db.session.execute(select(ev.vagas - ev.inscritos_count).where(ev.id == evento_id)).scalar()
+    if restantes is None: abort(404)
+    ultimo = restantes
+
+    def so_mudancas(mensagem):
+        nonlocal ultimo
+        atual = mensagem['dados']['vagas_restantes']
+        if atual == ultimo: return None
+        mensagem = {**mensagem, 'dados': {'vagas_restantes': atual, 'delta': atual - ultimo}}
+        ultimo = atual
+        return mensagem
+
+    return resposta_sse(f'evento:{evento_id}', [{'evento': 'vagas', 'dados': {'vagas_restantes': restantes, 'delta': 0}}], so_mudancas)
 
 # --- 7. NOVAS ROTAS PARA CLUBES ---
-@app.route('/clube/<int:clube_id>/join', methods=['POST'])
+@bp.route('/clube/<int:clube_id>/join', methods=['POST'])
 @login_required
 def join_club(clube_id):
     clube = Clube.query.get_or_404(clube_id)
-    if clube not in g.user.clubes_membro:
-        g.user.clubes_membro.append(clube)
-        if g.user.clubes_membro.count() == 1: award_badge(g.user, 'Explorador de Clubes')
-        if g.user.clubes_membro.count() == 3: award_badge(g.user, 'Socialite do Campus')
-        db.session.commit()
+    if (novos_selos := escrever(entrar_clube_com_selos, g.user.id, clube.id)) is not None:
+        avisar_selos(novos_selos)
+        invalidar_identidade(g.user.id)
+        invalidar_ranking()
         flash(f'Bem-vindo ao {clube.nome}!', 'success')
-    return redirect(url_for('detalhe_clube', clube_id=clube_id))
+    return redirect(url_for('main.detalhe_clube', clube_id=clube_id))
 
-@app.route('/clube/<int:clube_id>/leave', methods=['POST'])
+@bp.route('/clube/<int:clube_id>/leave', methods=['POST'])
 @login_required
 def leave_club(clube_id):
     clube = Clube.query.get_or_404(clube_id)
-    if clube in g.user.clubes_membro:
-        g.user.clubes_membro.remove(clube)
-        db.session.commit()
+    if escrever(sair_clube, g.user.id, clube.id):
+        invalidar_identidade(g.user.id)
+        invalidar_ranking()
         flash(f'Você saiu do {clube.nome}.', 'info')
-    return redirect(url_for('detalhe_clube', clube_id=clube_id))
+    return redirect(url_for('main.detalhe_clube', clube_id=clube_id))
 
-@app.route('/clube/<int:clube_id>/criar_evento', methods=['GET', 'POST'])
+@bp.route('/clube/<int:clube_id>/criar_evento', methods=['GET', 'POST'])
 @login_required
 @club_leader_required()
 def criar_evento_clube(clube_id):
@@ -447,23 +674,27 @@ def criar_evento_clube(clube_id):
                 novo_evento = Evento(titulo=titulo, descricao=descricao, vagas=vagas, data_evento=data_evento, clube_organizador=clube)
                 noticia = Noticia(titulo=f"Novo Evento: {titulo}", conteudo=f"O {clube.nome} anunciou um novo evento para {data_evento.strftime('%d/%m/%Y às %H:%M')}. {descricao}", evento=novo_evento)
                 db.session.add_all([novo_evento, noticia])
+                db.session.flush()
+                novos_selos = conceder_selos(db.session.connection(), g.user.id, 'evento_criado')
                 db.session.commit()
-                award_badge(g.user, 'Organizador de Eventos')
+                avisar_selos(novos_selos)
+                adiar('anunciar-evento', evento_id=novo_evento.id, link=url_for('main.detalhe_evento', evento_id=novo_evento.id, _external=True))
                 flash('Evento criado e divulgado com sucesso!', 'success')
-                return redirect(url_for('detalhe_evento', evento_id=novo_evento.id))
+                return redirect(url_for('main.detalhe_evento', evento_id=novo_evento.id))
         except (ValueError, TypeError): flash('Dados inválidos. Verifique a data e os outros campos.', 'danger')
     return render_template('criar_evento.html', clube=clube)
 
 # --- 8. ROTAS DE FÓRUM, MÍDIA E SERVIÇOS ---
-@app.route('/clube/<int:clube_id>/forum')
+@bp.route('/clube/<int:clube_id>/forum')
+@query_budget(6)
 @login_required
 @club_member_required()
 def clube_forum(clube_id):
     clube = Clube.query.get_or_404(clube_id)
-    topicos = clube.forum_topicos.order_by(ForumTopico.data_criacao.desc()).all()
-    return render_template('clube_forum.html', clube=clube, topicos=topicos)
+    topicos, proximo_cursor = paginar_keyset(clube.forum_topicos.options(*perfil_forum('lista_topicos')), ForumTopico.data_criacao, request.args.get('cursor'), desc=True)
+    return render_template('clube_forum.html', clube=clube, topicos=topicos, proximo_cursor=proximo_cursor)
 
-@app.route('/clube/<int:clube_id>/forum/novo', methods=['GET', 'POST'])
+@bp.route('/clube/<int:clube_id>/forum/novo', methods=['GET', 'POST'])
 @login_required
 @club_member_required()
 def clube_criar_topico(clube_id):
@@ -473,29 +704,46 @@ def clube_criar_topico(clube_id):
         if titulo and conteudo:
             novo_topico = ForumTopico(titulo=titulo, conteudo=conteudo, autor=g.user, clube=clube)
             db.session.add(novo_topico)
+            db.session.flush()
+            novos_selos = conceder_selos(db.session.connection(), g.user.id, 'topico')
             db.session.commit()
-            award_badge(g.user, 'Pioneiro do Fórum')
+            avisar_selos(novos_selos)
             flash('Tópico criado com sucesso!', 'success')
-            return redirect(url_for('clube_detalhe_topico', clube_id=clube.id, topico_id=novo_topico.id))
+            return redirect(url_for('main.clube_detalhe_topico', clube_id=clube.id, topico_id=novo_topico.id))
     return render_template('clube_criar_topico.html', clube=clube)
 
-@app.route('/clube/<int:clube_id>/forum/topico/<int:topico_id>', methods=['GET', 'POST'])
+@bp.route('/clube/<int:clube_id>/forum/topico/<int:topico_id>', methods=['GET', 'POST'])
+@query_budget(8, escrita=16)
 @login_required
 @club_member_required()
 def clube_detalhe_topico(clube_id, topico_id):
     clube = Clube.query.get_or_404(clube_id)
-    topico = ForumTopico.query.filter_by(id=topico_id, clube_id=clube.id).first_or_404()
+    topico = ForumTopico.query.options(*perfil_forum('topico')).filter_by(id=topico_id, clube_id=clube.id).first_or_404()
     if request.method == 'POST':
         if conteudo := request.form.get('conteudo'):
             novo_post = ForumPost(conteudo=conteudo, autor=g.user, topico=topico)
             db.session.add(novo_post)
+            db.session.flush()
+            mensagem = mensagem_post(novo_post)  # depois do commit post e autor expiram e renderizar voltaria ao banco
             db.session.commit()
+            publicar_post(topico_id, mensagem)
             flash('Resposta adicionada!', 'success')
-            return redirect(url_for('clube_detalhe_topico', clube_id=clube.id, topico_id=topico.id))
-    posts = topico.posts.order_by(ForumPost.data_criacao.asc()).all()
-    return render_template('clube_detalhe_topico.html', topico=topico, posts=posts, clube=clube)
+            return redirect(url_for('main.clube_detalhe_topico', clube_id=clube_id, topico_id=topico_id))
+    posts, proximo_cursor = paginar_keyset(topico.posts.options(*perfil_forum('thread')), ForumPost.data_criacao, request.args.get('cursor'))
+    return render_template('clube_detalhe_topico.html', topico=topico, posts=posts, clube=clube, proximo_cursor=proximo_cursor)
+
+@bp.route('/clube/<int:clube_id>/forum/topico/<int:topico_id>/stream')
+@login_required
+@club_member_required()
+def stream_topico(clube_id, topico_id):
+    """SSE com as respostas novas do tópico; na reconexão reenvia as posteriores ao Last-Event-ID."""
+    if not db.session.execute(select(ForumTopico.id).filter_by(id=topico_id, clube_id=clube_id)).first(): abort(404)
+    perdidos = []
+    if (ultimo_id := request.headers.get('Last-Event-ID', type=int)) is not None:
+        perdidos = ForumPost.query.options(*perfil_forum('thread')).filter(ForumPost.topico_id == topico_id, ForumPost.id > ultimo_id).order_by(ForumPost.id).limit(50).all()
+    return resposta_sse(f'topico:{topico_id}', [mensagem_post(post) for post in perdidos])
 
-@app.route('/clube/<int:clube_id>/media', methods=['GET', 'POST'])
+@bp.route('/clube/<int:clube_id>/media', methods=['GET', 'POST'])
 @login_required
 @club_member_required()
 def clube_media(clube_id):
@@ -506,115 +754,564 @@ def clube_media(clube_id):
         else:
             file = request.files['media_file']
             if allowed_file(file.filename, ALLOWED_MEDIA_EXTENSIONS):
-                ext = os.path.splitext(file.filename)[1]
-                filename = secure_filename(f"clube{clube.id}_{uuid.uuid4().hex}{ext}")
-                file.save(os.path.join(app.config['CLUB_MEDIA_FOLDER'], filename))
-                nova_media = ClubeMedia(filename=filename, descricao=request.form.get('descricao'), clube=clube, uploader=g.user)
-                db.session.add(nova_media)
-                db.session.commit()
-                flash('Arquivo enviado com sucesso!', 'success')
+                try:
+                    permitidos = {ext.replace('jpeg', 'jpg') for ext in ALLOWED_MEDIA_EXTENSIONS}
+                    filename, tipo, tamanho = salvar_upload(file, current_app.config['CLUB_MEDIA_FOLDER'], permitidos, f"clube{clube.id}_")
+                    nova_media = ClubeMedia(filename=filename, descricao=request.form.get('descricao'), clube=clube, uploader=g.user,
+                                            mime_type=MIME_TYPES[tipo], tamanho_bytes=tamanho)
+                    db.session.add(nova_media)
+                    db.session.commit()
+                    agendar_variantes('media', nova_media.id, current_app.config['CLUB_MEDIA_FOLDER'], filename, tipo)
+                    flash('Arquivo enviado com sucesso!', 'success')
+                except UploadInvalido as erro: flash(str(erro), 'danger')
             else: flash(f"Tipo de arquivo inválido. Permitidos: {', '.join(ALLOWED_MEDIA_EXTENSIONS)}", 'danger')
-        return redirect(url_for('clube_media', clube_id=clube_id))
+        return redirect(url_for('main.clube_media', clube_id=clube_id))
     media_files = clube.media_files.order_by(ClubeMedia.data_upload.desc()).all()
     return render_template('clube_media.html', clube=clube, media_files=media_files)
 
-@app.route('/cardapio')
+@bp.route('/cardapio')
 @login_required
 def cardapio():
-    hoje = date.today()
-    start_of_week = hoje - timedelta(days=hoje.weekday())
-    cardapio_semana_obj = CardapioRU.query.filter(CardapioRU.data >= start_of_week).order_by(CardapioRU.data.asc()).limit(7).all()
-    cardapio_semana = {item.data.weekday(): item for item in cardapio_semana_obj}
-    return render_template('cardapio_ru.html', cardapio_semana=cardapio_semana, start_of_week=start_of_week)
+    chave, start_of_week, fim = periodo_pedido('semana', request.args.get('semana'))
+    def renderizar():
+        visao = json.loads(visao_calendario('semana', chave, start_of_week, fim).dados)
+        cardapio_semana = {date.fromisoformat(item['data']).weekday(): item for item in visao['itens']}
+        return render_template('partials/cardapio_conteudo.html', cardapio_semana=cardapio_semana, start_of_week=start_of_week, chave=chave,
+                               anterior=periodo('semana', deslocar_periodo('semana', start_of_week, -1))[0], seguinte=periodo('semana', fim)[0],
+                               atual=periodo('semana', date.today())[0])
+    return render_template('cardapio_ru.html', conteudo=fragmento('cardapio', ('visao_calendario',), renderizar, chave, date.today()))
 
-@app.route('/calendario_academico')
+@bp.route('/calendario_academico')
 @login_required
 def calendario_academico():
-    hoje = date.today()
-    eventos = CalendarioAcademico.query.filter(CalendarioAcademico.data >= hoje).order_by(CalendarioAcademico.data.asc()).all()
-    return render_template('calendario_academico.html', eventos=eventos)
+    chave, inicio, fim = periodo_pedido('mes', request.args.get('mes'))
+    def renderizar():
+        eventos = [dict(item, data=date.fromisoformat(item['data'])) for item in json.loads(visao_calendario('mes', chave, inicio, fim).dados)['itens']]
+        return render_template('partials/calendario_conteudo.html', eventos=eventos, inicio=inicio, chave=chave,
+                               anterior=periodo('mes', deslocar_periodo('mes', inicio, -1))[0], seguinte=periodo('mes', fim)[0],
+                               atual=periodo('mes', date.today())[0])
+    return render_template('calendario_academico.html', conteudo=fragmento('calendario', ('visao_calendario',), renderizar, chave, date.today()))
+
+# Sem login: aplicativos de agenda assinam o .ics sem sessão, e o conteúdo é o mesmo mural público do campus.
+@bp.route('/cardapio.<formato>')
+def cardapio_feed(formato):
+    return feed_calendario('semana', formato, request.args.get('semana'), 'Cardápio do RU')
+
+@bp.route('/calendario_academico.<formato>')
+def calendario_feed(formato):
+    return feed_calendario('mes', formato, request.args.get('mes'), 'Calendário Acadêmico')
 
 # --- 9. COMANDO PARA POPULAR O BANCO ---
-@app.cli.command('seed-db')
-def seed_db_command():
-    print("Limpando tabelas existentes...")
-    db.drop_all()
+# Cada lista de fixtures é comparada com o banco pela chave natural e só o que falta ou mudou é gravado;
+# nada é apagado. Os hashes das senhas ficam em instance/seed_hashes.json para o reseed não recalculá-los.
+SEED_SENHA = '123456'
+SEED_BADGES = [
+    {'nome': 'Membro Pioneiro', 'descricao': 'Um dos 10 primeiros usuários a se registrar na plataforma.', 'icon_class': 'fas fa-rocket'},
+    {'nome': 'Explorador de Clubes', 'descricao': 'Entrou no seu primeiro clube.', 'icon_class': 'fas fa-compass'},
+    {'nome': 'Socialite do Campus', 'descricao': 'Membro de 3 ou mais clubes.', 'icon_class': 'fas fa-users'},
+    {'nome': 'Participante Ativo', 'descricao': 'Inscreveu-se no seu primeiro evento.', 'icon_class': 'fas fa-calendar-check'},
+    {'nome': 'Entusiasta de Eventos', 'descricao': 'Participou de 5 ou mais eventos.', 'icon_class': 'fas fa-star'},
+    {'nome': 'Organizador de Eventos', 'descricao': 'Liderou um clube e criou um evento.', 'icon_class': 'fas fa-bullhorn'},
+    {'nome': 'Pioneiro do Fórum', 'descricao': 'Criou seu primeiro tópico em um fórum.', 'icon_class': 'fas fa-feather-alt'}]
+SEED_USUARIOS = [
+    {'username': '202511110001', 'email': 'lider.prog@ifpb.edu.br'},
+    {'username': '202511110002', 'email': 'membro.comum@ifpb.edu.br'},
+    {'username': '202522220001', 'email': 'lider.teatro@ifpb.edu.br'}]
+# 'lider' e 'membros' são matrículas de SEED_USUARIOS.
+SEED_CLUBES = [
+    {'nome': 'Clube de Programação', 'descricao': 'Para entusiastas de código, desenvolvimento de software e competições.', 'categoria': 'Tecnologia',
+     'lider': '202511110001', 'membros': ['202511110001', '202511110002']},
+    {'nome': 'Clube de Teatro', 'descricao': 'Explore a arte da atuação, expressão corporal e montagem de peças.', 'categoria': 'Arte & Cultura',
+     'lider': '202522220001', 'membros': ['202522220001', '202511110002']},
+    {'nome': 'Clube de Esportes', 'descricao': 'Organização de treinos e campeonatos de diversas modalidades.', 'categoria': 'Esportes',
+     'lider': None, 'membros': []},
+    {'nome': 'Clube de Robótica', 'descricao': 'Construção e programação de robôs para desafios e aprendizado.', 'categoria': 'Tecnologia',
+     'lider': None, 'membros': ['202511110001']},
+    {'nome': 'Clube de Literatura', 'descricao': 'Leituras, debates e análises de obras clássicas e contemporâneas.', 'categoria': 'Arte & Cultura',
+     'lider': None, 'membros': ['202511110002']}]
+SEED_EVENTOS = [
+    {'clube': 'Clube de Programação', 'titulo': 'Maratona de Programação', 'descricao': 'Resolva desafios de programação em equipe.', 'vagas': 50,
+     'data_evento': datetime(2025, 9, 10, 9, 0, 0, tzinfo=timezone.utc)},
+    {'clube': 'Clube de Robótica', 'titulo': 'Oficina de Arduino', 'descricao': 'Aprenda os primeiros passos com a plataforma Arduino.', 'vagas': 25,
+     'data_evento': datetime(2025, 9, 22, 14, 0, 0, tzinfo=timezone.utc)},
+    {'clube': 'Clube de Literatura', 'titulo': 'Debate sobre "1984"', 'descricao': 'Análise da obra de George Orwell e suas implicações atuais.', 'vagas': 30,
+     'data_evento': datetime(2025, 10, 5, 18, 30, 0, tzinfo=timezone.utc)},
+    # Evento passado
+    {'clube': 'Clube de Teatro', 'titulo': 'Apresentação Teatral de Verão', 'descricao': 'Performance da peça "Sonho de uma Noite de Verão".', 'vagas': 100,
+     'data_evento': datetime(2025, 7, 20, 19, 0, 0, tzinfo=timezone.utc)}]
+# 'evento' é o título de um item de SEED_EVENTOS.
+SEED_NOTICIAS = [
+    {'titulo': 'Inscrições Abertas para a Maratona de Programação!', 'conteudo': 'As inscrições para a maratona de programação já começaram. Monte sua equipe e participe!',
+     'evento': 'Maratona de Programação'},
+    {'titulo': 'Edital de Monitoria 2025.2', 'conteudo': 'Estão abertas as inscrições para o programa de monitoria. Os interessados devem procurar a coordenação do seu curso para mais informações sobre vagas e disciplinas disponíveis.',
+     'evento': None},
+    {'titulo': 'Vem aí a Oficina de Arduino!', 'conteudo': 'O Clube de Robótica convida a todos para uma oficina prática e introdutória sobre a plataforma Arduino. Não é necessário conhecimento prévio!',
+     'evento': 'Oficina de Arduino'},
+    {'titulo': 'Novo Horário da Biblioteca', 'conteudo': 'Atenção, estudantes! A partir da próxima semana, a biblioteca funcionará em horário estendido, das 7h30 às 21h30, de segunda a sexta.',
+     'evento': None},
+    {'titulo': 'Relembre: Sucesso na Apresentação Teatral', 'conteudo': 'O Clube de Teatro agradece a presença de todos na incrível apresentação da peça "Sonho de uma Noite de Verão" que ocorreu no mês passado. Foi um sucesso de público e crítica!',
+     'evento': 'Apresentação Teatral de Verão'}]
+SEED_CARDAPIO = {'prato_principal': 'Frango Grelhado com Arroz e Feijão', 'vegetariano': 'Torta de Legumes', 'acompanhamento': 'Batata Doce Assada',
+                 'salada': 'Mix de Folhas com Tomate', 'sobremesa': 'Fruta da Estação'}
+SEED_CALENDARIO = [
+    {'data': date(2025, 8, 15), 'descricao': 'Início do Semestre Letivo 2025.2', 'tipo': 'Acadêmico'},
+    {'data': date(2025, 9, 7), 'descricao': 'Feriado Nacional - Independência do Brasil', 'tipo': 'Feriado'}]
+Sincronia = namedtuple('Sincronia', 'ids inseridos alterados')
+
+def valor_comparavel(valor):
+    # DateTime no SQLite volta sem fuso; as fixtures estão em UTC.
+    if isinstance(valor, datetime) and valor.tzinfo is not None: return valor.astimezone(timezone.utc).replace(tzinfo=None)
+    return valor
+
+def sincronizar(conn, modelo, chaves, desejadas, na_insercao=None):
+    """Insere as linhas que faltam e atualiza só as que mudaram, comparando pelas colunas chaves.
+    na_insercao() devolve colunas extras só para linhas novas (ex.: o hash da senha). Retorna Sincronia com
+    ids {chave: id} (a chave é o valor, ou a tupla de valores se houver mais de uma coluna) e os ids gravados."""
+    tabela = modelo.__table__
+    colunas = list(desejadas[0])
+    chave = (lambda linha: linha[chaves[0]]) if len(chaves) == 1 else (lambda linha: tuple(linha[c] for c in chaves))
+    alvo = {chave(linha): linha for linha in desejadas}
+    filtro = tabela.c[chaves[0]].in_(list(alvo)) if len(chaves) == 1 else tuple_(*(tabela.c[c] for c in chaves)).in_(list(alvo))
+    existentes = {chave(linha): linha for linha in conn.execute(select(tabela.c.id, *(tabela.c[c] for c in colunas)).where(filtro)).mappings()}
+    novas = [linha for k, linha in alvo.items() if k not in existentes]
+    alteradas = [{'_id': existentes[k]['id'], **{f'_{c}': linha[c] for c in colunas}} for k, linha in alvo.items()
+                 if k in existentes and any(valor_comparavel(existentes[k][c]) != valor_comparavel(linha[c]) for c in colunas)]
+    if novas:
+        extras = na_insercao() if na_insercao else {}
+        conn.execute(insert(tabela), [dict(linha, **extras) for linha in novas])
+    if alteradas:
+        conn.execute(update(tabela).where(tabela.c.id == bindparam('_id')).values({c: bindparam(f'_{c}') for c in colunas}), alteradas)
+    ids = {k: linha['id'] for k, linha in existentes.items()}
+    if novas: ids.update((chave(linha), linha['id']) for linha in conn.execute(select(tabela.c.id, *(tabela.c[c] for c in chaves)).where(filtro)).mappings())
+    return Sincronia(ids, [ids[chave(linha)] for linha in novas], [linha['_id'] for linha in alteradas])
+
+def hash_fixture(senha):
+    """Hash de senha das fixtures, reaproveitado de instance/seed_hashes.json enquanto PASSWORD_HASH_METHOD não mudar."""
+    caminho = os.path.join(current_app.instance_path, 'seed_hashes.json')
+    chave = f"{current_app.config['PASSWORD_HASH_METHOD']}:{hashlib.sha256(senha.encode()).hexdigest()}"
+    try:
+        with open(caminho, encoding='utf-8') as arquivo: cache = json.load(arquivo)
+    except (OSError, ValueError): cache = {}
+    if chave not in cache:
+        cache[chave] = senhas().gerar(senha)
+        with open(caminho + '.tmp', 'w', encoding='utf-8') as arquivo: json.dump(cache, arquivo)
+        os.replace(caminho + '.tmp', caminho)
+    return cache[chave]
+
+def semear_fixtures():
+    """Sincroniza as fixtures com o banco e atualiza o que depende delas; retorna {tabela: (inseridas, alteradas)}."""
+    inicio_semana = date.today() - timedelta(days=date.today().weekday())
+    with db.engine.begin() as conn:
+        badges = sincronizar(conn, Badge, ('nome',), SEED_BADGES)
+        usuarios = sincronizar(conn, User, ('username',), SEED_USUARIOS, lambda: {'password_hash': hash_fixture(SEED_SENHA)})
+        clubes = sincronizar(conn, Clube, ('nome',), [{'nome': c['nome'], 'descricao': c['descricao'], 'categoria': c['categoria'],
+                                                        'lider_id': usuarios.ids.get(c['lider'])} for c in SEED_CLUBES])
+        membros = [{'user_id': usuarios.ids[u], 'clube_id': clubes.ids[c['nome']]} for c in SEED_CLUBES for u in c['membros']]
+        membros_novos = conn.execute(dialeto_dml(conn).insert(membros_clube_tabela).on_conflict_do_nothing(), membros).rowcount if membros else 0
+        eventos = sincronizar(conn, Evento, ('clube_id', 'titulo'), [{**{k: v for k, v in e.items() if k != 'clube'}, 'clube_id': clubes.ids[e['clube']]}
+                                                                     for e in SEED_EVENTOS])
+        evento_por_titulo = {titulo: evento_id for (_, titulo), evento_id in eventos.ids.items()}
+        noticias = sincronizar(conn, Noticia, ('titulo',), [{'titulo': n['titulo'], 'conteudo': n['conteudo'], 'evento_id': evento_por_titulo.get(n['evento'])}
+                                                            for n in SEED_NOTICIAS])
+        cardapio_semana = [dict(SEED_CARDAPIO, data=inicio_semana + timedelta(days=i)) for i in range(5)]
+        cardapio = sincronizar(conn, CardapioRU, ('data',), cardapio_semana)
+        calendario = sincronizar(conn, CalendarioAcademico, ('data', 'descricao'), SEED_CALENDARIO)
+        visoes = {('semana', linha['data']) for linha in cardapio_semana if cardapio.inseridos or cardapio.alterados}
+        visoes |= {('mes', linha['data']) for linha in SEED_CALENDARIO if calendario.inseridos or calendario.alterados}
+        materializar_visoes(conn, visoes)
+    # Os inserts acima não passam pela sessão, então busca, feed, contadores e selos são atualizados aqui, só para o que mudou.
+    documentos = {}
+    for modelo, sincronia in ((Clube, clubes), (Evento, eventos), (Noticia, noticias)):
+        ids = sincronia.inseridos + sincronia.alterados
+        for obj in modelo.query.filter(modelo.id.in_(ids)) if ids else ():
+            documentos[rowid_busca(BUSCA_MODELOS[modelo], obj.id)] = documento_busca(obj)
+    if documentos: escrever(gravar_busca, documentos)
+    novos_feed = [('evento', i) for i in eventos.inseridos] + [('noticia', i) for i in noticias.inseridos]
+    if novos_feed: escrever(distribuir_feed, novos_feed)
+    if usuarios.inseridos: preencher_feed(usuarios.inseridos)
+    if membros_novos or eventos.inseridos: rebuild_counters()
+    if badges.inseridos or usuarios.inseridos or membros_novos or eventos.inseridos: recalcular_selos()
+    resumo = {nome: (len(s.inseridos), len(s.alterados)) for nome, s in (('badge', badges), ('user', usuarios), ('clube', clubes), ('evento', eventos),
+              ('noticia', noticias), ('cardapio_ru', cardapio), ('calendario_academico', calendario))}
+    resumo['membros_clube'] = (membros_novos, 0)
+    return resumo
+
+@bp.cli.command('seed-db')
+@click.option('--recriar', is_flag=True, help='Apaga e recria todas as tabelas antes (perde tudo o que não for fixture).')
+def seed_db_command(recriar):
+    """Cria as tabelas que faltam e sincroniza as fixtures de demonstração; rodar de novo só grava o que mudou."""
+    inicio = time.perf_counter()
+    if recriar:
+        print("Limpando tabelas existentes...")
+        db.drop_all()
+        invalidar_selos()
     db.create_all()
-    print("Criando selos (badges)...")
-    badges = [
-        Badge(nome='Membro Pioneiro', descricao='Um dos 10 primeiros usuários a se registrar na plataforma.', icon_class='fas fa-rocket'),
-        Badge(nome='Explorador de Clubes', descricao='Entrou no seu primeiro clube.', icon_class='fas fa-compass'),
-        Badge(nome='Socialite do Campus', descricao='Membro de 3 ou mais clubes.', icon_class='fas fa-users'),
-        Badge(nome='Participante Ativo', descricao='Inscreveu-se no seu primeiro evento.', icon_class='fas fa-calendar-check'),
-        Badge(nome='Entusiasta de Eventos', descricao='Participou de 5 ou mais eventos.', icon_class='fas fa-star'),
-        Badge(nome='Organizador de Eventos', descricao='Liderou um clube e criou um evento.', icon_class='fas fa-bullhorn'),
-        Badge(nome='Pioneiro do Fórum', descricao='Criou seu primeiro tópico em um fórum.', icon_class='fas fa-feather-alt')]
-    db.session.add_all(badges)
-    db.session.commit()
+    for coluna in sincronizar_esquema(): print(f"Coluna criada: {coluna}")
+    resumo = semear_fixtures()
+    for tabela, (inseridas, alteradas) in resumo.items():
+        if inseridas or alteradas: print(f"{tabela}: {inseridas} novas, {alteradas} alteradas")
+    if not any(i or a for i, a in resumo.values()): print("Fixtures já estavam em dia; nada foi gravado.")
+    print(f"Banco de dados populado com sucesso em {(time.perf_counter() - inicio) * 1000:.0f} ms!")
 
-    print("Criando usuários de exemplo...")
-    u1 = User(email='lider.prog@ifpb.edu.br', username='202511110001', password_hash=generate_password_hash('123456'))
-    u2 = User(email='membro.comum@ifpb.edu.br', username='202511110002', password_hash=generate_password_hash('123456'))
-    u3 = User(email='lider.teatro@ifpb.edu.br', username='202522220001', password_hash=generate_password_hash('123456'))
-    db.session.add_all([u1, u2, u3])
-    db.session.commit()
+@bp.cli.command('rebuild-counters')
+def rebuild_counters_command():
+    """Recalcula member_count/inscritos_count a partir de membros_clube e inscricao_evento."""
+    rebuild_counters()
+    print("Contadores de membros e inscritos recalculados.")
 
-    award_badge(u1, 'Membro Pioneiro', show_flash=False)
-    award_badge(u2, 'Membro Pioneiro', show_flash=False)
-    award_badge(u3, 'Membro Pioneiro', show_flash=False)
-    
-    print("Criando clubes...")
-    clube_prog = Clube(nome='Clube de Programação', descricao='Para entusiastas de código, desenvolvimento de software e competições.', categoria='Tecnologia', lider_id=u1.id)
-    clube_teatro = Clube(nome='Clube de Teatro', descricao='Explore a arte da atuação, expressão corporal e montagem de peças.', categoria='Arte & Cultura', lider_id=u3.id)
-    clube_esportes = Clube(nome='Clube de Esportes', descricao='Organização de treinos e campeonatos de diversas modalidades.', categoria='Esportes')
-    clube_robotica = Clube(nome='Clube de Robótica', descricao='Construção e programação de robôs para desafios e aprendizado.', categoria='Tecnologia')
-    clube_literatura = Clube(nome='Clube de Literatura', descricao='Leituras, debates e análises de obras clássicas e contemporâneas.', categoria='Arte & Cultura')
-    db.session.add_all([clube_prog, clube_teatro, clube_esportes, clube_robotica, clube_literatura])
-    db.session.commit()
+@bp.cli.command('recompute-badges')
+@click.option('--lote', default=500, help='Usuários avaliados por transação.')
+def recompute_badges_command(lote):
+    """Reavalia todas as regras de selos para todos os usuários (backfill em lotes)."""
+    print(f"{recalcular_selos(lote)} selos concedidos.")
 
-    clube_prog.membros.extend([u1, u2])
-    clube_teatro.membros.extend([u3, u2])
-    clube_robotica.membros.append(u1)
-    clube_literatura.membros.append(u2)
-    db.session.commit()
-    
-    award_badge(u1, 'Explorador de Clubes', show_flash=False)
-    award_badge(u2, 'Explorador de Clubes', show_flash=False)
-    award_badge(u3, 'Explorador de Clubes', show_flash=False)
-    
-    print("Criando eventos e notícias...")
-    # Eventos Futuros
-    e1 = Evento(titulo='Maratona de Programação', descricao='Resolva desafios de programação em equipe.', vagas=50, clube_id=clube_prog.id, data_evento=datetime(2025, 9, 10, 9, 0, 0, tzinfo=timezone.utc))
-    e2 = Evento(titulo='Oficina de Arduino', descricao='Aprenda os primeiros passos com a plataforma Arduino.', vagas=25, clube_id=clube_robotica.id, data_evento=datetime(2025, 9, 22, 14, 0, 0, tzinfo=timezone.utc))
-    e3 = Evento(titulo='Debate sobre "1984"', descricao='Análise da obra de George Orwell e suas implicações atuais.', vagas=30, clube_id=clube_literatura.id, data_evento=datetime(2025, 10, 5, 18, 30, 0, tzinfo=timezone.utc))
-    # Evento Passado
-    e_passado = Evento(titulo='Apresentação Teatral de Verão', descricao='Performance da peça "Sonho de uma Noite de Verão".', vagas=100, clube_id=clube_teatro.id, data_evento=datetime(2025, 7, 20, 19, 0, 0, tzinfo=timezone.utc))
-    db.session.add_all([e1, e2, e3, e_passado])
-    db.session.commit()
+# Tabelas de catálogo, com poucas linhas, em que ler tudo é o esperado (ex.: a lista de clubes).
+@configuracao
+def configurar_auditoria(app):
+    app.config.setdefault('DB_AUDIT_IGNORAR', {'clube', 'badge'})
 
-    # Notícias
-    n1 = Noticia(titulo='Inscrições Abertas para a Maratona de Programação!', conteudo='As inscrições para a maratona de programação já começaram. Monte sua equipe e participe!', evento_id=e1.id)
-    n2 = Noticia(titulo='Edital de Monitoria 2025.2', conteudo='Estão abertas as inscrições para o programa de monitoria. Os interessados devem procurar a coordenação do seu curso para mais informações sobre vagas e disciplinas disponíveis.')
-    n3 = Noticia(titulo='Vem aí a Oficina de Arduino!', conteudo='O Clube de Robótica convida a todos para uma oficina prática e introdutória sobre a plataforma Arduino. Não é necessário conhecimento prévio!', evento_id=e2.id)
-    n4 = Noticia(titulo='Novo Horário da Biblioteca', conteudo='Atenção, estudantes! A partir da próxima semana, a biblioteca funcionará em horário estendido, das 7h30 às 21h30, de segunda a sexta.')
-    n5 = Noticia(titulo='Relembre: Sucesso na Apresentação Teatral', conteudo='O Clube de Teatro agradece a presença de todos na incrível apresentação da peça "Sonho de uma Noite de Verão" que ocorreu no mês passado. Foi um sucesso de público e crítica!', evento_id=e_passado.id)
-    db.session.add_all([n1, n2, n3, n4, n5])
-    db.session.commit()
-    
-    award_badge(u1, 'Organizador de Eventos', show_flash=False)
-    
-    print("Criando cardápio e calendário...")
-    hoje = date.today()
-    start_of_week = hoje - timedelta(days=hoje.weekday())
-    for i in range(5):
-        menu = CardapioRU(data=start_of_week + timedelta(days=i), prato_principal='Frango Grelhado com Arroz e Feijão', vegetariano='Torta de Legumes', acompanhamento='Batata Doce Assada', salada='Mix de Folhas com Tomate', sobremesa='Fruta da Estação')
-        db.session.add(menu)
-    cal_events = [
-        CalendarioAcademico(data=date(2025, 8, 15), descricao="Início do Semestre Letivo 2025.2", tipo="Acadêmico"),
-        CalendarioAcademico(data=date(2025, 9, 7), descricao="Feriado Nacional - Independência do Brasil", tipo="Feriado")]
-    db.session.add_all(cal_events)
-    db.session.commit()
-    print("Banco de dados populado com sucesso!")
+def esquema_pendente():
+    """Tabelas, colunas e índices declarados nos modelos que não existem no banco."""
+    inspetor, faltando = inspect(db.engine), []
+    for tabela in db.metadata.sorted_tables:
+        if not inspetor.has_table(tabela.name):
+            faltando.append(tabela.name)
+            continue
+        colunas = {coluna['name'] for coluna in inspetor.get_columns(tabela.name)}
+        indices = {indice['name'] for indice in inspetor.get_indexes(tabela.name)}
+        faltando += [f'{tabela.name}.{coluna.name}' for coluna in tabela.columns if coluna.name not in colunas]
+        faltando += [indice.name for indice in tabela.indexes if indice.name not in indices]
+    return faltando
+
+def criar_indices():
+    """CREATE INDEX IF NOT EXISTS para cada índice declarado; retorna os nomes dos que não existiam."""
+    inspetor, criados = inspect(db.engine), []
+    with db.engine.begin() as conn:
+        for tabela in db.metadata.sorted_tables:
+            existentes = {indice['name'] for indice in inspetor.get_indexes(tabela.name)}
+            for indice in tabela.indexes:
+                conn.execute(CreateIndex(indice, if_not_exists=True))
+                if indice.name not in existentes: criados.append(indice.name)
+    return criados
+
+def rotas_de_amostra(user_id=None):
+    """(user_id, [(endpoint, url), ...]) das rotas GET com ids reais; o usuário padrão é membro do clube usado."""
+    topico = ForumTopico.query.order_by(ForumTopico.id).first()
+    clube_id = topico.clube_id if topico else db.session.execute(select(func.min(Clube.id))).scalar()
+    valores = {'clube_id': clube_id, 'topico_id': topico.id if topico else None,
+               'evento_id': db.session.execute(select(func.min(Evento.id))).scalar()}
+    if user_id is None:
+        mc = membros_clube_tabela.c
+        user_id = db.session.execute(select(mc.user_id).where(mc.clube_id == clube_id).limit(1)).scalar()
+    rotas = []
+    for regra in sorted(current_app.url_map.iter_rules(), key=lambda r: r.rule):
+        # streams SSE ficam abertos até LIVE_DURACAO_MAX_S, não dá para medir como página
+        if 'GET' not in regra.methods or regra.endpoint in ('static', 'main.asset', 'main.logout') or regra.endpoint.startswith('main.stream_') or any(valores.get(nome) is None for nome in regra.arguments): continue
+        url = regra.rule
+        for nome in regra.arguments: url = url.replace(f'<int:{nome}>', str(valores[nome]))
+        rotas.append((regra.endpoint, url))
+    rotas.append(('busca', '/busca?q=clube'))
+    return user_id, rotas
+
+def ler_server_timing(cabecalho):
+    """{'db': ms, 'render': ms, 'total': ms, 'consultas': n} a partir do cabeçalho gerado por registrar_medicao."""
+    metricas = {}
+    for parte in cabecalho.split(','):
+        nome, *campos = parte.strip().split(';')
+        for campo in campos:
+            chave, _, valor = campo.partition('=')
+            if chave == 'dur': metricas[nome] = float(valor)
+            elif chave == 'desc' and nome == 'db': metricas['consultas'] = int(valor.strip('"').split()[0])
+    return metricas
+
+@bp.cli.command('db-audit')
+@click.option('--user-id', type=int, default=None, help='Usuário logado nas requisições (padrão: um membro do clube auditado).')
+@click.option('--fix', '--criar-indices', 'corrigir', is_flag=True,
+              help='Antes de auditar, cria as tabelas, colunas e índices declarados nos modelos que faltam no banco atual.')
+def db_audit_command(user_id, corrigir):
+    """Confere colunas e índices dos modelos, roda cada rota GET, faz EXPLAIN QUERY PLAN das consultas dela e aponta table scans."""
+    if db.engine.dialect.name != 'sqlite': raise click.ClickException('A auditoria usa EXPLAIN QUERY PLAN do SQLite.')
+    if corrigir:
+        # O banco é criado por create_all (sem pasta de migrações), que não mexe em tabelas existentes.
+        db.create_all()
+        for coluna in sincronizar_esquema(): print(f"Coluna criada: {coluna}")
+        for indice in criar_indices(): print(f"Índice criado: {indice}")
+    faltando = esquema_pendente()
+    if faltando: raise click.ClickException(f"Faltam no banco: {', '.join(faltando)}. Rode 'flask db-audit --fix'.")
+    user_id, rotas = rotas_de_amostra(user_id)
+    capturadas = []
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith('SELECT'): capturadas.append((statement, parameters))
+
+    current_app.config['FRAGMENT_CACHE'] = 'nenhum'  # cada rota precisa executar as próprias consultas
+    current_app.config['JOBS_ENABLED'] = False  # as consultas do agendador não são da rota auditada
+    cliente = current_app.test_client()
+    with cliente.session_transaction() as sessao: sessao['user_id'] = user_id
+    problemas = 0
+    for _, url in rotas:
+        invalidar_identidade(user_id)
+        invalidar_ranking()
+        capturadas.clear()
+        event.listen(Engine, 'before_cursor_execute', capturar)
+        try: status = cliente.get(url).status_code
+        finally: event.remove(Engine, 'before_cursor_execute', capturar)
+        avisos, vistas = [], set()
+        with db.engine.connect() as conn:
+            for statement, parameters in capturadas:
+                if statement in vistas: continue
+                vistas.add(statement)
+                for linha in conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters):
+                    detalhe = linha[-1]
+                    scan = re.match(r'SCAN (\w+)$', detalhe)
+                    if scan and scan.group(1) not in current_app.config['DB_AUDIT_IGNORAR']: avisos.append(('SCAN', detalhe, statement))
+                    elif detalhe.startswith('USE TEMP B-TREE'): avisos.append(('SORT', detalhe, statement))
+        print(f"{url} [{status}] {len(vistas)} consultas distintas")
+        for tipo, detalhe, statement in avisos:
+            print(f"  {tipo:<5} {detalhe:<50} {' '.join(statement.split())[:100]}")
+        problemas += sum(1 for tipo, _, _ in avisos if tipo == 'SCAN')
+    if problemas: raise click.ClickException(f"{problemas} table scans encontrados.")
+    print("Nenhum table scan fora das tabelas de catálogo.")
+
+@bp.cli.command('loadtest-inscricoes')
+@click.option('--inscricoes', default=2000, help='Número de alunos tentando se inscrever ao mesmo tempo.')
+@click.option('--vagas', default=100, help='Vagas do evento de teste.')
+@click.option('--threads', default=50, help='Requisições simultâneas.')
+@click.option('--database-url', default=None, help='Banco descartável (padrão: SQLite/WAL temporário).')
+def loadtest_inscricoes_command(inscricoes, vagas, threads, database_url):
+    """Dispara inscrições simultâneas num evento e verifica que nenhuma vaga é vendida a mais."""
+    pasta = None
+    if database_url is None:
+        pasta = tempfile.mkdtemp(prefix='loadtest-')
+        database_url = f"sqlite:///{os.path.join(pasta, 'loadtest.db')}"
+    engine = create_engine(database_url, connect_args={'timeout': 60} if database_url.startswith('sqlite') else {})
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), [{'email': f'carga{i}@ifpb.edu.br', 'username': f'c{i}', 'password_hash': '-'} for i in range(inscricoes)])
+        primeiro = conn.execute(select(func.min(User.__table__.c.id)).where(User.__table__.c.username.like('c%'))).scalar()
+        clube_id = conn.execute(insert(Clube.__table__).values(nome=f'Clube de Carga {uuid.uuid4().hex[:8]}', descricao='-', categoria='Teste')).inserted_primary_key[0]
+        evento_id = conn.execute(insert(Evento.__table__).values(titulo='Maratona de Programação', descricao='-', vagas=vagas,
+                                 clube_id=clube_id, data_evento=datetime.now(timezone.utc))).inserted_primary_key[0]
+    resultados, lock, largada = Counter(), threading.Lock(), threading.Barrier(threads)
+
+    def aluno(indice):
+        if indice < threads: largada.wait()
+        with engine.begin() as conn: resultado = reservar_vaga(conn, primeiro + indice, evento_id)
+        with lock: resultados[resultado] += 1
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor: list(executor.map(aluno, range(inscricoes)))
+    duracao = time.perf_counter() - inicio
+    with engine.connect() as conn:
+        inscritos = conn.execute(select(func.count()).select_from(inscricao_evento_tabela).where(inscricao_evento_tabela.c.evento_id == evento_id)).scalar()
+        contador = conn.execute(select(Evento.__table__.c.inscritos_count).where(Evento.__table__.c.id == evento_id)).scalar()
+        na_fila = conn.execute(select(func.count()).select_from(lista_espera_tabela).where(lista_espera_tabela.c.evento_id == evento_id)).scalar()
+    engine.dispose()
+    print(f"{inscricoes} inscrições em {duracao:.2f}s ({inscricoes / duracao:.0f}/s) com {threads} threads em {engine.dialect.name}.")
+    print(f"Aceitas: {resultados[INSCRITO]}  Lista de espera: {resultados[LISTA_ESPERA]}  Vagas: {vagas}")
+    esperado = min(vagas, inscricoes)
+    if not (inscritos == contador == resultados[INSCRITO] == esperado and na_fila == inscricoes - esperado):
+        raise click.ClickException(f"Inconsistência: {inscritos} linhas, contador {contador}, {na_fila} na fila (esperado {esperado}).")
+    print("Nenhuma vaga vendida a mais.")
+
+@bp.cli.command('bench-db')
+@click.option('--operacoes', default=2000, help='Escritas por cenário.')
+@click.option('--threads', default=16, help='Threads escrevendo ao mesmo tempo.')
+def bench_db_command(operacoes, threads):
+    """Compara escritas/s num SQLite descartável: padrão, com PRAGMAs de produção e com a fila de escrita."""
+    cenarios = [('sqlite padrão', False, False), ('pragmas', True, False), ('pragmas + fila', True, True)]
+    originais = current_app.config['SQLITE_PRAGMAS'], current_app.config['SLOW_QUERY_MS']
+    current_app.config['SLOW_QUERY_MS'] = float('inf')  # espera por lock é o que está sendo medido
+    print(f"{'cenário':<16} {'tempo s':>8} {'escritas/s':>11} {'locked':>7}")
+    try:
+        for nome, pragmas, com_fila in cenarios:
+            current_app.config['SQLITE_PRAGMAS'] = pragmas
+            pasta = tempfile.mkdtemp(prefix='bench-db-')
+            engine = create_engine(f"sqlite:///{os.path.join(pasta, 'bench.db')}")
+            db.metadata.create_all(engine)
+            with engine.begin() as conn:
+                conn.execute(insert(User.__table__), [{'email': f'bench{i}@ifpb.edu.br', 'username': f'b{i}', 'password_hash': '-'} for i in range(operacoes)])
+                conn.execute(insert(Clube.__table__), [{'nome': f'Clube {i}', 'descricao': '-', 'categoria': 'Teste'} for i in range(10)])
+                conn.execute(insert(Evento.__table__), [{'titulo': f'Evento {i}', 'descricao': '-', 'vagas': operacoes, 'clube_id': i + 1,
+                                                         'data_evento': datetime.now(timezone.utc)} for i in range(10)])
+            fila = FilaEscrita(current_app._get_current_object(), engine) if com_fila else None
+
+            def operacao(i):
+                funcao = (entrar_clube, reservar_vaga)[i % 2]
+                try:
+                    if fila: fila.executar(funcao, i + 1, i % 10 + 1)
+                    else:
+                        with engine.begin() as conn: funcao(conn, i + 1, i % 10 + 1)
+                except OperationalError: return 1
+                return 0
+
+            inicio = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=threads) as executor: travadas = sum(executor.map(operacao, range(operacoes)))
+            duracao = time.perf_counter() - inicio
+            if fila: fila.parar()
+            engine.dispose()
+            shutil.rmtree(pasta, ignore_errors=True)
+            print(f"{nome:<16} {duracao:>8.2f} {operacoes / duracao:>11.0f} {travadas:>7}")
+    finally:
+        current_app.config['SQLITE_PRAGMAS'], current_app.config['SLOW_QUERY_MS'] = originais
+
+PALAVRAS_SINTETICAS = ('clube', 'evento', 'oficina', 'projeto', 'campus', 'robô', 'código', 'teatro', 'leitura', 'debate',
+                       'treino', 'campeonato', 'música', 'dança', 'xadrez', 'ciência', 'monitoria', 'palestra', 'feira', 'hackathon',
+                       'equipe', 'inscrição', 'horário', 'sala', 'laboratório', 'biblioteca', 'semana', 'reunião', 'prova', 'trabalho')
+CATEGORIAS_SINTETICAS = ('Tecnologia', 'Arte & Cultura', 'Esportes', 'Ciências', 'Idiomas', 'Voluntariado')
+
+@bp.cli.command('seed-scale')
+@click.option('--users', default=50000, help='Usuários sintéticos.')
+@click.option('--clubs', default=500, help='Clubes sintéticos.')
+@click.option('--events', default=5000, help='Eventos (cada um com uma notícia e inscrições).')
+@click.option('--posts', default=1e6, type=float, help='Respostas no fórum (aceita notação como 1e6).')
+@click.option('--topics', default=None, type=int, help='Tópicos no fórum (padrão: posts / 20).')
+@click.option('--clubes-por-usuario', default=3, help='Média de clubes por usuário.')
+@click.option('--lote', default=5000, help='Linhas por executemany/transação.')
+@click.option('--semente', default=42, help='Semente do gerador, para repetir o mesmo volume.')
+@click.option('--sem-busca', is_flag=True, help='Não reconstrói o índice de busca no final.')
+@click.option('--sem-feed', is_flag=True, help='Não preenche o feed dos usuários no final.')
+def seed_scale_command(users, clubs, events, posts, topics, clubes_por_usuario, lote, semente, sem_busca, sem_feed):
+    """Acrescenta dados sintéticos em volume, com inserts em lote direto nas tabelas (sem ORM)."""
+    aleatorio = random.Random(semente)
+    posts = int(posts)
+    topics = max(posts // 20, 1) if topics is None else topics
+    agora = datetime.now(timezone.utc)
+    senha = senhas().gerar('123456')
+    inicio_total = time.perf_counter()
+
+    def frase(n): return ' '.join(aleatorio.choices(PALAVRAS_SINTETICAS, k=n)).capitalize()
+    def quando(dias_antes, dias_depois=0): return agora + timedelta(days=aleatorio.uniform(-dias_antes, dias_depois))
+    def faixa(modelo, n):
+        primeiro = (db.session.execute(select(func.max(modelo.id))).scalar() or 0) + 1
+        return range(primeiro, primeiro + n)
+
+    def inserir(rotulo, tabela, linhas):
+        inicio, total = time.perf_counter(), 0
+        for bloco in iter(lambda: list(itertools.islice(linhas, lote)), []):
+            with db.engine.begin() as conn: conn.execute(insert(tabela), bloco)
+            total += len(bloco)
+        duracao = time.perf_counter() - inicio
+        print(f"{rotulo:<22} {total:>9} linhas em {duracao:6.1f}s ({total / max(duracao, 1e-9):,.0f}/s)")
+
+    usuarios, clubes, eventos, topicos = faixa(User, users), faixa(Clube, clubs), faixa(Evento, events), faixa(ForumTopico, topics)
+    # Popularidade em lei de potência: poucos clubes (e tópicos) grandes, muitos pequenos.
+    pesos_clubes = list(itertools.accumulate(1 / (k + 1) for k in range(clubs)))
+    pesos_topicos = list(itertools.accumulate(1 / (k + 1) for k in range(topics)))
+    inserir('usuários', User.__table__, ({'id': i, 'email': f'sintetico{i}@ifpb.edu.br', 'username': f'S{i:011d}', 'password_hash': senha}
+                                           for i in usuarios))
+    inserir('clubes', Clube.__table__, ({'id': i, 'nome': f'Clube Sintético {i}', 'descricao': frase(12), 'lider_id': aleatorio.choice(usuarios),
+                                         'categoria': aleatorio.choice(CATEGORIAS_SINTETICAS)} for i in clubes))
+    inserir('membros', membros_clube_tabela, ({'user_id': u, 'clube_id': c, 'data_entrada': quando(365)} for u in usuarios
+                                              for c in set(aleatorio.choices(clubes, cum_weights=pesos_clubes, k=aleatorio.randint(0, 2 * clubes_por_usuario)))))
+    vagas = {e: aleatorio.randint(20, 200) for e in eventos}
+    inserir('eventos', Evento.__table__, ({'id': e, 'titulo': frase(3), 'descricao': frase(20), 'vagas': vagas[e], 'data_evento': quando(180, 180),
+                                           'clube_id': aleatorio.choices(clubes, cum_weights=pesos_clubes)[0]} for e in eventos))
+    inserir('notícias', Noticia.__table__, ({'titulo': f'Novo Evento: {frase(3)}', 'conteudo': frase(40), 'evento_id': e, 'data_publicacao': quando(180)}
+                                            for e in eventos))
+    inserir('inscrições', inscricao_evento_tabela, ({'user_id': u, 'evento_id': e} for e in eventos
+                                                     for u in aleatorio.sample(usuarios, min(len(usuarios), aleatorio.randint(0, vagas[e])))))
+    inserir('tópicos', ForumTopico.__table__, ({'id': t, 'titulo': frase(5), 'conteudo': frase(40), 'data_criacao': quando(365), 'user_id': aleatorio.choice(usuarios),
+                                                'clube_id': aleatorio.choices(clubes, cum_weights=pesos_clubes)[0]} for t in topicos))
+    inserir('respostas', ForumPost.__table__, ({'conteudo': frase(25), 'data_criacao': quando(365), 'user_id': aleatorio.choice(usuarios),
+                                                'topico_id': aleatorio.choices(topicos, cum_weights=pesos_topicos)[0]} for _ in range(posts)))
+    print("Recalculando contadores e selos...")
+    rebuild_counters()
+    recalcular_selos()
+    invalidar_ranking()
+    if not sem_busca: print(f"{reindexar_busca()} documentos indexados para busca.")
+    if not sem_feed: print(f"{preencher_feed()} entregas gravadas no feed.")
+    print(f"Concluído em {time.perf_counter() - inicio_total:.1f}s. Senha dos usuários sintéticos: 123456.")
+
+@bp.cli.command('bench-routes')
+@click.option('--requisicoes', default=30, help='Requisições medidas por rota (depois de uma de aquecimento).')
+@click.option('--saida', type=click.Path(dir_okay=False), default=None, help='JSON do resultado (padrão: instance/bench/rotas-<data>.json).')
+@click.option('--baseline', type=click.Path(exists=True, dir_okay=False), default=None, help='Resultado anterior para comparar.')
+@click.option('--tolerancia', default=0.2, help='Piora aceita no p95 antes de acusar regressão (0.2 = 20%).')
+@click.option('--folga-ms', default=2.0, help='Piora absoluta no p95 ignorada (rotas de 1 ms variam muito em %).')
+@click.option('--sem-cache', is_flag=True, help='Desliga o cache de fragmentos durante a medição.')
+@click.option('--user-id', type=int, default=None, help='Usuário logado (padrão: um membro do clube usado).')
+def bench_routes_command(requisicoes, saida, baseline, tolerancia, folga_ms, sem_cache, user_id):
+    """Mede p50/p95/p99 e consultas de cada rota GET pelo test client, grava em JSON e compara com uma baseline."""
+    if sem_cache: current_app.config['FRAGMENT_CACHE'] = 'nenhum'
+    current_app.config['SLOW_QUERY_MS'] = float('inf')
+    user_id, rotas = rotas_de_amostra(user_id)
+    cliente = current_app.test_client()
+    with cliente.session_transaction() as sessao: sessao['user_id'] = user_id
+    volume = {modelo.__tablename__: db.session.execute(select(func.count()).select_from(modelo)).scalar()
+              for modelo in (User, Clube, Evento, Noticia, ForumTopico, ForumPost)}
+    resultado = {'gerado_em': datetime.now(timezone.utc).isoformat(), 'requisicoes': requisicoes, 'cache': not sem_cache,
+                 'volume': volume, 'rotas': {}}
+    print(f"{'rota':<36} {'status':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'db ms':>7} {'consultas':>9}")
+    for endpoint, url in rotas:
+        cliente.get(url)
+        tempos, tempos_db, consultas, status = [], [], [], None
+        for _ in range(requisicoes):
+            inicio = time.perf_counter()
+            resposta = cliente.get(url)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+            metricas = ler_server_timing(resposta.headers.get('Server-Timing', ''))
+            tempos_db.append(metricas.get('db', 0.0))
+            consultas.append(metricas.get('consultas', 0))
+            status = resposta.status_code
+        tempos.sort()
+        linha = {'endpoint': endpoint, 'status': status, 'p50_ms': round(percentil(tempos, 50), 2), 'p95_ms': round(percentil(tempos, 95), 2),
+                 'p99_ms': round(percentil(tempos, 99), 2), 'db_ms': round(sum(tempos_db) / len(tempos_db), 2),
+                 'consultas': round(sum(consultas) / len(consultas), 1)}
+        resultado['rotas'][url] = linha
+        print(f"{url:<36} {status:>6} {linha['p50_ms']:>8.1f} {linha['p95_ms']:>8.1f} {linha['p99_ms']:>8.1f} {linha['db_ms']:>7.1f} {linha['consultas']:>9.1f}")
+    saida = saida or os.path.join(current_app.instance_path, 'bench', f"rotas-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, 'w', encoding='utf-8') as arquivo: json.dump(resultado, arquivo, ensure_ascii=False, indent=2)
+    print(f"Resultado gravado em {saida}")
+    if not baseline: return
+    with open(baseline, encoding='utf-8') as arquivo: anterior = json.load(arquivo)['rotas']
+    regressoes = []
+    print(f"\n{'rota':<36} {'p95 base':>9} {'p95 atual':>9} {'variação':>9} {'consultas':>11}")
+    for url, atual in resultado['rotas'].items():
+        base = anterior.get(url)
+        if base is None: continue
+        variacao = atual['p95_ms'] / base['p95_ms'] - 1 if base['p95_ms'] else 0.0
+        piorou = (variacao > tolerancia and atual['p95_ms'] - base['p95_ms'] > folga_ms) or atual['consultas'] > base['consultas']
+        if piorou: regressoes.append(url)
+        print(f"{url:<36} {base['p95_ms']:>9.1f} {atual['p95_ms']:>9.1f} {variacao:>+9.0%} {base['consultas']:>5} -> {atual['consultas']:<4}"
+              + ('  <-- regressão' if piorou else ''))
+    if regressoes: raise click.ClickException(f"{len(regressoes)} rotas pioraram em relação a {baseline}.")
+    print("Nenhuma regressão em relação à baseline.")
+
+class ComandosMigracao(click.Group):
+    """'flask db ...' do Flask-Migrate. Alembic só é importado quando o grupo é chamado, não a cada comando da CLI."""
+
+    def _grupo(self, ctx):
+        from flask.cli import ScriptInfo
+        from flask_migrate import Migrate, cli
+        app = ctx.ensure_object(ScriptInfo).load_app()
+        if 'migrate' not in app.extensions: Migrate(app, db)
+        return cli.db
+
+    def list_commands(self, ctx): return self._grupo(ctx).list_commands(ctx)
+
+    def get_command(self, ctx, nome): return self._grupo(ctx).get_command(ctx, nome)
+
+@bp.cli.group('db', cls=ComandosMigracao)
+@click.option('-d', '--directory', default=None, help='Pasta dos scripts de migração (padrão: "migrations").')
+@click.option('-x', '--x-arg', multiple=True, help='Argumentos extras para um env.py customizado.')
+def db_command(directory, x_arg):
+    """Migrações do banco (Flask-Migrate)."""
+    g.directory, g.x_arg = directory, x_arg  # lidos por Migrate.get_config(), como no grupo original
+
+# --- FÁBRICA DA APLICAÇÃO ---
+def create_app(config=None, instance_path=None):
+    """Cria a aplicação: lê o .env, aplica config por cima e depois as funções @configuracao na ordem de import dos módulos."""
+    from dotenv import load_dotenv
+    load_dotenv()
+    app = Flask(__name__, instance_path=instance_path)
+    app.config.update(config or {})
+    os.makedirs(app.instance_path, exist_ok=True)
+    for configurar in CONFIGURACOES: configurar(app)
+    db.init_app(app)
+    app.register_blueprint(bp)
+    return app
 
 if __name__ == '__main__':
-    app.run(debug=True)
+    create_app().run(debug=True)
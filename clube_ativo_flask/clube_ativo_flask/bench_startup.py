@@ -0,0 +1,85 @@
+# Mede o tempo de partida a frio da aplicação com 'python -X importtime', em processos novos:
+#   import  - só importar o módulo app (o que todo comando e todo worker pagam);
+#   worker  - importar e chamar create_app(), o que um worker do gunicorn faz ao subir;
+#   cli     - um comando curto da CLI do Flask ('flask routes'), como um cron job.
+# Uso: python bench_startup.py [--repeticoes 5] [--saida r.json] [--baseline anterior.json]
+# Não importa o app neste processo, para não aquecer nada antes da medição.
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import click
+
+PASTA = os.path.dirname(os.path.abspath(__file__))
+CENARIOS = {
+    'import': ['-c', 'import app'],
+    'worker': ['-c', 'from app import create_app; create_app()'],
+    'cli': ['-m', 'flask', '--app', 'app', 'routes'],
+}
+
+def ler_importtime(saida_erro):
+    """(microssegundos somados de todos os imports, {módulo: cumulativo em us}) dos dois primeiros níveis, sem o próprio app."""
+    total, raizes = 0, {}
+    for linha in saida_erro.splitlines():
+        if not linha.startswith('import time:') or 'self [us]' in linha: continue
+        proprio, cumulativo, nome = linha[len('import time:'):].split('|', 2)
+        total += int(proprio)
+        if len(nome) - len(nome.lstrip()) <= 3 and nome.strip() != 'app': raizes[nome.strip()] = int(cumulativo)
+    return total, raizes
+
+def medir(argumentos):
+    inicio = time.perf_counter()
+    resultado = subprocess.run([sys.executable, '-X', 'importtime', *argumentos], cwd=PASTA, capture_output=True, text=True)
+    parede = (time.perf_counter() - inicio) * 1000
+    if resultado.returncode != 0: raise click.ClickException(f"{' '.join(argumentos)} falhou:\n{resultado.stderr[-2000:]}")
+    total, raizes = ler_importtime(resultado.stderr)
+    return parede, total / 1000, raizes
+
+@click.command()
+@click.option('--repeticoes', default=5, help='Execuções por cenário (depois de uma de aquecimento, que gera os .pyc).')
+@click.option('--cenario', 'cenarios', multiple=True, type=click.Choice(list(CENARIOS)), help='Cenários medidos (padrão: todos).')
+@click.option('--top', default=8, help='Módulos mais pesados listados por cenário.')
+@click.option('--saida', type=click.Path(dir_okay=False), default=None, help='JSON do resultado (padrão: instance/bench/startup-<data>.json).')
+@click.option('--baseline', type=click.Path(exists=True, dir_okay=False), default=None, help='Resultado anterior para comparar.')
+@click.option('--tolerancia', default=0.2, help='Piora aceita na mediana antes de acusar regressão (0.2 = 20%).')
+@click.option('--folga-ms', default=25.0, help='Piora absoluta ignorada (ruído de processo novo).')
+def bench_startup(repeticoes, cenarios, top, saida, baseline, tolerancia, folga_ms):
+    """Mede o tempo de partida a frio (import, worker e CLI) e compara com uma baseline."""
+    resultado = {'gerado_em': datetime.now().isoformat(), 'python': sys.version.split()[0], 'repeticoes': repeticoes, 'cenarios': {}}
+    for nome in cenarios or CENARIOS:
+        medir(CENARIOS[nome])
+        amostras = [medir(CENARIOS[nome]) for _ in range(repeticoes)]
+        paredes, imports = sorted(a[0] for a in amostras), sorted(a[1] for a in amostras)
+        raizes = {modulo: statistics.median(a[2].get(modulo, 0) for a in amostras) / 1000 for modulo in amostras[0][2]}
+        pesados = sorted(raizes.items(), key=lambda item: item[1], reverse=True)[:top]
+        resultado['cenarios'][nome] = {'parede_ms': round(statistics.median(paredes), 1), 'parede_min_ms': round(paredes[0], 1),
+                                       'imports_ms': round(statistics.median(imports), 1),
+                                       'mais_pesados': [[modulo, round(ms, 1)] for modulo, ms in pesados]}
+        linha = resultado['cenarios'][nome]
+        print(f"{nome:<8} parede {linha['parede_ms']:>7.1f} ms (mín {linha['parede_min_ms']:.1f})  imports {linha['imports_ms']:>7.1f} ms")
+        for modulo, ms in linha['mais_pesados']: print(f"           {ms:>7.1f} ms  {modulo}")
+    saida = saida or os.path.join(PASTA, 'instance', 'bench', f"startup-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, 'w', encoding='utf-8') as arquivo: json.dump(resultado, arquivo, ensure_ascii=False, indent=2)
+    print(f"Resultado gravado em {saida}")
+    if not baseline: return
+    with open(baseline, encoding='utf-8') as arquivo: anterior = json.load(arquivo)['cenarios']
+    regressoes = []
+    print(f"\n{'cenário':<8} {'base ms':>9} {'atual ms':>9} {'variação':>9}")
+    for nome, atual in resultado['cenarios'].items():
+        base = anterior.get(nome)
+        if base is None: continue
+        variacao = atual['parede_ms'] / base['parede_ms'] - 1 if base['parede_ms'] else 0.0
+        piorou = variacao > tolerancia and atual['parede_ms'] - base['parede_ms'] > folga_ms
+        if piorou: regressoes.append(nome)
+        print(f"{nome:<8} {base['parede_ms']:>9.1f} {atual['parede_ms']:>9.1f} {variacao:>+9.0%}" + ('  <-- regressão' if piorou else ''))
+    if regressoes: raise click.ClickException(f"{len(regressoes)} cenários pioraram em relação a {baseline}.")
+    print("Nenhuma regressão em relação à baseline.")
+
+if __name__ == '__main__':
+    bench_startup()
@@ -0,0 +1,100 @@
+import re
+import click
+from flask import current_app, url_for
+from sqlalchemy import event, text, DDL
+from sqlalchemy.orm import Session, joinedload
+from markupsafe import Markup, escape
+from nucleo import bp, db, codificar_cursor, decodificar_cursor, escrita_derivada
+from modelos import Clube, Evento, Noticia, ForumTopico, ForumPost
+
+# --- BUSCA (FTS5) ---
+# Tabela virtual busca_fts, atualizada após cada flush na mesma transação; 'flask search-reindex' reconstrói.
+# Tópicos e respostas guardam o clube e só aparecem para os membros dele.
+BUSCA_TIPOS = {'noticia': 1, 'evento': 2, 'clube': 3, 'topico': 4, 'post': 5}
+BUSCA_MODELOS = {Noticia: 'noticia', Evento: 'evento', Clube: 'clube', ForumTopico: 'topico', ForumPost: 'post'}
+BUSCA_DDL = ("CREATE VIRTUAL TABLE IF NOT EXISTS busca_fts USING fts5(titulo, corpo, tipo UNINDEXED, ref_id UNINDEXED, "
+             "clube_restrito UNINDEXED, topico_id UNINDEXED, rotulo UNINDEXED, tokenize='unicode61 remove_diacritics 2')")
+event.listen(db.metadata, 'after_create', DDL(BUSCA_DDL).execute_if(dialect='sqlite'))
+event.listen(db.metadata, 'before_drop', DDL('DROP TABLE IF EXISTS busca_fts').execute_if(dialect='sqlite'))
+
+def documento_busca(obj):
+    """(titulo, corpo, tipo, ref_id, clube_restrito, topico_id, rotulo) na ordem das colunas de busca_fts."""
+    if isinstance(obj, Noticia): return (obj.titulo, obj.conteudo, 'noticia', obj.id, None, None, obj.titulo)
+    if isinstance(obj, Evento): return (obj.titulo, obj.descricao, 'evento', obj.id, None, None, obj.titulo)
+    if isinstance(obj, Clube): return (obj.nome, f'{obj.categoria} {obj.descricao}', 'clube', obj.id, None, None, obj.nome)
+    if isinstance(obj, ForumTopico): return (obj.titulo, obj.conteudo, 'topico', obj.id, obj.clube_id, obj.id, obj.titulo)
+    return ('', obj.conteudo, 'post', obj.id, obj.topico.clube_id, obj.topico_id, f'Re: {obj.topico.titulo}')
+
+def rowid_busca(tipo, ref_id): return ref_id * 8 + BUSCA_TIPOS[tipo]
+
+def gravar_busca(conn, documentos):
+    """documentos: {rowid: documento ou None (remover)}."""
+    if conn.dialect.name != 'sqlite' or not documentos: return
+    conn.exec_driver_sql('DELETE FROM busca_fts WHERE rowid = ?', [(rowid,) for rowid in documentos])
+    novos = [(rowid, *doc) for rowid, doc in documentos.items() if doc is not None]
+    if novos: conn.exec_driver_sql('INSERT INTO busca_fts (rowid, titulo, corpo, tipo, ref_id, clube_restrito, topico_id, rotulo) '
+                                   'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', novos)
+
+@event.listens_for(Session, 'after_flush')
+def indexar_busca(session, contexto):
+    pendentes = {}
+    for obj in list(session.new) + list(session.dirty):
+        if type(obj) in BUSCA_MODELOS:
+            pendentes[rowid_busca(BUSCA_MODELOS[type(obj)], obj.id)] = documento_busca(obj)
+    for obj in session.deleted:
+        if type(obj) in BUSCA_MODELOS: pendentes[rowid_busca(BUSCA_MODELOS[type(obj)], obj.id)] = None
+    if pendentes: escrita_derivada(session, 'Índice de busca não atualizado; rode "flask search-reindex".', gravar_busca, pendentes)
+
+def reindexar_busca(lote=1000):
+    with db.engine.begin() as conn:
+        conn.exec_driver_sql('DROP TABLE IF EXISTS busca_fts')
+        conn.exec_driver_sql(BUSCA_DDL)
+    total = 0
+    for consulta in (Noticia.query, Evento.query, Clube.query, ForumTopico.query, ForumPost.query.options(joinedload(ForumPost.topico))):
+        documentos = {}
+        for obj in consulta.yield_per(lote):
+            documentos[rowid_busca(BUSCA_MODELOS[type(obj)], obj.id)] = documento_busca(obj)
+            if len(documentos) >= lote:
+                with db.engine.begin() as conn: gravar_busca(conn, documentos)
+                total, documentos = total + len(documentos), {}
+        with db.engine.begin() as conn: gravar_busca(conn, documentos)
+        total += len(documentos)
+    with db.engine.begin() as conn: conn.exec_driver_sql("INSERT INTO busca_fts (busca_fts) VALUES ('optimize')")
+    return total
+
+def expressao_fts(termos):
+    """Transforma o texto digitado numa consulta FTS5 segura: todas as palavras, a última como prefixo."""
+    palavras = re.findall(r'\w+', termos.lower())[:10]
+    if not palavras: return None
+    return ' '.join(f'"{p}"' for p in palavras[:-1]) + f' "{palavras[-1]}"*'
+
+def url_resultado(tipo, ref_id, clube_id, topico_id):
+    if tipo in ('topico', 'post'): return url_for('main.clube_detalhe_topico', clube_id=clube_id, topico_id=topico_id)
+    if tipo == 'evento': return url_for('main.detalhe_evento', evento_id=ref_id)
+    if tipo == 'clube': return url_for('main.detalhe_clube', clube_id=ref_id)
+    return url_for('main.noticias')
+
+def buscar(termos, user_id, cursor=None, por_pagina=None):
+    """Resultados ordenados por bm25 (título pesa 10x) e paginados por cursor; retorna (resultados, proximo_cursor)."""
+    por_pagina = por_pagina or current_app.config['ITENS_POR_PAGINA']
+    consulta = expressao_fts(termos)
+    if consulta is None: return [], None
+    posicao = decodificar_cursor(cursor) if cursor else None
+    linhas = db.session.execute(text(
+        "SELECT * FROM (SELECT rowid, tipo, ref_id, clube_restrito, topico_id, rotulo, bm25(busca_fts, 10.0, 1.0) AS nota, "
+        "snippet(busca_fts, -1, char(2), char(3), '…', 24) AS trecho FROM busca_fts WHERE busca_fts MATCH :consulta "
+        "AND (clube_restrito IS NULL OR clube_restrito IN (SELECT clube_id FROM membros_clube WHERE user_id = :user_id))) "
+        "WHERE :nota IS NULL OR nota > :nota OR (nota = :nota AND rowid > :rowid) ORDER BY nota, rowid LIMIT :limite"),
+        {'consulta': consulta, 'user_id': user_id, 'nota': posicao[0] if posicao else None,
+         'rowid': posicao[1] if posicao else None, 'limite': por_pagina + 1}).all()
+    resultados = [{'tipo': l.tipo, 'titulo': l.rotulo, 'url': url_resultado(l.tipo, l.ref_id, l.clube_restrito, l.topico_id),
+                   'trecho': Markup(str(escape(l.trecho)).replace('\x02', '<mark>').replace('\x03', '</mark>'))}
+                  for l in linhas[:por_pagina]]
+    proximo = codificar_cursor(linhas[por_pagina - 1].nota, linhas[por_pagina - 1].rowid) if len(linhas) > por_pagina else None
+    return resultados, proximo
+
+@bp.cli.command('search-reindex')
+@click.option('--lote', default=1000, help='Documentos gravados por transação.')
+def search_reindex_command(lote):
+    """Reconstrói a tabela FTS5 de busca a partir de notícias, eventos, clubes e fórum."""
+    print(f"{reindexar_busca(lote)} documentos indexados.")
@@ -0,0 +1,181 @@
+import os
+import json
+import queue
+import time
+import uuid
+import threading
+from datetime import datetime, timezone, timedelta
+from flask import current_app
+from sqlalchemy import select, insert, update
+from nucleo import bp, db, configuracao, extensao
+from modelos import membros_clube_tabela, User, MailOutbox
+
+# --- E-MAIL ---
+@configuracao
+def configurar_mail(app):
+    app.config.setdefault('MAIL_SERVER', os.getenv('MAIL_SERVER', 'smtp.googlemail.com'))
+    app.config.setdefault('MAIL_PORT', int(os.getenv('MAIL_PORT', 587)))
+    app.config.setdefault('MAIL_USE_TLS', os.getenv('MAIL_USE_TLS', 'true').lower() in ['true', '1', 't'])
+    app.config.setdefault('MAIL_USERNAME', os.getenv('MAIL_USERNAME'))
+    app.config.setdefault('MAIL_PASSWORD', os.getenv('MAIL_PASSWORD'))
+    app.config.setdefault('MAIL_DEFAULT_SENDER', ('Hub Comunitário', app.config['MAIL_USERNAME']))
+
+# --- FILA DE E-MAIL ---
+# Fila limitada consumida por um pool de threads, com lotes por conexão SMTP e novas tentativas com backoff.
+# MAIL_OUTBOX grava cada mensagem antes em mail_outbox ('flask mail-flush' reenvia); MAIL_BACKEND 'console'/'file' para testes.
+@configuracao
+def configurar_fila_email(app):
+    app.config.setdefault('MAIL_BACKEND', os.getenv('MAIL_BACKEND', 'smtp'))
+    app.config.setdefault('MAIL_OUTBOX', os.getenv('MAIL_OUTBOX', 'false').lower() in ['true', '1', 't'])
+    app.config.setdefault('MAIL_QUEUE_SIZE', int(os.getenv('MAIL_QUEUE_SIZE', 1000)))
+    app.config.setdefault('MAIL_WORKERS', int(os.getenv('MAIL_WORKERS', 2)))
+    app.config.setdefault('MAIL_BATCH_SIZE', 20)
+    app.config.setdefault('MAIL_MAX_TENTATIVAS', 5)
+    app.config.setdefault('MAIL_BACKOFF', 2.0)
+    app.config.setdefault('MAIL_IDLE_TIMEOUT', 30.0)
+    app.config.setdefault('MAIL_BCC_LOTE', 50)
+
+class DespachanteEmail:
+    def __init__(self, app):
+        self.app = app
+        self.fila = queue.Queue(maxsize=app.config['MAIL_QUEUE_SIZE'])
+        self.workers = []
+        self.lock = threading.Lock()
+
+    def iniciar(self):
+        # As threads nascem no primeiro envio, já dentro do processo worker (depois do fork).
+        with self.lock:
+            if self.workers: return
+            for i in range(self.app.config['MAIL_WORKERS']):
+                worker = threading.Thread(target=self._trabalhar, name=f'mail-{i}', daemon=True)
+                worker.start()
+                self.workers.append(worker)
+
+    def enfileirar(self, msg):
+        item = {'msg': msg, 'outbox_id': None, 'tentativas': 0}
+        if self.app.config['MAIL_OUTBOX']:
+            with db.engine.begin() as conn:
+                item['outbox_id'] = conn.execute(insert(MailOutbox.__table__).values(
+                    destinatarios=json.dumps(msg.recipients), bcc=json.dumps(msg.bcc), assunto=msg.subject, html=msg.html,
+                    tentativas=0, proxima_tentativa=datetime.now(timezone.utc))).inserted_primary_key[0]
+        self.iniciar()
+        try:
+            self.fila.put_nowait(item)
+        except queue.Full:
+            # Sem outbox, enviar na própria requisição é melhor que perder a mensagem.
+            self.app.logger.warning('Fila de e-mail cheia (%d).', self.fila.maxsize)
+            if item['outbox_id'] is None: self._enviar_lote([item], None)
+
+    def _trabalhar(self):
+        conexao = None
+        with self.app.app_context():
+            while True:
+                try:
+                    lote = [self.fila.get(timeout=self.app.config['MAIL_IDLE_TIMEOUT'])]
+                except queue.Empty:
+                    conexao = self._fechar(conexao)
+                    continue
+                while len(lote) < self.app.config['MAIL_BATCH_SIZE']:
+                    try: lote.append(self.fila.get_nowait())
+                    except queue.Empty: break
+                conexao = self._enviar_lote(lote, conexao)
+
+    def _fechar(self, conexao):
+        if conexao is not None:
+            try: conexao.__exit__(None, None, None)
+            except Exception: pass
+        return None
+
+    def _entregar(self, msg, conexao):
+        backend = self.app.config['MAIL_BACKEND']
+        if backend == 'console':
+            self.app.logger.info('E-mail para %s: %s', ', '.join(msg.recipients + msg.bcc), msg.subject)
+        elif backend == 'file':
+            obter_mail(self.app)  # Message.as_bytes() lê a configuração do Flask-Mail
+            dados, pasta = msg.as_bytes(), os.path.join(self.app.instance_path, 'mail')
+            os.makedirs(pasta, exist_ok=True)
+            with open(os.path.join(pasta, f'{time.time_ns()}-{uuid.uuid4().hex[:8]}.eml'), 'wb') as f: f.write(dados)
+        else:
+            if conexao is None:
+                conexao = obter_mail(self.app).connect()
+                conexao.__enter__()
+            conexao.send(msg)
+        return conexao
+
+    def _enviar_lote(self, lote, conexao):
+        for item in lote:
+            try:
+                conexao = self._entregar(item['msg'], conexao)
+                if item['outbox_id']: self._marcar(item, enviado_em=datetime.now(timezone.utc))
+            except Exception as erro:
+                conexao = self._fechar(conexao)
+                self._reagendar(item, erro)
+        return conexao
+
+    def _reagendar(self, item, erro):
+        item['tentativas'] += 1
+        espera = self.app.config['MAIL_BACKOFF'] * 2 ** (item['tentativas'] - 1)
+        if item['outbox_id']:
+            self._marcar(item, tentativas=item['tentativas'], erro=str(erro),
+                         proxima_tentativa=datetime.now(timezone.utc) + timedelta(seconds=espera))
+        if item['tentativas'] >= self.app.config['MAIL_MAX_TENTATIVAS']:
+            self.app.logger.error('E-mail "%s" descartado após %d tentativas: %s', item['msg'].subject, item['tentativas'], erro)
+            return
+        self.app.logger.warning('Falha ao enviar "%s" (tentativa %d), nova tentativa em %.0fs: %s', item['msg'].subject, item['tentativas'], espera, erro)
+        timer = threading.Timer(espera, self.fila.put, [item])
+        timer.daemon = True
+        timer.start()
+
+    def _marcar(self, item, **valores):
+        with db.engine.begin() as conn:
+            conn.execute(update(MailOutbox.__table__).where(MailOutbox.__table__.c.id == item['outbox_id']).values(**valores))
+
+    def reenviar_pendentes(self, lote=100):
+        """Envia de forma síncrona as mensagens pendentes da outbox; retorna quantas foram processadas."""
+        mo = MailOutbox.__table__.c
+        processadas, ultimo_id, conexao = 0, 0, None
+        while True:
+            linhas = db.session.execute(select(MailOutbox.__table__).where(mo.enviado_em.is_(None), mo.id > ultimo_id,
+                                        mo.tentativas < self.app.config['MAIL_MAX_TENTATIVAS'],
+                                        mo.proxima_tentativa <= datetime.now(timezone.utc)).order_by(mo.id).limit(lote)).all()
+            if not linhas: break
+            itens = [{'msg': criar_mensagem(l.assunto, l.html, json.loads(l.destinatarios), json.loads(l.bcc or '[]')),
+                      'outbox_id': l.id, 'tentativas': l.tentativas} for l in linhas]
+            conexao = self._enviar_lote(itens, conexao)
+            processadas += len(itens)
+            ultimo_id = linhas[-1].id
+        self._fechar(conexao)
+        return processadas
+
+def obter_mail(app):
+    """Flask-Mail só é importado e ligado à aplicação quando a primeira mensagem vai para o SMTP."""
+    if 'mail' not in app.extensions:
+        from flask_mail import Mail
+        Mail(app)
+    return app.extensions['mail']
+
+def criar_mensagem(assunto, html, recipients, bcc):
+    from flask_mail import Message
+    return Message(assunto, recipients=recipients, bcc=bcc, html=html, sender=current_app.config['MAIL_DEFAULT_SENDER'])
+
+def despachante_email(): return extensao('despachante_email', DespachanteEmail)
+
+def enviar_email(assunto, html, recipients=None, bcc=None):
+    despachante_email().enfileirar(criar_mensagem(assunto, html, recipients or [], bcc or []))
+
+def anunciar_evento(clube, evento, link):
+    """Avisa os membros do clube sobre um novo evento, em lotes de destinatários ocultos (BCC)."""
+    emails = db.session.scalars(select(User.email).join(membros_clube_tabela, membros_clube_tabela.c.user_id == User.id)
+                                .where(membros_clube_tabela.c.clube_id == clube.id, User.id != clube.lider_id)).all()
+    html = f'''<p>O {clube.nome} anunciou um novo evento: <strong>{evento.titulo}</strong>, em {evento.data_evento.strftime('%d/%m/%Y às %H:%M')}.</p>
+<p>{evento.descricao}</p>
+<p><a href="{link}">Garanta sua vaga</a></p>
+'''
+    lote = current_app.config['MAIL_BCC_LOTE']
+    for i in range(0, len(emails), lote):
+        enviar_email(f'Novo evento no {clube.nome}: {evento.titulo}', html, bcc=emails[i:i + lote])
+
+@bp.cli.command('mail-flush')
+def mail_flush_command():
+    """Envia as mensagens pendentes da tabela mail_outbox (ex.: após um reinício)."""
+    print(f"{despachante_email().reenviar_pendentes()} mensagens processadas.")
@@ -0,0 +1,96 @@
+import os
+import click
+from collections import defaultdict
+from flask import current_app
+from sqlalchemy import event, func, select, delete, literal, bindparam
+from sqlalchemy.orm import Session
+from nucleo import bp, db, configuracao, dialeto_dml, escrita_derivada
+from modelos import membros_clube_tabela, User, Evento, Noticia, ForumTopico, ForumPost, FeedItem, FEED_TIPOS
+
+# --- FEED POR USUÁRIO (FAN-OUT NA ESCRITA) ---
+# Eventos dos clubes do usuário, notícias do campus e respostas nos tópicos que abriu, copiados para
+# feed_item após o flush, na mesma transação; 'flask feed-backfill' preenche o passado.
+@configuracao
+def configurar_feed(app):
+    app.config.setdefault('FEED_MAX_ITENS', int(os.getenv('FEED_MAX_ITENS', 200)))
+
+FEED_MODELOS = {Noticia: 'noticia', Evento: 'evento', ForumPost: 'post'}
+FEED_COLUNAS = ('user_id', 'tipo', 'ref_id', 'clube_id', 'topico_id', 'titulo', 'resumo', 'criado_em')
+
+def fontes_feed(tipo):
+    """(consulta, coluna do id de origem, coluna do destinatário): todas as entregas do tipo, nas colunas FEED_COLUNAS."""
+    resumo = lambda coluna: func.substr(coluna, 1, 200)
+    nulo = literal(None, db.Integer)
+    if tipo == 'noticia':
+        consulta = select(User.id, literal(FEED_TIPOS[tipo]), Noticia.id, nulo, nulo, Noticia.titulo, resumo(Noticia.conteudo), Noticia.data_publicacao) \
+            .join_from(User, Noticia, Noticia.evento_id.is_(None))
+        return consulta, Noticia.id, User.id
+    if tipo == 'evento':
+        mc = membros_clube_tabela.c
+        anunciado = select(func.min(Noticia.data_publicacao)).where(Noticia.evento_id == Evento.id).scalar_subquery()
+        consulta = select(mc.user_id, literal(FEED_TIPOS[tipo]), Evento.id, Evento.clube_id, nulo, Evento.titulo, resumo(Evento.descricao),
+                          func.coalesce(anunciado, Evento.data_evento)).join_from(membros_clube_tabela, Evento, mc.clube_id == Evento.clube_id)
+        return consulta, Evento.id, mc.user_id
+    consulta = select(ForumTopico.user_id, literal(FEED_TIPOS[tipo]), ForumPost.id, ForumTopico.clube_id, ForumTopico.id,
+                      resumo('Re: ' + ForumTopico.titulo), resumo(ForumPost.conteudo), ForumPost.data_criacao) \
+        .join_from(ForumPost, ForumTopico, ForumPost.topico_id == ForumTopico.id).where(ForumPost.user_id != ForumTopico.user_id)
+    return consulta, ForumPost.id, ForumTopico.user_id
+
+def inserir_feed(conn, consulta):
+    """INSERT ... SELECT que ignora entregas repetidas (backfill e fan-out podem se sobrepor). A consulta precisa ter WHERE."""
+    dml = dialeto_dml(conn)
+    return conn.execute(dml.insert(FeedItem.__table__).from_select(FEED_COLUNAS, consulta).on_conflict_do_nothing()).rowcount
+
+def aparar_feed(conn, user_ids):
+    """Mantém só as FEED_MAX_ITENS entregas mais recentes de cada usuário (um range scan por usuário)."""
+    parametros = [{'u': user_id} for user_id in user_ids]
+    if not parametros: return
+    fi = FeedItem.__table__.c
+    excedentes = select(fi.id).where(fi.user_id == bindparam('u')).order_by(fi.criado_em.desc(), fi.id.desc()).offset(current_app.config['FEED_MAX_ITENS'])
+    conn.execute(delete(FeedItem.__table__).where(fi.user_id == bindparam('u'), fi.id.in_(excedentes)), parametros)
+
+def distribuir_feed(conn, novos=(), removidos=()):
+    """Apaga as entregas dos (tipo, id) removidos e entrega os novos."""
+    fi = FeedItem.__table__.c
+    for tipo, ref_id in removidos: conn.execute(delete(FeedItem.__table__).where(fi.tipo == FEED_TIPOS[tipo], fi.ref_id == ref_id))
+    por_tipo = defaultdict(list)
+    for tipo, ref_id in novos: por_tipo[tipo].append(ref_id)
+    for tipo, ids in por_tipo.items():
+        consulta, coluna_ref, _ = fontes_feed(tipo)
+        if inserir_feed(conn, consulta.where(coluna_ref.in_(ids))):
+            aparar_feed(conn, conn.execute(select(fi.user_id).distinct().where(fi.tipo == FEED_TIPOS[tipo], fi.ref_id.in_(ids))).scalars().all())
+
+@event.listens_for(Session, 'before_flush')
+def apagar_feed_de_usuarios(session, contexto, instancias):
+    if user_ids := [obj.id for obj in session.deleted if isinstance(obj, User)]:
+        session.connection().execute(delete(FeedItem.__table__).where(FeedItem.__table__.c.user_id.in_(user_ids)))
+
+@event.listens_for(Session, 'after_flush')
+def atualizar_feed(session, contexto):
+    novos = {(FEED_MODELOS[type(obj)], obj.id) for obj in session.new if type(obj) in FEED_MODELOS}
+    removidos = {(FEED_MODELOS[type(obj)], obj.id) for obj in session.deleted if type(obj) in FEED_MODELOS}
+    if novos or removidos: escrita_derivada(session, 'Feed não atualizado; rode "flask feed-backfill".', distribuir_feed, novos, removidos)
+
+def preencher_feed(user_ids=None, lote=500):
+    """Monta o feed a partir das tabelas de origem, em lotes de usuários; entregas já existentes são mantidas."""
+    if user_ids is None: user_ids = db.session.scalars(select(User.id).order_by(User.id)).all()
+    limite, total = current_app.config['FEED_MAX_ITENS'], 0
+    for i in range(0, len(user_ids), lote):
+        grupo = user_ids[i:i + lote]
+        with db.engine.begin() as conn:
+            for tipo in FEED_TIPOS:
+                consulta, _, coluna_user = fontes_feed(tipo)
+                origem = consulta.where(coluna_user.in_(grupo)).subquery()
+                c = dict(zip(FEED_COLUNAS, origem.c))
+                posicao = func.row_number().over(partition_by=c['user_id'], order_by=(c['criado_em'].desc(), c['ref_id'].desc())).label('posicao')
+                ranqueada = select(*origem.c, posicao).subquery()
+                total += inserir_feed(conn, select(*list(ranqueada.c)[:len(FEED_COLUNAS)]).where(ranqueada.c.posicao <= limite))
+            aparar_feed(conn, grupo)
+    return total
+
+@bp.cli.command('feed-backfill')
+@click.option('--user-id', type=int, multiple=True, help='Só estes usuários (pode repetir); padrão: todos.')
+@click.option('--lote', default=500, help='Usuários por transação.')
+def feed_backfill_command(user_id, lote):
+    """Preenche o feed dos usuários com notícias, eventos e respostas já existentes (pode rodar de novo)."""
+    print(f"{preencher_feed(list(user_id) or None, lote)} entregas gravadas no feed.")
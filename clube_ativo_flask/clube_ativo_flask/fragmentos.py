@@ -0,0 +1,147 @@
+import os
+import json
+import hashlib
+import time
+import tempfile
+import threading
+from collections import OrderedDict
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+from markupsafe import Markup
+from nucleo import configuracao, extensao
+
+# --- CACHE DE FRAGMENTOS ---
+# Miolo das páginas que mudam pouco, com a geração de cada tabela de que depende na chave: toda escrita
+# confirmada avança a geração, sem invalidação manual. FRAGMENT_CACHE: 'memoria', 'arquivos' ou 'nenhum'.
+# As gerações ficam sempre em arquivos de FRAGMENT_CACHE_DIR, então uma escrita num worker vale para os
+# outros da máquina também com 'memoria'; com várias máquinas a pasta precisa ser compartilhada.
+@configuracao
+def configurar_cache_fragmentos(app):
+    app.config.setdefault('FRAGMENT_CACHE', os.getenv('FRAGMENT_CACHE', 'memoria'))
+    app.config.setdefault('FRAGMENT_CACHE_TTL', int(os.getenv('FRAGMENT_CACHE_TTL', 300)))
+    app.config.setdefault('FRAGMENT_CACHE_MAX', int(os.getenv('FRAGMENT_CACHE_MAX', 512)))
+    app.config.setdefault('FRAGMENT_CACHE_DIR', os.getenv('FRAGMENT_CACHE_DIR', os.path.join(app.instance_path, 'cache')))
+
+def gravar_atomico(caminho, conteudo):
+    descritor, temporario = tempfile.mkstemp(dir=os.path.dirname(caminho), suffix='.part')
+    with os.fdopen(descritor, 'w', encoding='utf-8') as arquivo: arquivo.write(conteudo)
+    os.replace(temporario, caminho)
+
+class GeracoesArquivos:
+    """Geração de cada tabela em <pasta>/geracoes/<tabela>, lida e avançada por todos os processos."""
+
+    def __init__(self, pasta):
+        self.pasta = os.path.join(pasta, 'geracoes')
+        os.makedirs(self.pasta, exist_ok=True)
+
+    def geracao(self, tabela):
+        try:
+            with open(os.path.join(self.pasta, tabela), encoding='utf-8') as arquivo: return arquivo.read()
+        except OSError: return self.incrementar(tabela)  # pasta apagada: um valor novo, nunca um que já serviu de chave
+
+    def incrementar(self, tabela):
+        valor = str(time.time_ns())
+        try: gravar_atomico(os.path.join(self.pasta, tabela), valor)
+        except FileNotFoundError:
+            os.makedirs(self.pasta, exist_ok=True)
+            gravar_atomico(os.path.join(self.pasta, tabela), valor)
+        return valor
+
+class CacheMemoria:
+    def __init__(self, capacidade, geracoes):
+        self.capacidade, self.geracoes = capacidade, geracoes
+        self.itens = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, chave):
+        with self.lock:
+            item = self.itens.get(chave)
+            if item is None: return None
+            if item[0] < time.monotonic():
+                del self.itens[chave]
+                return None
+            self.itens.move_to_end(chave)
+            return item[1]
+
+    def set(self, chave, valor, ttl):
+        with self.lock:
+            self.itens[chave] = (time.monotonic() + ttl, valor)
+            self.itens.move_to_end(chave)
+            while len(self.itens) > self.capacidade: self.itens.popitem(last=False)
+
+    def geracao(self, tabela): return self.geracoes.geracao(tabela)
+
+    def incrementar(self, tabela): self.geracoes.incrementar(tabela)
+
+class CacheArquivos:
+    def __init__(self, pasta, ttl, geracoes):
+        self.pasta, self.ttl, self.geracoes, self.escritas = pasta, ttl, geracoes, 0
+
+    def _caminho(self, chave): return os.path.join(self.pasta, hashlib.sha1(chave.encode()).hexdigest() + '.json')
+
+    def get(self, chave):
+        try:
+            with open(self._caminho(chave), encoding='utf-8') as arquivo: expira, valor = json.load(arquivo)
+        except (OSError, ValueError): return None
+        return valor if expira >= time.time() else None
+
+    def set(self, chave, valor, ttl):
+        gravar_atomico(self._caminho(chave), json.dumps([time.time() + ttl, valor]))
+        self.escritas += 1
+        if self.escritas % 200 == 0: self.limpar()
+
+    def limpar(self):
+        """Apaga fragmentos vencidos (inclusive os de gerações antigas, que nunca mais serão lidos)."""
+        limite = time.time() - self.ttl
+        for entrada in os.scandir(self.pasta):
+            try:
+                if entrada.is_file() and entrada.stat().st_mtime < limite: os.remove(entrada.path)
+            except OSError: pass
+
+    def geracao(self, tabela): return self.geracoes.geracao(tabela)
+
+    def incrementar(self, tabela): self.geracoes.incrementar(tabela)
+
+def cache_fragmentos():
+    backend = current_app.config['FRAGMENT_CACHE']
+    if backend not in ('memoria', 'arquivos'): return None
+    def criar(app):
+        geracoes = GeracoesArquivos(app.config['FRAGMENT_CACHE_DIR'])
+        if backend == 'arquivos': return CacheArquivos(app.config['FRAGMENT_CACHE_DIR'], app.config['FRAGMENT_CACHE_TTL'], geracoes)
+        return CacheMemoria(app.config['FRAGMENT_CACHE_MAX'], geracoes)
+    return extensao(f'cache_fragmentos_{backend}', criar)
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def marcar_tabela_alterada(conn, cursor, statement, parameters, context, executemany):
+    if context is None or context.compiled is None or not (context.isinsert or context.isupdate or context.isdelete): return
+    tabela = getattr(context.compiled.statement, 'table', None)
+    if tabela is not None: conn.info.setdefault('tabelas_alteradas', set()).add(tabela.name)
+
+@event.listens_for(Engine, 'commit')
+def confirmar_tabelas_alteradas(conn):
+    alteradas = conn.info.pop('tabelas_alteradas', None)
+    if alteradas: conn.info.setdefault('tabelas_confirmadas', set()).update(alteradas)
+
+@event.listens_for(Engine, 'rollback')
+def descartar_tabelas_alteradas(conn): conn.info.pop('tabelas_alteradas', None)
+
+@event.listens_for(Pool, 'checkin')
+def avancar_geracoes(dbapi_connection, connection_record):
+    # Só depois do COMMIT: avançar antes deixaria outra requisição guardar dados velhos na geração nova.
+    confirmadas = connection_record.info.pop('tabelas_confirmadas', None) if connection_record is not None else None
+    cache = cache_fragmentos() if confirmadas and has_app_context() else None
+    if cache is not None:
+        for tabela in confirmadas: cache.incrementar(tabela)
+
+def fragmento(nome, tabelas, renderizar, *partes):
+    """HTML do fragmento, vindo do cache ou de renderizar(); partes são o que mais varia a chave (data, cursor)."""
+    cache = cache_fragmentos()
+    if cache is None: return Markup(renderizar())
+    chave = ':'.join(['fragmento', nome, *(f'{t}.{cache.geracao(t)}' for t in tabelas), *map(str, partes)])
+    html = cache.get(chave)
+    if html is None:
+        html = renderizar()
+        cache.set(chave, html, current_app.config['FRAGMENT_CACHE_TTL'])
+    return Markup(html)
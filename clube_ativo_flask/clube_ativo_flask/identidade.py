@@ -0,0 +1,43 @@
+import os
+import time
+import threading
+from collections import namedtuple
+from flask import current_app
+from sqlalchemy import select
+from nucleo import db, configuracao, extensao
+from modelos import inscricao_evento_tabela, membros_clube_tabela, User
+
+# --- CACHE DE IDENTIDADE ---
+# Usuário logado e ids dos seus clubes e eventos, só para exibição. O cache é por aplicação e processo: com vários
+# workers uma mudança feita em outro aparece aqui em até IDENTITY_CACHE_TTL segundos, por isso controle
+# de acesso e contadores consultam o banco (membro_do_clube()).
+Identidade = namedtuple('Identidade', 'user clube_ids evento_ids expira_em')
+
+@configuracao
+def configurar_identidade(app):
+    app.config.setdefault('IDENTITY_CACHE_TTL', int(os.getenv('IDENTITY_CACHE_TTL', 60)))
+
+_identidades_lock = threading.Lock()
+
+def identidades(): return extensao('identidades', lambda app: {})
+
+def carregar_identidade(user_id):
+    with _identidades_lock: identidade = identidades().get(user_id)
+    if identidade and identidade.expira_em > time.monotonic(): return identidade
+    user = db.session.get(User, user_id)
+    if user is None:
+        invalidar_identidade(user_id)
+        return None
+    clube_ids = db.session.scalars(select(membros_clube_tabela.c.clube_id).where(membros_clube_tabela.c.user_id == user_id))
+    evento_ids = db.session.scalars(select(inscricao_evento_tabela.c.evento_id).where(inscricao_evento_tabela.c.user_id == user_id))
+    db.session.expunge(user)
+    identidade = Identidade(user, frozenset(clube_ids), frozenset(evento_ids), time.monotonic() + current_app.config['IDENTITY_CACHE_TTL'])
+    with _identidades_lock: identidades()[user_id] = identidade
+    return identidade
+
+def invalidar_identidade(user_id):
+    with _identidades_lock: identidades().pop(user_id, None)
+
+def membro_do_clube(user_id, clube_id):
+    mc = membros_clube_tabela.c
+    return db.session.execute(select(mc.user_id).where(mc.user_id == user_id, mc.clube_id == clube_id)).first() is not None
@@ -0,0 +1,140 @@
+import csv
+import json
+import time
+import click
+from datetime import datetime, date
+from sqlalchemy import select
+from nucleo import bp, db, upsert
+from modelos import CardapioRU, CalendarioAcademico
+from visoes import VISOES_POR_MODELO, materializar_visoes
+
+# --- IMPORTAÇÃO E EXPORTAÇÃO (CARDÁPIO E CALENDÁRIO) ---
+# CSV com cabeçalho ou JSON Lines, validados linha a linha e gravados em lotes com upsert pela chave natural;
+# a exportação segue a ordem da chave, para dois arquivos poderem ser comparados com diff.
+DADOS_IMPORTAVEIS = {
+    'cardapio': (CardapioRU, ('data',)),
+    'calendario': (CalendarioAcademico, ('data', 'descricao')),
+}
+
+class LinhaInvalida(ValueError):
+    pass
+
+def converter_valor(coluna, bruto):
+    valor = bruto.strip() if isinstance(bruto, str) else bruto
+    if valor in (None, ''):
+        if not coluna.nullable: raise LinhaInvalida(f"'{coluna.name}' é obrigatório")
+        return None
+    if isinstance(coluna.type, db.Date):
+        for formato in ('%Y-%m-%d', '%d/%m/%Y'):
+            try: return datetime.strptime(str(valor), formato).date()
+            except ValueError: pass
+        raise LinhaInvalida(f"'{coluna.name}' não é uma data válida: {valor!r}")
+    valor = str(valor)
+    if coluna.type.length and len(valor) > coluna.type.length: raise LinhaInvalida(f"'{coluna.name}' passa de {coluna.type.length} caracteres")
+    return valor
+
+def ler_registros(arquivo, formato):
+    """Gera (número da linha, registro) sem carregar o arquivo; registro é None se a linha não for JSON."""
+    if formato == 'csv':
+        leitor = csv.DictReader(arquivo)
+        for registro in leitor: yield leitor.line_num, registro
+        return
+    for numero, linha in enumerate(arquivo, 1):
+        if not linha.strip(): continue
+        try: yield numero, json.loads(linha)
+        except ValueError: yield numero, None
+
+def validar_registro(colunas, registro):
+    if not isinstance(registro, dict): raise LinhaInvalida('a linha não é um objeto JSON')
+    desconhecidas = {str(nome) for nome in registro} - {c.name for c in colunas} - {'id'}
+    if desconhecidas: raise LinhaInvalida(f"colunas desconhecidas: {', '.join(sorted(desconhecidas))}")
+    return {c.name: converter_valor(c, registro.get(c.name)) for c in colunas}
+
+def importar_dados(nome, arquivo, formato, lote=500, dry_run=False):
+    """Retorna (linhas válidas, [(linha, erro), ...]); com dry_run só valida."""
+    modelo, chaves = DADOS_IMPORTAVEIS[nome]
+    colunas = [c for c in modelo.__table__.columns if c.name != 'id']
+    validas, erros, pendentes = 0, [], []
+
+    def gravar():
+        if pendentes and not dry_run:
+            with db.engine.begin() as conn:
+                upsert(conn, modelo.__table__, chaves, pendentes)
+                materializar_visoes(conn, {(VISOES_POR_MODELO[modelo], linha['data']) for linha in pendentes})
+        pendentes.clear()
+
+    for numero, registro in ler_registros(arquivo, formato):
+        try: pendentes.append(validar_registro(colunas, registro))
+        except LinhaInvalida as erro:
+            erros.append((numero, str(erro)))
+            continue
+        validas += 1
+        if len(pendentes) >= lote: gravar()
+    gravar()
+    return validas, erros
+
+def exportar_dados(nome, saida, formato, lote=1000):
+    modelo, chaves = DADOS_IMPORTAVEIS[nome]
+    tabela = modelo.__table__
+    colunas = [c for c in tabela.columns if c.name != 'id']
+    escritor = csv.DictWriter(saida, fieldnames=[c.name for c in colunas], lineterminator='\n') if formato == 'csv' else None
+    if escritor: escritor.writeheader()
+    total = 0
+    with db.engine.connect() as conn:
+        for linha in conn.execution_options(yield_per=lote).execute(select(*colunas).order_by(*(tabela.c[k] for k in chaves))):
+            registro = {chave: valor.isoformat() if isinstance(valor, date) else valor for chave, valor in linha._mapping.items()}
+            if escritor: escritor.writerow(registro)
+            else: saida.write(json.dumps(registro, ensure_ascii=False) + '\n')
+            total += 1
+    return total
+
+def executar_importacao(nome, arquivo, formato, lote, dry_run):
+    formato = formato or ('jsonl' if arquivo.name.endswith(('.jsonl', '.ndjson', '.json')) else 'csv')
+    inicio = time.perf_counter()
+    validas, erros = importar_dados(nome, arquivo, formato, lote, dry_run)
+    duracao = time.perf_counter() - inicio
+    for numero, erro in erros[:20]: click.echo(f"Linha {numero}: {erro}", err=True)
+    if len(erros) > 20: click.echo(f"... e mais {len(erros) - 20} linhas inválidas.", err=True)
+    acao = 'validadas (dry-run, nada gravado)' if dry_run else 'gravadas'
+    print(f"{validas} linhas {acao} em {duracao:.2f}s ({validas / max(duracao, 1e-9):.0f} linhas/s); {len(erros)} inválidas.")
+    if erros: raise click.ClickException(f"{len(erros)} linhas inválidas foram ignoradas.")
+
+def executar_exportacao(nome, saida, formato, lote):
+    formato = formato or ('jsonl' if saida.name.endswith(('.jsonl', '.ndjson', '.json')) else 'csv')
+    inicio = time.perf_counter()
+    total = exportar_dados(nome, saida, formato, lote)
+    click.echo(f"{total} linhas exportadas em {time.perf_counter() - inicio:.2f}s.", err=True)
+
+@bp.cli.command('import-cardapio')
+@click.argument('arquivo', type=click.File('r', encoding='utf-8-sig'))
+@click.option('--formato', type=click.Choice(['csv', 'jsonl']), default=None, help='Padrão: pela extensão do arquivo.')
+@click.option('--lote', default=500, help='Linhas por transação.')
+@click.option('--dry-run', is_flag=True, help='Só valida; não grava nada.')
+def import_cardapio_command(arquivo, formato, lote, dry_run):
+    """Importa o cardápio do RU de CSV/JSON Lines (upsert pela data)."""
+    executar_importacao('cardapio', arquivo, formato, lote, dry_run)
+
+@bp.cli.command('import-calendario')
+@click.argument('arquivo', type=click.File('r', encoding='utf-8-sig'))
+@click.option('--formato', type=click.Choice(['csv', 'jsonl']), default=None, help='Padrão: pela extensão do arquivo.')
+@click.option('--lote', default=500, help='Linhas por transação.')
+@click.option('--dry-run', is_flag=True, help='Só valida; não grava nada.')
+def import_calendario_command(arquivo, formato, lote, dry_run):
+    """Importa o calendário acadêmico de CSV/JSON Lines (upsert por data + descrição)."""
+    executar_importacao('calendario', arquivo, formato, lote, dry_run)
+
+@bp.cli.command('export-cardapio')
+@click.argument('saida', type=click.File('w', encoding='utf-8'), default='-')
+@click.option('--formato', type=click.Choice(['csv', 'jsonl']), default=None, help='Padrão: pela extensão (CSV na saída padrão).')
+@click.option('--lote', default=1000, help='Linhas lidas do banco por vez.')
+def export_cardapio_command(saida, formato, lote):
+    """Exporta o cardápio, ordenado por data, em CSV ou JSON Lines."""
+    executar_exportacao('cardapio', saida, formato, lote)
+
+@bp.cli.command('export-calendario')
+@click.argument('saida', type=click.File('w', encoding='utf-8'), default='-')
+@click.option('--formato', type=click.Choice(['csv', 'jsonl']), default=None, help='Padrão: pela extensão (CSV na saída padrão).')
+@click.option('--lote', default=1000, help='Linhas lidas do banco por vez.')
+def export_calendario_command(saida, formato, lote):
+    """Exporta o calendário acadêmico, ordenado por data, em CSV ou JSON Lines."""
+    executar_exportacao('calendario', saida, formato, lote)
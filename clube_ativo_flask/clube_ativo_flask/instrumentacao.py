@@ -0,0 +1,128 @@
+import os
+import json
+import time
+import threading
+from collections import defaultdict, deque
+from flask import current_app, has_app_context, request, g, has_request_context, before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from nucleo import bp, configuracao, extensao
+
+# --- INSTRUMENTAÇÃO DE DESEMPENHO ---
+# Consultas, tempo de banco e de renderização por requisição, no cabeçalho Server-Timing e no log;
+# as amostras de cada processo vão para instance/perf/<pid>.json, lidas pelo 'flask perf-report'.
+@configuracao
+def configurar_perf(app):
+    app.config.setdefault('SLOW_QUERY_MS', float(os.getenv('SLOW_QUERY_MS', 100)))
+    app.config.setdefault('PERF_WINDOW', int(os.getenv('PERF_WINDOW', 1000)))
+    app.config.setdefault('PERF_TOP_QUERIES', 3)
+    app.config.setdefault('PERF_FLUSH_EVERY', int(os.getenv('PERF_FLUSH_EVERY', 50)))
+    app.config.setdefault('QUERY_BUDGET', None)
+
+_perf_lock = threading.Lock()
+
+def amostras_perf():
+    """{'amostras': {endpoint: janela das últimas PERF_WINDOW requisições}, 'pendentes': n} da aplicação atual."""
+    return extensao('perf', lambda app: {'amostras': defaultdict(lambda: deque(maxlen=app.config['PERF_WINDOW'])), 'pendentes': 0})
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def inicio_consulta(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('perf_inicio', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def fim_consulta(conn, cursor, statement, parameters, context, executemany):
+    duracao = (time.perf_counter() - conn.info['perf_inicio'].pop()) * 1000
+    if has_app_context() and duracao >= current_app.config['SLOW_QUERY_MS']: current_app.logger.warning('Consulta lenta (%.1f ms): %s', duracao, statement)
+    if has_request_context() and 'perf' in g:
+        perf = g.perf
+        perf['consultas'] += 1
+        perf['db'] += duracao
+        perf['lentas'] = sorted(perf['lentas'] + [(duracao, statement)], reverse=True)[:current_app.config['PERF_TOP_QUERIES']]
+
+@event.listens_for(Engine, 'handle_error')
+def erro_consulta(contexto):
+    if contexto.connection is not None and contexto.connection.info.get('perf_inicio'): contexto.connection.info['perf_inicio'].pop()
+
+@before_render_template.connect
+def inicio_render(sender, template, context, **extra):
+    if 'perf' in g: g.perf['render_inicio'].append(time.perf_counter())
+
+@template_rendered.connect
+def fim_render(sender, template, context, **extra):
+    if 'perf' in g and g.perf['render_inicio']:
+        inicio = g.perf['render_inicio'].pop()
+        if not g.perf['render_inicio']: g.perf['render'] += (time.perf_counter() - inicio) * 1000
+
+@bp.before_app_request
+def iniciar_medicao():
+    g.perf = {'inicio': time.perf_counter(), 'consultas': 0, 'db': 0.0, 'render': 0.0, 'render_inicio': [], 'lentas': []}
+
+def query_budget(limite, escrita=None):
+    """Sobrescreve QUERY_BUDGET para os GET de uma rota; escrita é o orçamento dos outros métodos (verificado apenas em modo de teste)."""
+    def decorator(f):
+        f.query_budget, f.query_budget_escrita = limite, escrita
+        return f
+    return decorator
+
+@bp.after_app_request
+def registrar_medicao(response):
+    perf = g.get('perf')
+    if perf is None: return response
+    total = (time.perf_counter() - perf['inicio']) * 1000
+    endpoint = request.endpoint or '<sem rota>'
+    response.headers['Server-Timing'] = (f'db;dur={perf["db"]:.1f};desc="{perf["consultas"]} consultas", '
+                                         f'render;dur={perf["render"]:.1f}, total;dur={total:.1f}')
+    current_app.logger.info(json.dumps({'endpoint': endpoint, 'metodo': request.method, 'status': response.status_code,
+                                'total_ms': round(total, 1), 'db_ms': round(perf['db'], 1), 'render_ms': round(perf['render'], 1),
+                                'consultas': perf['consultas'], 'lentas': [[round(d, 1), s] for d, s in perf['lentas']]}))
+    registrar_amostra(endpoint, total, perf['db'], perf['consultas'])
+    if current_app.testing:
+        view = current_app.view_functions.get(request.endpoint)
+        if request.method in ('GET', 'HEAD'): limite = getattr(view, 'query_budget', current_app.config['QUERY_BUDGET'])
+        else: limite = getattr(view, 'query_budget_escrita', None)
+        if limite is not None and perf['consultas'] > limite:
+            raise AssertionError(f"{endpoint} executou {perf['consultas']} consultas (orçamento: {limite}).")
+    return response
+
+def registrar_amostra(endpoint, total, db_ms, consultas):
+    perf = amostras_perf()
+    with _perf_lock:
+        perf['amostras'][endpoint].append((total, db_ms, consultas))
+        perf['pendentes'] += 1
+        if perf['pendentes'] < current_app.config['PERF_FLUSH_EVERY']: return
+        perf['pendentes'] = 0
+        dados = {ep: list(amostras) for ep, amostras in perf['amostras'].items()}
+    gravar_amostras(dados)
+
+def gravar_amostras(dados):
+    pasta = os.path.join(current_app.instance_path, 'perf')
+    os.makedirs(pasta, exist_ok=True)
+    caminho = os.path.join(pasta, f'{os.getpid()}.json')
+    with open(caminho + '.tmp', 'w') as f: json.dump(dados, f)
+    os.replace(caminho + '.tmp', caminho)
+
+def percentil(valores_ordenados, p):
+    if not valores_ordenados: return 0.0
+    return valores_ordenados[min(len(valores_ordenados) - 1, int(round(p / 100 * (len(valores_ordenados) - 1))))]
+
+@bp.cli.command('perf-report')
+def perf_report_command():
+    """Mostra p50/p95/p99 por endpoint a partir das janelas gravadas pelos processos da aplicação."""
+    amostras, pasta = defaultdict(list), os.path.join(current_app.instance_path, 'perf')
+    if os.path.isdir(pasta):
+        for nome in os.listdir(pasta):
+            if not nome.endswith('.json'): continue
+            with open(os.path.join(pasta, nome)) as f:
+                for endpoint, valores in json.load(f).items(): amostras[endpoint].extend(valores)
+    with _perf_lock:
+        for endpoint, valores in amostras_perf()['amostras'].items(): amostras[endpoint].extend(valores)
+    if not amostras:
+        print("Nenhuma amostra de desempenho registrada ainda.")
+        return
+    print(f"{'endpoint':<28} {'n':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'db ms':>8} {'consultas':>9}")
+    for endpoint, valores in sorted(amostras.items(), key=lambda item: -percentil(sorted(v[0] for v in item[1]), 95)):
+        totais = sorted(v[0] for v in valores)
+        media_db = sum(v[1] for v in valores) / len(valores)
+        media_consultas = sum(v[2] for v in valores) / len(valores)
+        print(f"{endpoint:<28} {len(valores):>6} {percentil(totais, 50):>8.1f} {percentil(totais, 95):>8.1f} "
+              f"{percentil(totais, 99):>8.1f} {media_db:>8.1f} {media_consultas:>9.1f}")
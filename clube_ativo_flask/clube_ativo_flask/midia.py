@@ -0,0 +1,205 @@
+import os
+import re
+import atexit
+import hashlib
+import shutil
+import tempfile
+import subprocess
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, request, redirect, url_for, flash, abort, send_from_directory
+from werkzeug.utils import secure_filename, safe_join
+from nucleo import bp, db, configuracao, extensao
+from modelos import User, ClubeMedia
+from identidade import invalidar_identidade
+
+# --- CONFIGURAÇÃO DE UPLOADS ---
+UPLOAD_FOLDER = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'static/profile_pics')
+ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+
+CLUB_MEDIA_FOLDER = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'static/club_media')
+ALLOWED_MEDIA_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'pdf', 'mp4', 'mov', 'webp'}
+
+# As pastas são criadas por salvar_upload() na primeira gravação, não no import.
+@configuracao
+def configurar_uploads(app):
+    app.config.setdefault('UPLOAD_FOLDER', UPLOAD_FOLDER)
+    app.config.setdefault('CLUB_MEDIA_FOLDER', CLUB_MEDIA_FOLDER)
+
+def allowed_file(filename, allowed_set):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in allowed_set
+
+# --- PIPELINE DE UPLOAD ---
+# Cópia em blocos até MAX_UPLOAD_MB, tipo pelos primeiros bytes e nome pelo hash do conteúdo;
+# miniaturas e capas de vídeo são geradas depois, num pool de threads.
+@configuracao
+def configurar_pipeline_upload(app):
+    app.config.setdefault('MAX_UPLOAD_MB', int(os.getenv('MAX_UPLOAD_MB', 25)))
+    app.config['MAX_CONTENT_LENGTH'] = app.config['MAX_CONTENT_LENGTH'] or (app.config['MAX_UPLOAD_MB'] + 1) * 1024 * 1024
+    app.config.setdefault('UPLOAD_CHUNK_SIZE', 64 * 1024)
+    app.config.setdefault('MEDIA_WORKERS', int(os.getenv('MEDIA_WORKERS', 2)))
+    app.config.setdefault('THUMB_SIZE', 480)
+    app.config.setdefault('AVATAR_SIZE', 128)
+
+MIME_TYPES = {'png': 'image/png', 'jpg': 'image/jpeg', 'gif': 'image/gif', 'webp': 'image/webp',
+              'pdf': 'application/pdf', 'mp4': 'video/mp4', 'mov': 'video/quicktime'}
+
+class UploadInvalido(Exception):
+    pass
+
+def detectar_tipo(cabecalho):
+    if cabecalho.startswith(b'\x89PNG\r\n\x1a\n'): return 'png'
+    if cabecalho.startswith(b'\xff\xd8\xff'): return 'jpg'
+    if cabecalho[:6] in (b'GIF87a', b'GIF89a'): return 'gif'
+    if cabecalho[:4] == b'RIFF' and cabecalho[8:12] == b'WEBP': return 'webp'
+    if cabecalho.startswith(b'%PDF-'): return 'pdf'
+    if cabecalho[4:8] == b'ftyp': return 'mov' if cabecalho[8:12] == b'qt  ' else 'mp4'
+    return None
+
+def salvar_upload(file, pasta, permitidos, prefixo=''):
+    """Grava o upload em pasta/<prefixo><hash do conteúdo>.<tipo detectado>; retorna (filename, tipo, tamanho)."""
+    limite = current_app.config['MAX_UPLOAD_MB'] * 1024 * 1024
+    cabecalho = file.stream.read(current_app.config['UPLOAD_CHUNK_SIZE'])
+    tipo = detectar_tipo(cabecalho)
+    if tipo is None or tipo not in permitidos:
+        raise UploadInvalido(f"Tipo de arquivo inválido. Permitidos: {', '.join(sorted(permitidos))}")
+    os.makedirs(pasta, exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(dir=pasta, suffix='.part')
+    tamanho, digest = 0, hashlib.sha256()
+    try:
+        with os.fdopen(descritor, 'wb') as destino:
+            bloco = cabecalho
+            while bloco:
+                tamanho += len(bloco)
+                if tamanho > limite: raise UploadInvalido(f"Arquivo maior que o limite de {current_app.config['MAX_UPLOAD_MB']} MB.")
+                destino.write(bloco)
+                digest.update(bloco)
+                bloco = file.stream.read(current_app.config['UPLOAD_CHUNK_SIZE'])
+        filename = secure_filename(f'{prefixo}{digest.hexdigest()[:16]}.{tipo}')
+        # Mesmo conteúdo, mesmo nome: se o arquivo já existe, a cópia nova é descartada. O mtime é renovado
+        # para a limpeza de mídia órfã não apagar o arquivo antes do commit da linha que volta a usá-lo.
+        if os.path.exists(os.path.join(pasta, filename)):
+            os.remove(temporario)
+            os.utime(os.path.join(pasta, filename))
+        else: os.replace(temporario, os.path.join(pasta, filename))
+    except BaseException:
+        os.remove(temporario)
+        raise
+    return filename, tipo, tamanho
+
+_pillow = None
+
+def pillow_disponivel():
+    """Miniaturas são opcionais: sem Pillow as páginas usam o original. O import acontece no primeiro upload."""
+    global _pillow
+    if _pillow is None: _pillow = importlib.util.find_spec('PIL') is not None
+    return _pillow
+
+def criar_miniatura(origem, destino, lado):
+    from PIL import Image, ImageOps
+    with Image.open(origem) as imagem:
+        imagem = ImageOps.exif_transpose(imagem)
+        imagem.thumbnail((lado, lado))
+        if imagem.mode not in ('RGB', 'RGBA'): imagem = imagem.convert('RGBA')
+        imagem.save(destino, 'WEBP', quality=80, method=4)
+
+def extrair_capa_video(origem, destino):
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg is None: return False
+    resultado = subprocess.run([ffmpeg, '-y', '-loglevel', 'error', '-ss', '1', '-i', origem, '-frames:v', '1', destino], timeout=60)
+    return resultado.returncode == 0 and os.path.exists(destino)
+
+def processar_variantes(app, tipo_alvo, alvo_id, pasta, filename, tipo):
+    base = filename.rsplit('.', 1)[0]
+    origem = os.path.join(pasta, filename)
+    valores = {}
+    with app.app_context():
+        try:
+            if tipo_alvo == 'avatar' and pillow_disponivel():
+                criar_miniatura(origem, os.path.join(pasta, f'{base}_avatar.webp'), current_app.config['AVATAR_SIZE'])
+                valores['image_thumb'] = f'{base}_avatar.webp'
+            elif tipo in ('mp4', 'mov'):
+                if extrair_capa_video(origem, os.path.join(pasta, f'{base}_poster.jpg')):
+                    valores['poster_filename'] = f'{base}_poster.jpg'
+                    if pillow_disponivel():
+                        criar_miniatura(os.path.join(pasta, valores['poster_filename']), os.path.join(pasta, f'{base}_thumb.webp'), current_app.config['THUMB_SIZE'])
+                        valores['thumb_filename'] = f'{base}_thumb.webp'
+            elif tipo != 'pdf' and pillow_disponivel():
+                criar_miniatura(origem, os.path.join(pasta, f'{base}_thumb.webp'), current_app.config['THUMB_SIZE'])
+                valores['thumb_filename'] = f'{base}_thumb.webp'
+        except Exception:
+            current_app.logger.exception('Falha ao gerar variantes de %s', filename)
+        if not valores: return
+        if tipo_alvo == 'avatar':
+            # Só aplica se o usuário não trocou de foto enquanto a miniatura era gerada.
+            User.query.filter_by(id=alvo_id, image_file=filename).update(valores)
+            db.session.commit()
+            invalidar_identidade(alvo_id)
+        else:
+            ClubeMedia.query.filter_by(id=alvo_id).update(valores)
+            db.session.commit()
+
+def criar_pool_media(app):
+    pool = ThreadPoolExecutor(max_workers=app.config['MEDIA_WORKERS'], thread_name_prefix='media')
+    atexit.register(pool.shutdown)  # termina as miniaturas já aceitas antes de o processo sair
+    return pool
+
+def agendar_variantes(*args):
+    return extensao('pool_media', criar_pool_media).submit(processar_variantes, current_app._get_current_object(), *args)
+
+@bp.app_errorhandler(413)
+def upload_grande_demais(erro):
+    flash(f"Arquivo maior que o limite de {current_app.config['MAX_UPLOAD_MB']} MB.", 'danger')
+    return redirect(request.referrer or url_for('main.index'))
+
+# --- ASSETS COM HASH DE CONTEÚDO ---
+# asset_url() põe o hash do conteúdo na URL (css/style.<hash>.css), então /assets/ responde como immutable.
+@configuracao
+def configurar_assets(app):
+    app.config.setdefault('ASSET_MAX_AGE', 365 * 24 * 3600)
+
+ASSET_COM_HASH = re.compile(r'^(?P<nome>.+)\.(?P<hash>[0-9a-f]{12})(?P<ext>\.[A-Za-z0-9]+)$')
+UPLOAD_COM_HASH = re.compile(r'(?:^|/|_)(?P<hash>[0-9a-f]{16})(?:_[a-z]+)?\.[A-Za-z0-9]+$')
+
+def hash_asset(filename):
+    """Hash curto do arquivo em static/, recalculado só quando mtime ou tamanho mudam."""
+    caminho = safe_join(current_app.static_folder, filename)
+    try: info = os.stat(caminho)
+    except (TypeError, OSError): return None
+    versao = (info.st_mtime_ns, info.st_size)
+    hashes = extensao('hashes_assets', lambda app: {})
+    guardado = hashes.get(caminho)
+    if guardado is None or guardado[0] != versao:
+        digest = hashlib.sha256()
+        with open(caminho, 'rb') as arquivo:
+            for bloco in iter(lambda: arquivo.read(current_app.config['UPLOAD_CHUNK_SIZE']), b''): digest.update(bloco)
+        guardado = hashes[caminho] = (versao, digest.hexdigest()[:12])
+    return guardado[1]
+
+def asset_url(endpoint, **values):
+    """Mesma assinatura de url_for; para 'static' devolve a URL com hash em /assets/."""
+    filename = values.get('filename')
+    if endpoint != 'static' or not filename: return url_for(endpoint, **values)
+    if UPLOAD_COM_HASH.search(filename): return url_for('main.asset', **values)
+    digest = hash_asset(filename)
+    if digest is None: return url_for(endpoint, **values)
+    nome, ext = os.path.splitext(filename)
+    return url_for('main.asset', **dict(values, filename=f'{nome}.{digest}{ext}'))
+
+@bp.route('/assets/<path:filename>')
+def asset(filename):
+    encontrado = ASSET_COM_HASH.match(filename)
+    if encontrado:
+        real, etag = encontrado['nome'] + encontrado['ext'], encontrado['hash']
+        atual = hash_asset(real)
+        if atual is None: abort(404)
+        # URL antiga (o arquivo mudou desde que a página foi gerada): manda para a versão atual.
+        if atual != etag: return redirect(asset_url('static', filename=real))
+    else:
+        encontrado = UPLOAD_COM_HASH.search(filename)
+        if encontrado is None: abort(404)
+        real, etag = filename, encontrado['hash']
+    resposta = send_from_directory(current_app.static_folder, real, etag=etag, max_age=current_app.config['ASSET_MAX_AGE'])
+    resposta.cache_control.public = True
+    resposta.cache_control.immutable = True
+    return resposta
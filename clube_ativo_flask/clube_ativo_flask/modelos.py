@@ -0,0 +1,221 @@
+from datetime import datetime, timezone
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload, with_expression
+from itsdangerous import SignatureExpired
+from nucleo import db, serializer
+
+# --- 3. MODELOS DA BASE DE DADOS ---
+inscricao_evento_tabela = db.Table('inscricao_evento',
+    db.Column('user_id', db.Integer, db.ForeignKey('user.id'), primary_key=True),
+    db.Column('evento_id', db.Integer, db.ForeignKey('evento.id'), primary_key=True),
+    db.Index('ix_inscricao_evento_evento', 'evento_id')
+)
+membros_clube_tabela = db.Table('membros_clube',
+    db.Column('user_id', db.Integer, db.ForeignKey('user.id'), primary_key=True),
+    db.Column('clube_id', db.Integer, db.ForeignKey('clube.id'), primary_key=True),
+    db.Column('data_entrada', db.DateTime, nullable=True, default=lambda: datetime.now(timezone.utc)),
+    db.Index('ix_membros_clube_clube_data', 'clube_id', 'data_entrada')
+)
+lista_espera_tabela = db.Table('lista_espera',
+    db.Column('user_id', db.Integer, db.ForeignKey('user.id'), primary_key=True),
+    db.Column('evento_id', db.Integer, db.ForeignKey('evento.id'), primary_key=True),
+    db.Column('data_entrada', db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc)),
+    db.Index('ix_lista_espera_evento_data', 'evento_id', 'data_entrada')
+)
+# Mensagens do broker 'banco' do SSE (ao_vivo.py)
+mensagem_ao_vivo_tabela = db.Table('mensagem_ao_vivo',
+    db.Column('id', db.Integer, primary_key=True),
+    db.Column('canal', db.String(64), nullable=False),
+    db.Column('dados', db.Text, nullable=False),
+    db.Column('criado_em', db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+)
+user_badges_tabela = db.Table('user_badges',
+    db.Column('user_id', db.Integer, db.ForeignKey('user.id'), primary_key=True),
+    db.Column('badge_id', db.Integer, db.ForeignKey('badge.id'), primary_key=True),
+    db.Index('ix_user_badges_badge', 'badge_id')
+)
+
+class User(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    email = db.Column(db.String(120), unique=True, nullable=False)
+    username = db.Column(db.String(12), unique=True, nullable=False)
+    password_hash = db.Column(db.String(256), nullable=False)
+    image_file = db.Column(db.String(100), nullable=False, default='default.jpg')
+    image_thumb = db.Column(db.String(100), nullable=True)
+    eventos_inscritos = db.relationship('Evento', secondary=inscricao_evento_tabela, back_populates='alunos_inscritos', lazy='dynamic')
+    clubes_membro = db.relationship('Clube', secondary=membros_clube_tabela, back_populates='membros', lazy='dynamic')
+    clubes_liderados = db.relationship('Clube', backref='lider', lazy='dynamic', foreign_keys='Clube.lider_id')
+    topicos_criados = db.relationship('ForumTopico', backref='autor', lazy='dynamic', cascade="all, delete-orphan")
+    posts_criados = db.relationship('ForumPost', backref='autor', lazy='dynamic', cascade="all, delete-orphan")
+    badges = db.relationship('Badge', secondary=user_badges_tabela, back_populates='users', lazy='dynamic')
+    @property
+    def avatar_file(self): return self.image_thumb or self.image_file
+    def get_reset_token(self, expires_sec=1800): return serializer().dumps({'user_id': self.id}, salt='password-reset-salt')
+    @staticmethod
+    def verify_reset_token(token, expires_sec=1800):
+        try:
+            data = serializer().loads(token, salt='password-reset-salt', max_age=expires_sec)
+            return User.query.get(data['user_id'])
+        except (SignatureExpired, Exception): return None
+
+class Clube(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    nome = db.Column(db.String(100), unique=True, nullable=False)
+    descricao = db.Column(db.Text, nullable=False)
+    categoria = db.Column(db.String(50), nullable=False)
+    lider_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    member_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    membros = db.relationship('User', secondary=membros_clube_tabela, back_populates='clubes_membro', lazy='dynamic')
+    eventos = db.relationship('Evento', backref='clube_organizador', lazy='dynamic', cascade="all, delete-orphan")
+    forum_topicos = db.relationship('ForumTopico', backref='clube', lazy='dynamic', cascade="all, delete-orphan")
+    media_files = db.relationship('ClubeMedia', backref='clube', lazy='dynamic', cascade="all, delete-orphan")
+
+class Evento(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    titulo = db.Column(db.String(200), nullable=False)
+    descricao = db.Column(db.Text, nullable=False)
+    vagas = db.Column(db.Integer, nullable=False)
+    data_evento = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    clube_id = db.Column(db.Integer, db.ForeignKey('clube.id'), nullable=False)
+    inscritos_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    alunos_inscritos = db.relationship('User', secondary=inscricao_evento_tabela, back_populates='eventos_inscritos', lazy='dynamic')
+    noticias = db.relationship('Noticia', backref='evento', lazy='dynamic', cascade="all, delete-orphan")
+    __table_args__ = (db.Index('ix_evento_data_evento', 'data_evento', 'id'), db.Index('ix_evento_clube_data', 'clube_id', 'data_evento'))
+    @property
+    def vagas_restantes(self): return self.vagas - self.inscritos_count
+
+class Noticia(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    titulo = db.Column(db.String(200), nullable=False)
+    conteudo = db.Column(db.Text, nullable=False)
+    data_publicacao = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    evento_id = db.Column(db.Integer, db.ForeignKey('evento.id'), nullable=True)
+    __table_args__ = (db.Index('ix_noticia_data_publicacao', 'data_publicacao', 'id'), db.Index('ix_noticia_evento', 'evento_id'))
+
+class ForumTopico(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    titulo = db.Column(db.String(200), nullable=False)
+    conteudo = db.Column(db.Text, nullable=False)
+    data_criacao = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    clube_id = db.Column(db.Integer, db.ForeignKey('clube.id'), nullable=False)
+    posts = db.relationship('ForumPost', backref='topico', lazy='dynamic', cascade="all, delete-orphan")
+    n_respostas = db.query_expression()
+    __table_args__ = (db.Index('ix_forum_topico_clube_data', 'clube_id', 'data_criacao', 'id'),)
+
+class ForumPost(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    conteudo = db.Column(db.Text, nullable=False)
+    data_criacao = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    topico_id = db.Column(db.Integer, db.ForeignKey('forum_topico.id'), nullable=False)
+    __table_args__ = (db.Index('ix_forum_post_topico_data', 'topico_id', 'data_criacao', 'id'),)
+
+class Badge(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    nome = db.Column(db.String(50), unique=True, nullable=False)
+    descricao = db.Column(db.String(200), nullable=False)
+    icon_class = db.Column(db.String(50), nullable=False)
+    users = db.relationship('User', secondary=user_badges_tabela, back_populates='badges', lazy='dynamic')
+
+class CardapioRU(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    data = db.Column(db.Date, unique=True, nullable=False)
+    prato_principal = db.Column(db.String(150), nullable=False)
+    vegetariano = db.Column(db.String(150), nullable=False)
+    acompanhamento = db.Column(db.String(200), nullable=False)
+    salada = db.Column(db.String(150), nullable=False)
+    sobremesa = db.Column(db.String(100), nullable=False)
+
+class CalendarioAcademico(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    data = db.Column(db.Date, nullable=False)
+    descricao = db.Column(db.String(200), nullable=False)
+    tipo = db.Column(db.String(50), nullable=False)
+    # Chave natural usada pelo upsert de 'flask import-calendario'.
+    __table_args__ = (db.Index('ux_calendario_academico_data_descricao', 'data', 'descricao', unique=True),)
+
+# Semana do cardápio ('semana', '2025-W37') ou mês do calendário ('mes', '2025-09') já montado em JSON (visoes.py)
+class VisaoCalendario(db.Model):
+    tipo = db.Column(db.String(10), primary_key=True)
+    chave = db.Column(db.String(10), primary_key=True)
+    inicio = db.Column(db.Date, nullable=False)
+    dados = db.Column(db.Text, nullable=False)
+    etag = db.Column(db.String(16), nullable=False)
+    atualizado_em = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    __table_args__ = (db.Index('ix_visao_calendario_tipo_inicio', 'tipo', 'inicio'),)
+
+class MailOutbox(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    destinatarios = db.Column(db.Text, nullable=False)
+    bcc = db.Column(db.Text, nullable=True)
+    assunto = db.Column(db.String(200), nullable=False)
+    html = db.Column(db.Text, nullable=False)
+    tentativas = db.Column(db.Integer, nullable=False, default=0)
+    proxima_tentativa = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    enviado_em = db.Column(db.DateTime, nullable=True)
+    erro = db.Column(db.Text, nullable=True)
+    __table_args__ = (db.Index('ix_mail_outbox_pendentes', 'enviado_em', 'proxima_tentativa'),)
+
+class ClubeMedia(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(200), nullable=False)
+    descricao = db.Column(db.String(200), nullable=True)
+    mime_type = db.Column(db.String(50), nullable=True)
+    tamanho_bytes = db.Column(db.Integer, nullable=True)
+    thumb_filename = db.Column(db.String(200), nullable=True)
+    poster_filename = db.Column(db.String(200), nullable=True)
+    data_upload = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    clube_id = db.Column(db.Integer, db.ForeignKey('clube.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    uploader = db.relationship('User', backref='uploaded_media')
+    __table_args__ = (db.Index('ix_clube_media_clube_data', 'clube_id', 'data_upload'),)
+
+FEED_TIPOS = {'noticia': 1, 'evento': 2, 'post': 3}
+FEED_NOMES = {codigo: nome for nome, codigo in FEED_TIPOS.items()}
+
+class FeedItem(db.Model):
+    # Entrega do feed de um usuário (feed.py); título e resumo são copiados para a leitura não precisar de join.
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    tipo = db.Column(db.SmallInteger, nullable=False)
+    ref_id = db.Column(db.Integer, nullable=False)
+    clube_id = db.Column(db.Integer, nullable=True)
+    topico_id = db.Column(db.Integer, nullable=True)
+    titulo = db.Column(db.String(200), nullable=False)
+    resumo = db.Column(db.String(200), nullable=False)
+    criado_em = db.Column(db.DateTime, nullable=False)
+    __table_args__ = (db.Index('ix_feed_item_user_data', 'user_id', 'criado_em', 'id'),
+                      db.Index('ux_feed_item_user_tipo_ref', 'user_id', 'tipo', 'ref_id', unique=True),
+                      db.Index('ix_feed_item_tipo_ref', 'tipo', 'ref_id'))
+    @property
+    def tipo_nome(self): return FEED_NOMES[self.tipo]
+
+class Tarefa(db.Model):
+    # Execução do agendador (agendador.py); dono/travada_ate são o lease.
+    id = db.Column(db.Integer, primary_key=True)
+    nome = db.Column(db.String(64), nullable=False)
+    args = db.Column(db.Text, nullable=False, default='{}')
+    chave = db.Column(db.String(120), unique=True, nullable=True)
+    cron = db.Column(db.String(64), nullable=True)
+    proxima_execucao = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    dono = db.Column(db.String(64), nullable=True)
+    travada_ate = db.Column(db.DateTime, nullable=True)
+    tentativas = db.Column(db.Integer, nullable=False, default=0)
+    ultima_execucao = db.Column(db.DateTime, nullable=True)
+    concluida_em = db.Column(db.DateTime, nullable=True)
+    erro = db.Column(db.Text, nullable=True)
+    __table_args__ = (db.Index('ix_tarefa_pendentes', 'concluida_em', 'proxima_execucao'),)
+
+# --- PERFIS DE CARREGAMENTO DO FÓRUM ---
+# Autor no mesmo SELECT e número de respostas por subconsulta, sem N+1 nos templates.
+def respostas_por_topico():
+    return select(func.count(ForumPost.id)).where(ForumPost.topico_id == ForumTopico.id).correlate(ForumTopico).scalar_subquery()
+
+PERFIS_FORUM = {
+    'lista_topicos': lambda: (joinedload(ForumTopico.autor), with_expression(ForumTopico.n_respostas, respostas_por_topico())),
+    'topico': lambda: (joinedload(ForumTopico.autor),),
+    'thread': lambda: (joinedload(ForumPost.autor),),
+}
+
+def perfil_forum(nome): return PERFIS_FORUM[nome]()
@@ -0,0 +1,192 @@
+import os
+import json
+import queue
+import sqlite3
+import base64
+import threading
+import importlib.util
+from concurrent.futures import Future
+from datetime import datetime, date
+from flask import Blueprint, current_app, has_app_context
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import Select, event, or_, and_
+from sqlalchemy.engine import Engine
+from itsdangerous import URLSafeTimedSerializer
+
+# --- 1. CONFIGURAÇÃO DA APLICAÇÃO ---
+# Objetos compartilhados pelos módulos. create_app() (app.py) aplica as funções @configuracao na ordem de import.
+CONFIGURACOES = []
+bp = Blueprint('main', __name__, cli_group=None)
+db = SQLAlchemy()
+_extensoes_lock = threading.Lock()
+
+def configuracao(funcao):
+    CONFIGURACOES.append(funcao)
+    return funcao
+
+def extensao(nome, fabrica):
+    """Objeto da aplicação atual guardado em app.extensions[nome], criado por fabrica(app) no primeiro uso."""
+    app = current_app._get_current_object()
+    if nome not in app.extensions:
+        with _extensoes_lock:
+            if nome not in app.extensions: app.extensions[nome] = fabrica(app)
+    return app.extensions[nome]
+
+@configuracao
+def configurar_base(app):
+    app.config.setdefault('SQLALCHEMY_DATABASE_URI', os.getenv('DATABASE_URL', f"sqlite:///{os.path.join(app.instance_path, 'database.db')}"))
+    app.config.setdefault('SQLALCHEMY_TRACK_MODIFICATIONS', False)
+    # SECRET_KEY e MAX_CONTENT_LENGTH já existem (None) na configuração padrão do Flask, então setdefault não serve.
+    app.config['SECRET_KEY'] = app.config['SECRET_KEY'] or '77cd9b0684a5113200d4810755f4a9e5455a3c860df49cf7'
+
+def serializer():
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'])
+
+def dialeto_dml(conn):
+    """Módulo do dialeto (sqlite ou postgresql) com o insert que aceita ON CONFLICT, importado só quando usado."""
+    return importlib.import_module(f'sqlalchemy.dialects.{conn.dialect.name}')
+
+# --- MOTOR DO BANCO ---
+# URI e pool vêm do ambiente (DATABASE_URL, DB_POOL_*); em SQLite cada conexão recebe WAL e busy_timeout.
+@configuracao
+def configurar_motor(app):
+    app.config.setdefault('SQLITE_PRAGMAS', os.getenv('SQLITE_PRAGMAS', 'true').lower() in ['true', '1', 't'])
+    app.config.setdefault('SQLITE_BUSY_TIMEOUT_MS', int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000)))
+    app.config.setdefault('SQLITE_MMAP_MB', int(os.getenv('SQLITE_MMAP_MB', 256)))
+    app.config.setdefault('SQLITE_CACHE_MB', int(os.getenv('SQLITE_CACHE_MB', 32)))
+    app.config.setdefault('DB_WRITE_QUEUE', os.getenv('DB_WRITE_QUEUE', 'false').lower() in ['true', '1', 't'])
+    app.config.setdefault('DB_WRITE_BATCH', int(os.getenv('DB_WRITE_BATCH', 64)))
+    if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        opcoes_engine = {'connect_args': {'timeout': app.config['SQLITE_BUSY_TIMEOUT_MS'] / 1000}}
+    else:
+        opcoes_engine = {'pool_pre_ping': True, 'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800))}
+    if ':memory:' not in app.config['SQLALCHEMY_DATABASE_URI'] and app.config['SQLALCHEMY_DATABASE_URI'] != 'sqlite://':
+        opcoes_engine.update(pool_size=int(os.getenv('DB_POOL_SIZE', 5)), max_overflow=int(os.getenv('DB_MAX_OVERFLOW', 10)),
+                             pool_timeout=int(os.getenv('DB_POOL_TIMEOUT', 30)))
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', opcoes_engine)
+
+@event.listens_for(Engine, 'connect')
+def configurar_sqlite(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection) or not has_app_context() or not current_app.config['SQLITE_PRAGMAS']: return
+    cursor = dbapi_connection.cursor()
+    for pragma in ('journal_mode=WAL', 'synchronous=NORMAL', f"busy_timeout={current_app.config['SQLITE_BUSY_TIMEOUT_MS']}",
+                   f"mmap_size={current_app.config['SQLITE_MMAP_MB'] * 1024 * 1024}", f"cache_size=-{current_app.config['SQLITE_CACHE_MB'] * 1024}"):
+        cursor.execute(f'PRAGMA {pragma}')
+    cursor.close()
+
+# --- PAGINAÇÃO POR CURSOR (KEYSET) ---
+# Cada página continua da chave (coluna, id) do último item da anterior, sem OFFSET.
+@configuracao
+def configurar_paginacao(app):
+    app.config.setdefault('ITENS_POR_PAGINA', int(os.getenv('ITENS_POR_PAGINA', 20)))
+
+def codificar_cursor(valor, item_id):
+    bruto = json.dumps([valor.isoformat() if isinstance(valor, date) else valor, item_id]).encode()
+    return base64.urlsafe_b64encode(bruto).decode().rstrip('=')
+
+def decodificar_cursor(token, tipo=datetime):
+    """(valor, id) do cursor; um valor em texto volta como tipo (datetime, date ou str)."""
+    try:
+        valor, item_id = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        if isinstance(valor, str): return (valor if tipo is str else tipo.fromisoformat(valor)), int(item_id)
+        return float(valor), int(item_id)
+    except (ValueError, TypeError): return None
+
+def paginar_keyset(query, coluna, cursor=None, desc=False, por_pagina=None):
+    """Retorna (itens, proximo_cursor); proximo_cursor é None na última página. query pode ser um
+    Query do ORM ou um select() de colunas, que precisa trazer o id e a coluna de ordenação."""
+    por_pagina = por_pagina or current_app.config['ITENS_POR_PAGINA']
+    coluna_id = coluna.class_.id
+    posicao = decodificar_cursor(cursor, coluna.type.python_type) if cursor else None
+    if posicao:
+        valor, item_id = posicao
+        if desc: query = query.filter(or_(coluna < valor, and_(coluna == valor, coluna_id < item_id)))
+        else: query = query.filter(or_(coluna > valor, and_(coluna == valor, coluna_id > item_id)))
+    ordem = (coluna.desc(), coluna_id.desc()) if desc else (coluna.asc(), coluna_id.asc())
+    query = query.order_by(*ordem).limit(por_pagina + 1)
+    itens = db.session.execute(query).all() if isinstance(query, Select) else query.all()
+    if len(itens) <= por_pagina: return itens, None
+    itens = itens[:por_pagina]
+    return itens, codificar_cursor(getattr(itens[-1], coluna.key), itens[-1].id)
+
+# --- FILA DE ESCRITA ---
+# Com DB_WRITE_QUEUE, as escritas curtas vão para uma única thread que junta até DB_WRITE_BATCH
+# pedidos numa transação (um SAVEPOINT cada); quem chama recebe o retorno ou a exceção da sua função.
+class FilaEscrita:
+    def __init__(self, app, engine=None):
+        self.app, self.engine = app, engine
+        self.fila = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def executar(self, funcao, *args):
+        self.iniciar()
+        pedido = Future()
+        self.fila.put((funcao, args, pedido))
+        return pedido.result()
+
+    def iniciar(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._trabalhar, name='fila-escrita', daemon=True)
+                self.thread.start()
+
+    def parar(self):
+        if self.thread is not None and self.thread.is_alive():
+            self.fila.put(None)
+            self.thread.join()
+
+    def _trabalhar(self):
+        with self.app.app_context():
+            engine = self.engine or db.engine
+            while True:
+                lote = [self.fila.get()]
+                while lote[-1] is not None and len(lote) < self.app.config['DB_WRITE_BATCH']:
+                    try: lote.append(self.fila.get_nowait())
+                    except queue.Empty: break
+                parar = lote[-1] is None
+                if parar: lote.pop()
+                if lote: self._gravar(engine, lote)
+                if parar: return
+
+    def _gravar(self, engine, lote):
+        resultados = []
+        try:
+            with engine.connect() as conn:
+                # BEGIN IMMEDIATE pega o lock de escrita de uma vez, em vez de promover uma leitura no meio.
+                if engine.dialect.name == 'sqlite': conn.exec_driver_sql('BEGIN IMMEDIATE')
+                for funcao, args, pedido in lote:
+                    try:
+                        with conn.begin_nested(): resultados.append((pedido, funcao(conn, *args), None))
+                    except Exception as erro: resultados.append((pedido, None, erro))
+                conn.commit()
+        except Exception as erro:
+            for _, _, pedido in lote: pedido.set_exception(erro)
+            return
+        for pedido, valor, erro in resultados:
+            if erro is None: pedido.set_result(valor)
+            else: pedido.set_exception(erro)
+
+def fila_escrita(): return extensao('fila_escrita', FilaEscrita)
+
+def escrever(funcao, *args):
+    """Roda funcao(conn, *args) numa transação própria e já confirmada (pela fila, se ligada)."""
+    if current_app.config['DB_WRITE_QUEUE']: return fila_escrita().executar(funcao, *args)
+    with db.engine.begin() as conn: return funcao(conn, *args)
+
+def escrita_derivada(session, aviso, funcao, *args):
+    """Roda funcao(conn, *args) na transação da sessão (índice de busca, feed, visões), num SAVEPOINT:
+    se falhar, só a escrita derivada é desfeita e o erro vai para o log com o comando que a refaz."""
+    conn = session.connection()
+    try:
+        with conn.begin_nested(): funcao(conn, *args)
+    except Exception: current_app.logger.exception(aviso)
+
+def upsert(conn, tabela, chaves, linhas):
+    """INSERT ... ON CONFLICT DO UPDATE pela chave. Chaves repetidas no lote ficam com a última linha: o Postgres
+    recusa atualizar a mesma linha duas vezes no mesmo comando."""
+    linhas = list({tuple(linha[c] for c in chaves): linha for linha in linhas}.values())
+    dml = dialeto_dml(conn)
+    stmt = dml.insert(tabela)
+    stmt = stmt.on_conflict_do_update(index_elements=list(chaves), set_={c: stmt.excluded[c] for c in linhas[0] if c not in chaves})
+    conn.execute(stmt, linhas)
@@ -0,0 +1,56 @@
+import os
+import time
+import threading
+from datetime import datetime, timezone, timedelta
+from flask import current_app
+from sqlalchemy import func, select, case
+from nucleo import db, configuracao, extensao
+from modelos import membros_clube_tabela, Clube, Evento, ForumTopico, ForumPost
+
+# --- RANKING DE CLUBES ---
+# Uma consulta agregada guardada como snapshot por métrica, refeito quando expira (RANKING_TTL) ou é invalidado.
+@configuracao
+def configurar_ranking(app):
+    app.config.setdefault('RANKING_TTL', int(os.getenv('RANKING_TTL', 300)))
+
+RANKING_METRICAS = {
+    'membros': ('Membros', 'fas fa-users'),
+    'eventos': ('Eventos realizados', 'fas fa-calendar-check'),
+    'forum': ('Atividade no fórum', 'fas fa-comments'),
+    'crescimento': ('Novos membros (30 dias)', 'fas fa-chart-line'),
+}
+_ranking_lock = threading.Lock()
+
+def snapshot_ranking(): return extensao('ranking', lambda app: {'snapshot': None, 'gerado_em': 0.0})
+
+def calcular_ranking():
+    agora = datetime.now(timezone.utc)
+    mc = membros_clube_tabela.c
+    membros = select(mc.clube_id, func.count().label('membros'),
+                     func.sum(case((mc.data_entrada >= agora - timedelta(days=30), 1), else_=0)).label('crescimento')
+                     ).group_by(mc.clube_id).subquery()
+    eventos = select(Evento.clube_id, func.count().label('eventos')).where(Evento.data_evento < agora).group_by(Evento.clube_id).subquery()
+    topicos = select(ForumTopico.clube_id, func.count().label('topicos')).group_by(ForumTopico.clube_id).subquery()
+    posts = select(ForumTopico.clube_id, func.count().label('posts')).join(ForumPost, ForumPost.topico_id == ForumTopico.id).group_by(ForumTopico.clube_id).subquery()
+    consulta = (select(Clube.id, Clube.nome, Clube.categoria,
+                       func.coalesce(membros.c.membros, 0).label('membros'),
+                       func.coalesce(membros.c.crescimento, 0).label('crescimento'),
+                       func.coalesce(eventos.c.eventos, 0).label('eventos'),
+                       (func.coalesce(topicos.c.topicos, 0) + func.coalesce(posts.c.posts, 0)).label('forum'))
+                .outerjoin(membros, membros.c.clube_id == Clube.id)
+                .outerjoin(eventos, eventos.c.clube_id == Clube.id)
+                .outerjoin(topicos, topicos.c.clube_id == Clube.id)
+                .outerjoin(posts, posts.c.clube_id == Clube.id))
+    linhas = [dict(linha) for linha in db.session.execute(consulta).mappings()]
+    return {metrica: sorted(linhas, key=lambda l: (-l[metrica], l['nome'])) for metrica in RANKING_METRICAS}
+
+def get_ranking(metrica='membros'):
+    ranking = snapshot_ranking()
+    with _ranking_lock:
+        if ranking['snapshot'] is None or time.monotonic() - ranking['gerado_em'] > current_app.config['RANKING_TTL']:
+            ranking['snapshot'], ranking['gerado_em'] = calcular_ranking(), time.monotonic()
+        return ranking['snapshot'][metrica]
+
+def invalidar_ranking():
+    ranking = snapshot_ranking()
+    with _ranking_lock: ranking['snapshot'] = None
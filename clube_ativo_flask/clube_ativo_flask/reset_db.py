@@ -1,28 +1,43 @@
 # Em reset_db.py
+#   python reset_db.py          -> cria só as tabelas que faltam; nenhum dado é apagado
+#   python reset_db.py --hard   -> apaga o banco SQLite e a pasta 'migrations' e recria tudo do zero
+# Para repor os dados de demonstração sem apagar nada, use 'flask seed-db' (só grava o que mudou).
 
 import os
+import sys
 import shutil
 # Importe o app e o db do seu arquivo principal
-from app import app, db
+from app import create_app, db, sincronizar_esquema, criar_indices
+
+app = create_app()
+hard = '--hard' in sys.argv[1:]
 
 # Use o 'app_context' para garantir que as configurações do app sejam carregadas
 with app.app_context():
-    print("--- INICIANDO RESET TOTAL DO BANCO DE DADOS ---")
+    if hard:
+        print("--- INICIANDO RESET TOTAL DO BANCO DE DADOS ---")
 
-    # Pega o caminho do banco DE DENTRO da configuração do app
-    db_path = app.config['SQLALCHEMY_DATABASE_URI'].replace('sqlite:///', '')
+        # Pega o caminho do banco DE DENTRO da configuração do app
+        db_path = app.config['SQLALCHEMY_DATABASE_URI'].replace('sqlite:///', '')
 
-    # Apaga o banco de dados se ele existir
-    if os.path.exists(db_path):
-        os.remove(db_path)
-        print(f"✅ Banco de dados em '{db_path}' foi apagado.")
+        # Apaga o banco de dados se ele existir
+        if os.path.exists(db_path):
+            os.remove(db_path)
+            print(f"✅ Banco de dados em '{db_path}' foi apagado.")
 
-    # Apaga a pasta de migrações se ela existir
-    if os.path.exists('migrations'):
-        shutil.rmtree('migrations')
-        print("✅ Pasta 'migrations' foi apagada.")
+        # Apaga a pasta de migrações se ela existir
+        if os.path.exists('migrations'):
+            shutil.rmtree('migrations')
+            print("✅ Pasta 'migrations' foi apagada.")
+    else:
+        print("--- CRIANDO AS TABELAS QUE FALTAM (dados existentes são mantidos; use --hard para apagar tudo) ---")
 
-    # Cria o novo banco de dados e tabelas
-    print("⏳ Criando todas as tabelas...")
+    # Cria as tabelas que ainda não existem (as existentes, com seus dados, ficam como estão)
+    print("⏳ Criando tabelas...")
     db.create_all()  # Agora isso VAI usar o caminho correto!
-    print("🎉 Banco de dados e tabelas criados com sucesso!")
\ No newline at end of file
+    # create_all não mexe em tabelas que já existem: as colunas e índices novos dos modelos entram aqui
+    for coluna in sincronizar_esquema():
+        print(f"✅ Coluna '{coluna}' adicionada.")
+    for indice in criar_indices():
+        print(f"✅ Índice '{indice}' criado.")
+    print("🎉 Banco de dados e tabelas prontos!")
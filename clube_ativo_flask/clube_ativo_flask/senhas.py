@@ -0,0 +1,118 @@
+import os
+import math
+import time
+import threading
+from collections import OrderedDict
+from concurrent import futures
+from flask import render_template, request, redirect, url_for, flash
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+from nucleo import bp, configuracao, extensao
+
+# --- SENHAS: POOL DE HASH E LIMITE DE TENTATIVAS ---
+# Hash de senha num pool de processos limitado (o excedente recebe "servidor ocupado"); quando
+# PASSWORD_HASH_METHOD muda, o hash é refeito no próximo login. Baldes de fichas por matrícula e por IP
+# barram rajadas antes de gastar CPU (por processo).
+@configuracao
+def configurar_senhas(app):
+    app.config.setdefault('PASSWORD_HASH_METHOD', os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1'))
+    app.config.setdefault('PASSWORD_HASH_POOL', os.getenv('PASSWORD_HASH_POOL', 'processos'))  # ou 'sincrono'
+    app.config.setdefault('PASSWORD_HASH_WORKERS', int(os.getenv('PASSWORD_HASH_WORKERS', min(2, os.cpu_count() or 1))))
+    app.config.setdefault('PASSWORD_HASH_MAX_PENDENTES', int(os.getenv('PASSWORD_HASH_MAX_PENDENTES', 16)))
+    app.config.setdefault('PASSWORD_HASH_TIMEOUT', float(os.getenv('PASSWORD_HASH_TIMEOUT', 5)))
+    app.config.setdefault('LOGIN_RAJADA_USUARIO', int(os.getenv('LOGIN_RAJADA_USUARIO', 5)))
+    app.config.setdefault('LOGIN_POR_MINUTO_USUARIO', float(os.getenv('LOGIN_POR_MINUTO_USUARIO', 5)))
+    app.config.setdefault('LOGIN_RAJADA_IP', int(os.getenv('LOGIN_RAJADA_IP', 30)))
+    app.config.setdefault('LOGIN_POR_MINUTO_IP', float(os.getenv('LOGIN_POR_MINUTO_IP', 30)))
+
+class HashSobrecarregado(Exception):
+    """O pool de hash está cheio ou não respondeu dentro de PASSWORD_HASH_TIMEOUT."""
+
+class PoolSenhas:
+    """Gera e confere hashes de senha num ProcessPoolExecutor criado na primeira chamada."""
+
+    def __init__(self, app):
+        self.app, self.lock, self.executor, self.vagas = app, threading.Lock(), None, None
+
+    def _executar(self, funcao, *args):
+        if self.app.config['PASSWORD_HASH_POOL'] == 'sincrono': return funcao(*args)
+        timeout = self.app.config['PASSWORD_HASH_TIMEOUT']
+        with self.lock:
+            if self.executor is None:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                # spawn: um fork dentro do servidor com threads copiaria locks presos por outras threads
+                self.executor = ProcessPoolExecutor(self.app.config['PASSWORD_HASH_WORKERS'], mp_context=multiprocessing.get_context('spawn'))
+                self.vagas = threading.BoundedSemaphore(self.app.config['PASSWORD_HASH_WORKERS'] + self.app.config['PASSWORD_HASH_MAX_PENDENTES'])
+        if not self.vagas.acquire(timeout=timeout): raise HashSobrecarregado()
+        try: futuro = self.executor.submit(funcao, *args)
+        except BaseException:
+            self.vagas.release(); raise
+        futuro.add_done_callback(lambda _: self.vagas.release())
+        try: return futuro.result(timeout=timeout)
+        except futures.TimeoutError: raise HashSobrecarregado()  # antes do 3.11 não é o TimeoutError embutido
+
+    def gerar(self, senha):
+        return self._executar(generate_password_hash, senha, self.app.config['PASSWORD_HASH_METHOD'])
+
+    def verificar(self, hash_senha, senha):
+        return self._executar(check_password_hash, hash_senha, senha or '')
+
+    def precisa_refazer(self, hash_senha):
+        """True se o hash foi gerado com parâmetros diferentes dos configurados agora."""
+        return parametros_hash(hash_senha.split('$', 1)[0]) != parametros_hash(self.app.config['PASSWORD_HASH_METHOD'])
+
+    def parar(self):
+        with self.lock:
+            if self.executor is not None: self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+def senhas(): return extensao('senhas', PoolSenhas)
+
+def parametros_hash(metodo):
+    """Método do werkzeug com os padrões dele preenchidos: 'scrypt' == 'scrypt:32768:8:1', 'pbkdf2' == 'pbkdf2:sha256:<padrão>'."""
+    nome, *argumentos = metodo.split(':')
+    try:
+        if nome == 'scrypt': return (nome, *(int(a) for a in argumentos), *(32768, 8, 1)[len(argumentos):])
+        if nome == 'pbkdf2': return (nome, argumentos[0] if argumentos else 'sha256', int(argumentos[1]) if len(argumentos) > 1 else DEFAULT_PBKDF2_ITERATIONS)
+    except ValueError: pass
+    return (nome, *argumentos)
+
+class LimitadorTaxa:
+    """Balde de fichas por chave: LOGIN_RAJADA_<tipo> tentativas seguidas, repostas a LOGIN_POR_MINUTO_<tipo>."""
+
+    def __init__(self, app, tipo, max_chaves=100_000):
+        self.app, self.tipo, self.max_chaves = app, tipo, max_chaves
+        self.lock, self.baldes = threading.Lock(), OrderedDict()  # chave -> (fichas, instante)
+
+    def consumir(self, chave):
+        """Gasta uma ficha da chave; devolve 0 se liberado ou os segundos até a próxima ficha."""
+        rajada, por_segundo = self.app.config[f'LOGIN_RAJADA_{self.tipo}'], self.app.config[f'LOGIN_POR_MINUTO_{self.tipo}'] / 60
+        agora = time.monotonic()
+        with self.lock:
+            fichas, visto = self.baldes.pop(chave, (rajada, agora))
+            fichas = min(rajada, fichas + (agora - visto) * por_segundo)
+            espera = 0.0 if fichas >= 1 else (1 - fichas) / por_segundo
+            self.baldes[chave] = (fichas - 1 if not espera else fichas, agora)
+            while len(self.baldes) > self.max_chaves: self.baldes.popitem(last=False)
+        return espera
+
+    def limpar(self):
+        with self.lock: self.baldes.clear()
+
+def limitador(tipo): return extensao(f'limite_{tipo.lower()}', lambda app: LimitadorTaxa(app, tipo))
+
+def espera_tentativa(username=None):
+    """Consome uma ficha do IP (e da matrícula, se houver); devolve quantos segundos esperar."""
+    espera = limitador('IP').consumir(request.remote_addr or '')
+    if username is not None: espera = max(espera, limitador('USUARIO').consumir(username))
+    return espera
+
+def tentativas_esgotadas(espera, template, **contexto):
+    segundos = math.ceil(espera)
+    flash(f'Muitas tentativas. Tente novamente em {segundos} segundo(s).', 'danger')
+    return render_template(template, **contexto), 429, {'Retry-After': str(segundos)}
+
+@bp.app_errorhandler(HashSobrecarregado)
+def hash_sobrecarregado(erro):
+    flash('Servidor ocupado no momento. Tente novamente em alguns segundos.', 'warning')
+    return redirect(request.referrer or url_for('main.login'))
@@ -39,4 +39,29 @@ document.addEventListener('DOMContentLoaded', function () {
             });
         }
     });
+
+    // Atualizações ao vivo (Server-Sent Events): respostas novas do fórum e vagas de eventos.
+    // O servidor só manda o que mudou; aqui cada diferença é aplicada no elemento com data-stream.
+    if (window.EventSource) {
+        document.querySelectorAll('[data-stream]').forEach(alvo => {
+            const fonte = new EventSource(alvo.dataset.stream);
+            fonte.addEventListener('post', evento => {
+                if (document.getElementById('post-' + evento.lastEventId)) return;
+                const vazio = alvo.querySelector('[data-vazio]');
+                if (vazio) vazio.remove();
+                alvo.insertAdjacentHTML('beforeend', JSON.parse(evento.data).html);
+            });
+            fonte.addEventListener('vagas', evento => {
+                const dados = JSON.parse(evento.data);
+                alvo.textContent = dados.vagas_restantes;
+                alvo.classList.toggle('vagas-esgotadas', dados.vagas_restantes <= 0);
+                if (dados.delta) {
+                    alvo.classList.remove('vagas-mudou');
+                    void alvo.offsetWidth; // reinicia a animação
+                    alvo.classList.add('vagas-mudou');
+                }
+            });
+            window.addEventListener('pagehide', () => fonte.close());
+        });
+    }
 });
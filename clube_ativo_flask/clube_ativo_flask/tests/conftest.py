@@ -0,0 +1,42 @@
+import pytest
+
+from app import create_app, semear_fixtures
+from nucleo import db
+from modelos import User
+
+
+@pytest.fixture
+def app(tmp_path):
+    """Aplicação de teste com banco SQLite próprio, semeado com as fixtures de demonstração."""
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'teste.db'}",
+        'JOBS_ENABLED': False,
+        'MAIL_BACKEND': 'file',
+        'PASSWORD_HASH_POOL': 'sincrono',
+        'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+        'UPLOAD_FOLDER': str(tmp_path / 'profile_pics'),
+        'CLUB_MEDIA_FOLDER': str(tmp_path / 'club_media'),
+    }, instance_path=str(tmp_path / 'instance'))
+    with app.app_context():
+        db.create_all()
+        semear_fixtures()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def usuario(username):
+    return db.session.execute(db.select(User).filter_by(username=username)).scalar_one()
+
+
+def entrar(client, username):
+    """Loga o usuário da fixture direto na sessão, sem passar pelo hash da senha."""
+    user = usuario(username)
+    with client.session_transaction() as sessao: sessao['user_id'] = user.id
+    return user
@@ -0,0 +1,54 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select, update
+
+from agendador import TAREFAS, CronInvalido, adiar, proxima_cron, reservar_tarefas, rodar_pendentes
+from nucleo import db
+from modelos import Tarefa
+
+
+@pytest.fixture
+def chamadas(monkeypatch):
+    feitas = []
+    def registrar(falhar=False, **args):
+        feitas.append(args)
+        if falhar: raise RuntimeError('banco fora do ar')
+    monkeypatch.setitem(TAREFAS, 'teste', registrar)
+    return feitas
+
+
+def test_proxima_cron_respeita_passo_faixa_e_dia_da_semana():
+    segunda = datetime(2025, 9, 8, 10, 7).astimezone()
+    assert proxima_cron('*/15 * * * *', segunda).astimezone() == datetime(2025, 9, 8, 10, 15).astimezone()
+    assert proxima_cron('30 3 * * 0', segunda).astimezone() == datetime(2025, 9, 14, 3, 30).astimezone()
+    assert proxima_cron('@monthly', segunda).astimezone() == datetime(2025, 10, 1, 0, 0).astimezone()
+    for invalida in ('61 * * * *', '* * *', '0 0 31 2 *'):
+        with pytest.raises(CronInvalido): proxima_cron(invalida, segunda)
+
+
+def test_lease_entrega_cada_tarefa_a_um_unico_dono(app, chamadas):
+    for i in range(20): adiar('teste', n=i)
+    def reservar(dono):
+        with app.app_context(): return reservar_tarefas(dono, 20)
+    with ThreadPoolExecutor(max_workers=6) as executor: lotes = list(executor.map(reservar, [f'dono-{i}' for i in range(6)]))
+    reservadas = [tarefa_id for lote in lotes for tarefa_id in lote]
+    assert len(reservadas) == len(set(reservadas)) == 20
+    assert reservar_tarefas('atrasado', 20) == []
+
+
+def test_falha_volta_com_backoff_e_desiste_no_limite(app, chamadas):
+    app.config.update(JOBS_BACKOFF=3600, JOBS_MAX_TENTATIVAS=2)
+    adiar('teste', chave='unica', falhar=True)
+    adiar('teste', chave='unica', falhar=True)  # mesma chave pendente: não duplica
+    assert rodar_pendentes(['teste']) == [('teste', 'RuntimeError: banco fora do ar')]
+    assert rodar_pendentes(['teste']) == []  # ainda no backoff
+    tarefa = db.session.scalars(select(Tarefa).filter_by(nome='teste')).one()
+    assert tarefa.tentativas == 1 and tarefa.concluida_em is None
+    db.session.execute(update(Tarefa).where(Tarefa.id == tarefa.id).values(proxima_execucao=datetime(2000, 1, 1)))
+    db.session.commit()
+    assert len(rodar_pendentes(['teste'])) == 1
+    db.session.refresh(tarefa)
+    assert tarefa.tentativas == 2 and tarefa.concluida_em is not None and tarefa.erro.startswith('RuntimeError')
+    assert len(chamadas) == 2
@@ -0,0 +1,23 @@
+from sqlalchemy import event, select
+
+from ao_vivo import broker_ao_vivo
+from nucleo import db
+from modelos import Clube, ForumTopico
+from tests.conftest import entrar
+
+MEMBRO = '202511110002'
+
+
+def test_resposta_chega_aos_assinantes_ja_renderizada(client):
+    user = entrar(client, MEMBRO)
+    clube_id = db.session.scalars(select(Clube.id).filter_by(nome='Clube de Programação')).one()
+    client.post(f'/clube/{clube_id}/forum/novo', data={'titulo': 'Placar', 'conteudo': 'Quem ganhou?'})
+    topico_id = db.session.scalars(select(ForumTopico.id).filter_by(titulo='Placar')).one()
+    fila = broker_ao_vivo().assinar(f'topico:{topico_id}')
+    depois_do_commit = []
+    contar = lambda conn, cursor, sql, *args: depois_do_commit.append(sql)
+    event.listen(db.session, 'after_commit', lambda sessao: event.listen(db.engine, 'before_cursor_execute', contar))
+    assert client.post(f'/clube/{clube_id}/forum/topico/{topico_id}', data={'conteudo': 'Nosso time!'}).status_code == 302
+    mensagem = fila.get_nowait()
+    assert mensagem['evento'] == 'post' and 'Nosso time!' in mensagem['dados']['html'] and user.username in mensagem['dados']['html']
+    assert depois_do_commit == []  # publicar não recarrega post, autor nem tópico
@@ -0,0 +1,62 @@
+import gzip
+import json
+
+from sqlalchemy import func, select, update
+
+from app import create_app
+from nucleo import db
+from modelos import CardapioRU, Clube
+from tests.conftest import entrar
+
+MEMBRO = '202511110002'
+
+
+def test_campos_escolhem_as_colunas_e_o_cursor_percorre_tudo(client):
+    assert client.get('/api/v1/clubes').status_code == 401
+    entrar(client, MEMBRO)
+    url, nomes = '/api/v1/clubes?campos=nome&limite=2', []
+    while url:
+        pagina = client.get(url).get_json()
+        assert all(set(item) == {'id', 'nome'} for item in pagina['itens'])
+        nomes += [item['nome'] for item in pagina['itens']]
+        url = pagina['proximo_cursor'] and f"/api/v1/clubes?campos=nome&limite=2&cursor={pagina['proximo_cursor']}"
+    assert nomes == sorted(nomes) and len(nomes) == db.session.scalar(select(func.count(Clube.id)))
+    resposta = client.get('/api/v1/clubes?campos=nome,senha')
+    assert resposta.status_code == 400 and 'senha' in resposta.get_json()['erro']
+
+
+def test_etag_responde_304_ate_a_tabela_mudar(client):
+    entrar(client, MEMBRO)
+    resposta = client.get('/api/v1/clubes')
+    etag = resposta.headers['ETag']
+    assert client.get('/api/v1/clubes', headers={'If-None-Match': etag}).status_code == 304
+    db.session.execute(update(Clube).where(Clube.nome == 'Clube de Teatro').values(categoria='Artes Cênicas'))
+    db.session.commit()
+    db.session.remove()
+    resposta = client.get('/api/v1/clubes', headers={'If-None-Match': etag})
+    assert resposta.status_code == 200 and resposta.headers['ETag'] != etag
+    assert 'Artes Cênicas' in resposta.get_data(as_text=True)
+
+
+def test_recursos_publicos_comprimem_e_forum_exige_membro(client, app):
+    app.config['API_COMPRIMIR_MIN_BYTES'] = 1
+    resposta = client.get('/api/v1/cardapio?campos=prato_principal', headers={'Accept-Encoding': 'gzip'})
+    assert resposta.headers['Content-Encoding'] == 'gzip'
+    assert len(json.loads(gzip.decompress(resposta.get_data()))['itens']) == 5
+    esportes = db.session.scalars(select(Clube.id).filter_by(nome='Clube de Esportes')).one()
+    entrar(client, MEMBRO)
+    assert client.get(f'/api/v1/clubes/{esportes}/topicos').status_code == 403
+
+
+def test_etag_e_a_mesma_em_todos_os_workers(app, client):
+    outro = create_app({'SQLALCHEMY_DATABASE_URI': app.config['SQLALCHEMY_DATABASE_URI'], 'FRAGMENT_CACHE_DIR': app.config['FRAGMENT_CACHE_DIR'],
+                        'JOBS_ENABLED': False}, instance_path=app.instance_path)
+    etag = client.get('/api/v1/cardapio').headers['ETag']
+    assert outro.test_client().get('/api/v1/cardapio', headers={'If-None-Match': etag}).status_code == 304
+    with outro.app_context():
+        db.session.execute(update(CardapioRU).values(sobremesa='Pudim'))
+        db.session.commit()
+        db.session.remove()
+        db.engine.dispose()
+    resposta = client.get('/api/v1/cardapio', headers={'If-None-Match': etag})
+    assert resposta.status_code == 200 and 'Pudim' in resposta.get_data(as_text=True)
@@ -0,0 +1,26 @@
+import re
+
+from midia import asset_url
+
+
+def test_asset_com_hash_e_imutavel_e_responde_304(client, app):
+    with app.test_request_context():
+        url = asset_url('static', filename='css/style.css')
+    assert re.fullmatch(r'/assets/css/style\.[0-9a-f]{12}\.css', url)
+    resposta = client.get(url)
+    assert resposta.status_code == 200
+    assert 'immutable' in resposta.headers['Cache-Control'] and 'max-age=31536000' in resposta.headers['Cache-Control']
+    assert client.get(url, headers={'If-None-Match': resposta.headers['ETag']}).status_code == 304
+
+
+def test_hash_antigo_redireciona_para_a_versao_atual(client, app):
+    with app.test_request_context():
+        url = asset_url('static', filename='js/script.js')
+    resposta = client.get('/assets/js/script.000000000000.js')
+    assert resposta.status_code == 302 and resposta.location.endswith(url)
+    assert client.get('/assets/js/inexistente.000000000000.js').status_code == 404
+
+
+def test_paginas_usam_as_urls_com_hash(client):
+    pagina = client.get('/login').get_data(as_text=True)
+    assert re.search(r'/assets/css/style\.[0-9a-f]{12}\.css', pagina)
@@ -0,0 +1,19 @@
+from sqlalchemy import text
+
+from app import criar_indices, esquema_pendente
+from nucleo import db
+
+
+def test_indice_ausente_e_apontado_e_criado_pelo_fix(app):
+    assert esquema_pendente() == []
+    db.session.execute(text('DROP INDEX ix_evento_clube_data'))
+    db.session.commit()
+    assert esquema_pendente() == ['ix_evento_clube_data']
+    resultado = app.test_cli_runner().invoke(args=['db-audit'])
+    assert resultado.exit_code != 0 and 'ix_evento_clube_data' in resultado.output
+    resultado = app.test_cli_runner().invoke(args=['db-audit', '--fix'])
+    assert 'Índice criado: ix_evento_clube_data' in resultado.output
+    assert resultado.exit_code == 0, resultado.output
+    assert '/eventos [200]' in resultado.output
+    assert esquema_pendente() == [] and criar_indices() == []
+
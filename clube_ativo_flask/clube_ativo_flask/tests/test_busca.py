@@ -0,0 +1,45 @@
+import busca
+from sqlalchemy import select
+
+from busca import buscar, expressao_fts
+from nucleo import db
+from modelos import Clube, ForumTopico
+from tests.conftest import entrar
+
+MEMBRO, DE_FORA = '202511110002', '202522220001'
+
+
+def programacao():
+    return db.session.scalars(select(Clube.id).filter_by(nome='Clube de Programação')).one()
+
+
+def test_expressao_fts_escapa_o_que_foi_digitado():
+    assert expressao_fts('Maratona de "prog') == '"maratona" "de" "prog"*'
+    assert expressao_fts('"(*') is None
+
+
+def test_busca_por_prefixo_ignora_acentos_e_pagina(app):
+    with app.test_request_context():
+        resultados, proximo = buscar('programacao', None, por_pagina=1)
+        assert resultados[0]['titulo'] == 'Clube de Programação' or proximo
+        vistos = {r['url'] + r['titulo'] for r in resultados}
+        seguintes, _ = buscar('programacao', None, proximo, por_pagina=10)
+        assert not vistos & {r['url'] + r['titulo'] for r in seguintes}
+        assert any(r['tipo'] == 'evento' for r in resultados + seguintes)
+
+
+def test_topico_novo_so_aparece_para_membros(client):
+    entrar(client, MEMBRO)
+    client.post(f'/clube/{programacao()}/forum/novo', data={'titulo': 'Gabarito da olimpíada', 'conteudo': 'Saiu hoje.'})
+    assert 'Gabarito da olimpíada' in client.get('/busca?q=gabarito').get_data(as_text=True)
+    entrar(client, DE_FORA)
+    assert 'Nenhum resultado' in client.get('/busca?q=gabarito').get_data(as_text=True)
+
+
+def test_falha_no_indice_nao_desfaz_a_escrita_do_usuario(client, monkeypatch):
+    def quebrado(conn, documentos): raise RuntimeError('fts indisponível')
+    monkeypatch.setattr(busca, 'gravar_busca', quebrado)
+    entrar(client, MEMBRO)
+    resposta = client.post(f'/clube/{programacao()}/forum/novo', data={'titulo': 'Sem índice', 'conteudo': 'Mesmo assim gravado.'})
+    assert resposta.status_code == 302
+    assert db.session.scalars(select(ForumTopico).filter_by(titulo='Sem índice')).one()
@@ -0,0 +1,32 @@
+import json
+
+from sqlalchemy import func, select
+
+from nucleo import db
+from modelos import membros_clube_tabela, Clube, ForumPost, ForumTopico, User
+
+
+def test_seed_scale_acrescenta_o_volume_pedido_com_contadores_coerentes(app):
+    antes = db.session.scalar(select(func.count(User.id)))
+    resultado = app.test_cli_runner().invoke(args=['seed-scale', '--users', '200', '--clubs', '10', '--events', '20', '--posts', '300',
+                                                   '--topics', '15', '--lote', '64'])
+    assert resultado.exit_code == 0, resultado.output
+    assert db.session.scalar(select(func.count(User.id))) == antes + 200
+    assert db.session.scalar(select(func.count(ForumTopico.id)).where(ForumTopico.user_id > antes)) == 15
+    assert db.session.scalar(select(func.count(ForumPost.id)).where(ForumPost.user_id > antes)) == 300
+    mc = membros_clube_tabela.c
+    for clube in db.session.scalars(select(Clube).where(Clube.nome.like('Clube Sintético %'))):
+        assert clube.member_count == db.session.scalar(select(func.count()).where(mc.clube_id == clube.id))
+
+
+def test_bench_routes_grava_json_e_acusa_regressao_contra_a_baseline(app, tmp_path):
+    saida = tmp_path / 'rotas.json'
+    resultado = app.test_cli_runner().invoke(args=['bench-routes', '--requisicoes', '2', '--saida', str(saida)])
+    assert resultado.exit_code == 0, resultado.output
+    medido = json.loads(saida.read_text(encoding='utf-8'))
+    assert medido['rotas']['/eventos']['status'] == 200 and medido['volume']['user'] > 0
+    for linha in medido['rotas'].values(): linha.update(p95_ms=0.0, consultas=0)  # baseline impossível de bater
+    baseline = tmp_path / 'base.json'
+    baseline.write_text(json.dumps(medido), encoding='utf-8')
+    resultado = app.test_cli_runner().invoke(args=['bench-routes', '--requisicoes', '2', '--saida', str(saida), '--baseline', str(baseline)])
+    assert resultado.exit_code != 0 and '<-- regressão' in resultado.output
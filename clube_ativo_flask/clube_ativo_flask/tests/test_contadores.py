@@ -0,0 +1,64 @@
+import os
+import shutil
+
+from sqlalchemy import func, select, text, update
+
+from app import create_app, esquema_pendente, rebuild_counters, sincronizar_esquema
+from nucleo import db
+from modelos import inscricao_evento_tabela, membros_clube_tabela, Clube, Evento, User
+from tests.conftest import entrar
+
+LIDER_TEATRO = '202522220001'
+
+
+def contadores_batem():
+    membros = dict(db.session.execute(select(membros_clube_tabela.c.clube_id, func.count()).group_by(membros_clube_tabela.c.clube_id)).all())
+    inscritos = dict(db.session.execute(select(inscricao_evento_tabela.c.evento_id, func.count()).group_by(inscricao_evento_tabela.c.evento_id)).all())
+    return (all(c.member_count == membros.get(c.id, 0) for c in db.session.scalars(select(Clube))) and
+            all(e.inscritos_count == inscritos.get(e.id, 0) for e in db.session.scalars(select(Evento))))
+
+
+def test_entrar_e_sair_do_clube_ajustam_o_contador(client):
+    entrar(client, LIDER_TEATRO)
+    clube = db.session.scalars(select(Clube).filter_by(nome='Clube de Esportes')).one()
+    antes = clube.member_count
+    client.post(f'/clube/{clube.id}/join')
+    client.post(f'/clube/{clube.id}/join')  # repetido não conta duas vezes
+    db.session.refresh(clube)
+    assert clube.member_count == antes + 1
+    client.post(f'/clube/{clube.id}/leave')
+    db.session.refresh(clube)
+    assert clube.member_count == antes
+    assert contadores_batem()
+
+
+def test_rebuild_counters_corrige_contadores_divergentes(app):
+    db.session.execute(update(Clube).values(member_count=99))
+    db.session.execute(update(Evento).values(inscritos_count=0))
+    db.session.commit()
+    assert not contadores_batem()
+    rebuild_counters()
+    assert contadores_batem()
+
+
+def test_banco_antigo_ganha_as_colunas_e_os_contadores_preenchidos(app):
+    with db.engine.begin() as conn:
+        conn.execute(text('ALTER TABLE clube DROP COLUMN member_count'))
+        conn.execute(text('ALTER TABLE evento DROP COLUMN inscritos_count'))
+    db.session.expire_all()
+    assert set(sincronizar_esquema()) == {'clube.member_count', 'evento.inscritos_count'}
+    assert contadores_batem()
+    assert sincronizar_esquema() == []
+
+
+def test_primeira_requisicao_sincroniza_o_banco_versionado(tmp_path):
+    banco = tmp_path / 'database.db'
+    shutil.copy(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'database.db'), banco)
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{banco}', 'JOBS_ENABLED': False}, instance_path=str(tmp_path / 'instance'))
+    cliente = app.test_client()
+    with app.app_context():
+        with cliente.session_transaction() as sessao: sessao['user_id'] = db.session.scalar(select(func.min(User.id)))
+        assert cliente.get('/clubes').status_code == 200
+        assert 'clube.member_count' not in esquema_pendente() and contadores_batem()
+        db.session.remove()
+        db.engine.dispose()
@@ -0,0 +1,46 @@
+import os
+import time
+
+from sqlalchemy import select
+
+from nucleo import db
+from modelos import MailOutbox
+from tests.conftest import usuario
+
+
+def mensagens(app, esperadas=1, prazo=5.0):
+    """Arquivos .eml gravados pelo backend 'file', esperando os workers da fila por até prazo segundos."""
+    pasta, limite = os.path.join(app.instance_path, 'mail'), time.monotonic() + prazo
+    while True:
+        arquivos = sorted(os.listdir(pasta)) if os.path.isdir(pasta) else []
+        if len(arquivos) >= esperadas or time.monotonic() > limite:
+            return [open(os.path.join(pasta, nome), 'rb').read() for nome in arquivos]
+        time.sleep(0.02)
+
+
+def test_esqueci_a_senha_responde_sem_esperar_o_envio(client, app):
+    user = usuario('202511110002')
+    resposta = client.post('/forgot_password', data={'email': user.email})
+    assert resposta.status_code == 302
+    enviados = mensagens(app)
+    assert len(enviados) == 1
+    assert user.email.encode() in enviados[0] and b'/reset_password/' in enviados[0]
+
+
+def test_mail_flush_envia_as_pendentes_da_outbox(app):
+    db.session.add(MailOutbox(destinatarios='["aluno@ifpb.edu.br"]', bcc='[]', assunto='Pendente', html='<p>oi</p>'))
+    db.session.commit()
+    saida = app.test_cli_runner().invoke(args=['mail-flush']).output
+    assert '1 mensagens processadas.' in saida
+    assert db.session.scalars(select(MailOutbox.enviado_em)).one() is not None
+    assert len(mensagens(app, prazo=0)) == 1
+
+
+def test_falha_no_smtp_fica_na_outbox_para_nova_tentativa(app):
+    app.config.update(MAIL_BACKEND='smtp', MAIL_SUPPRESS_SEND=False, MAIL_SERVER='127.0.0.1', MAIL_PORT=1, MAIL_USE_TLS=False, MAIL_BACKOFF=3600)
+    db.session.add(MailOutbox(destinatarios='["aluno@ifpb.edu.br"]', bcc='[]', assunto='Pendente', html='<p>oi</p>'))
+    db.session.commit()
+    app.test_cli_runner().invoke(args=['mail-flush'])
+    db.session.expire_all()
+    pendente = db.session.scalars(select(MailOutbox)).one()
+    assert pendente.enviado_em is None and pendente.tentativas == 1 and pendente.erro
@@ -0,0 +1,49 @@
+import os
+import subprocess
+import sys
+
+from sqlalchemy import func, select
+
+from app import create_app
+from nucleo import db, fila_escrita
+from modelos import Clube
+from ranking import get_ranking
+from tests.conftest import usuario
+
+PASTA_APP = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_criar_a_aplicacao_nao_importa_dependencias_pesadas(tmp_path):
+    script = ("import sys, app; criada = app.create_app(instance_path=sys.argv[1]); "
+              "print(sorted(m for m in ('flask_mail', 'flask_migrate', 'alembic', 'PIL') if m in sys.modules), sorted(criada.extensions))")
+    saida = subprocess.run([sys.executable, '-c', script, str(tmp_path)], cwd=PASTA_APP, capture_output=True, text=True, check=True).stdout
+    assert saida.strip() == "[] ['sqlalchemy']"
+
+
+def test_subsistemas_sao_criados_no_primeiro_uso(app, client):
+    assert not {'despachante_email', 'mail', 'fila_escrita'} & set(app.extensions)
+    assert client.get('/login').status_code == 200
+    assert 'despachante_email' not in app.extensions
+    client.post('/forgot_password', data={'email': usuario('202511110002').email})
+    assert 'despachante_email' in app.extensions  # o Flask-Mail em si nasce na thread que envia
+
+
+def test_aplicacoes_da_fabrica_sao_independentes(tmp_path):
+    apps = [create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / f'{nome}.db'}", 'JOBS_ENABLED': False}, instance_path=str(tmp_path / nome))
+            for nome in ('a', 'b')]
+    for app in apps:
+        with app.app_context(): db.create_all()
+    with apps[0].app_context():
+        db.session.add(Clube(nome='Só no primeiro', descricao='-', categoria='Teste'))
+        db.session.commit()
+        fila = fila_escrita()
+        assert len(get_ranking()) == 1
+    with apps[1].app_context():
+        assert db.session.scalar(select(func.count(Clube.id))) == 0
+        assert fila_escrita() is not fila
+        assert get_ranking() == []  # o snapshot da outra aplicação não vaza para esta
+    for app in apps:
+        with app.app_context():
+            fila_escrita().parar()
+            db.session.remove()
+            db.engine.dispose()
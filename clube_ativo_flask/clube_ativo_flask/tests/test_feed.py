@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, event, func, select
+
+from nucleo import db
+from modelos import Clube, Evento, FeedItem, ForumPost, ForumTopico, User, FEED_TIPOS
+from tests.conftest import entrar, usuario
+
+MEMBRO = '202511110002'
+
+
+def entregas(tipo, ref_id):
+    return set(db.session.scalars(select(FeedItem.user_id).where(FeedItem.tipo == FEED_TIPOS[tipo], FeedItem.ref_id == ref_id)))
+
+
+def test_evento_novo_chega_so_aos_membros_do_clube_e_sai_quando_apagado(client):
+    clube = db.session.scalars(select(Clube).filter_by(nome='Clube de Teatro')).one()
+    evento = Evento(titulo='Leitura dramática', descricao='Sala 3', vagas=20, clube_id=clube.id,
+                    data_evento=datetime.now(timezone.utc) + timedelta(days=5))
+    db.session.add(evento)
+    db.session.commit()
+    assert entregas('evento', evento.id) == {membro.id for membro in clube.membros}
+    assert usuario('202511110001').id not in entregas('evento', evento.id)
+    entrar(client, MEMBRO)
+    assert 'Leitura dramática' in client.get('/feed').get_data(as_text=True)
+    db.session.delete(evento)
+    db.session.commit()
+    assert entregas('evento', evento.id) == set()
+
+
+def test_resposta_vai_para_o_autor_do_topico_e_o_backfill_reconstroi(app):
+    autor, outro = usuario('202522220001'), usuario(MEMBRO)
+    topico = db.session.scalars(select(ForumTopico).filter_by(user_id=autor.id)).first() or ForumTopico(
+        titulo='Elenco', conteudo='Quem topa?', user_id=autor.id, clube_id=db.session.scalars(select(Clube.id).filter_by(nome='Clube de Teatro')).one())
+    propria, resposta = ForumPost(conteudo='Atualizando', user_id=autor.id, topico=topico), ForumPost(conteudo='Eu topo', user_id=outro.id, topico=topico)
+    db.session.add_all([propria, resposta])
+    db.session.commit()
+    assert entregas('post', resposta.id) == {autor.id} and entregas('post', propria.id) == set()
+    total = db.session.scalar(select(func.count(FeedItem.id)))
+    db.session.execute(delete(FeedItem))
+    db.session.commit()
+    assert 'entregas gravadas no feed' in app.test_cli_runner().invoke(args=['feed-backfill']).output
+    assert db.session.scalar(select(func.count(FeedItem.id))) == total
+
+
+def test_excluir_conta_apaga_o_feed_antes_do_usuario(client):
+    user = entrar(client, MEMBRO)
+    assert db.session.scalar(select(func.count()).select_from(FeedItem).where(FeedItem.user_id == user.id))
+    # como no Postgres, a chave estrangeira feed_item.user_id passa a ser verificada
+    event.listen(db.engine, 'connect', lambda conexao, registro: conexao.execute('PRAGMA foreign_keys=ON'))
+    db.session.remove()
+    db.engine.dispose()
+    assert client.post('/account/delete', data={'password': '123456'}).status_code == 302
+    assert db.session.get(User, user.id) is None
+    assert not db.session.scalar(select(func.count()).select_from(FeedItem).where(FeedItem.user_id == user.id))
@@ -0,0 +1,36 @@
+from sqlalchemy import func, select
+
+from nucleo import db
+from modelos import Clube, ForumPost, ForumTopico
+from tests.conftest import entrar
+
+MEMBRO = '202511110002'
+
+
+def criar_topico(client, clube_id):
+    resposta = client.post(f'/clube/{clube_id}/forum/novo', data={'titulo': 'Dúvida', 'conteudo': 'Alguém tem o edital?'})
+    assert resposta.status_code == 302
+    return db.session.scalars(select(ForumTopico.id).filter_by(clube_id=clube_id).order_by(ForumTopico.id.desc())).first()
+
+
+def test_resposta_no_forum_respeita_orcamento_em_modo_de_teste(client):
+    entrar(client, MEMBRO)
+    clube_id = db.session.scalars(select(Clube.id).filter_by(nome='Clube de Programação')).one()
+    topico_id = criar_topico(client, clube_id)
+    resposta = client.post(f'/clube/{clube_id}/forum/topico/{topico_id}', data={'conteudo': 'Está no site do campus.'})
+    assert resposta.status_code == 302
+    assert db.session.scalar(select(func.count(ForumPost.id)).filter_by(topico_id=topico_id)) == 1
+
+
+def test_thread_carrega_autores_sem_n_mais_1(client):
+    entrar(client, MEMBRO)
+    clube_id = db.session.scalars(select(Clube.id).filter_by(nome='Clube de Programação')).one()
+    topico_id = criar_topico(client, clube_id)
+    for i in range(10): client.post(f'/clube/{clube_id}/forum/topico/{topico_id}', data={'conteudo': f'resposta {i}'})
+    entrar(client, '202511110001')  # outro autor na mesma thread
+    client.post(f'/clube/{clube_id}/forum/topico/{topico_id}', data={'conteudo': 'resposta do líder'})
+    # o GET verifica o orçamento de @query_budget em modo de teste: N autores não viram N consultas
+    resposta = client.get(f'/clube/{clube_id}/forum/topico/{topico_id}')
+    assert resposta.status_code == 200
+    assert b'resposta do l' in resposta.data
+    assert client.get(f'/clube/{clube_id}/forum').status_code == 200
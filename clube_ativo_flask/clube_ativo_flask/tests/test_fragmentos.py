@@ -0,0 +1,50 @@
+import pytest
+from sqlalchemy import update
+
+from app import create_app
+from fragmentos import fragmento
+from nucleo import db
+from modelos import Clube
+from tests.conftest import entrar
+
+
+@pytest.mark.parametrize('backend', ['memoria', 'arquivos'])
+def test_fragmento_so_renderiza_de_novo_depois_de_um_commit_na_tabela(app, backend):
+    app.config['FRAGMENT_CACHE'] = backend
+    chamadas = []
+    renderizar = lambda: chamadas.append(1) or f'<p>{len(chamadas)}</p>'
+    assert fragmento('teste', ('clube',), renderizar) == '<p>1</p>'
+    assert fragmento('teste', ('clube',), renderizar) == '<p>1</p>'
+    db.session.execute(update(Clube).values(descricao='Rascunho'))
+    db.session.rollback()  # escrita desfeita não avança a geração
+    db.session.remove()
+    assert fragmento('teste', ('clube',), renderizar) == '<p>1</p>'
+    db.session.execute(update(Clube).where(Clube.nome == 'Clube de Teatro').values(descricao='Nova descrição'))
+    db.session.commit()
+    db.session.remove()
+    assert fragmento('teste', ('clube',), renderizar) == '<p>2</p>'
+    assert fragmento('teste', ('clube',), renderizar, 'outra página') == '<p>3</p>'
+
+
+def test_pagina_em_cache_mostra_o_clube_criado(client):
+    entrar(client, '202511110002')
+    assert 'Clube de Xadrez' not in client.get('/clubes').get_data(as_text=True)
+    db.session.add(Clube(nome='Clube de Xadrez', descricao='Partidas às quintas', categoria='Jogos'))
+    db.session.commit()
+    db.session.remove()
+    assert 'Clube de Xadrez' in client.get('/clubes').get_data(as_text=True)
+
+
+def test_escrita_em_um_worker_invalida_o_cache_em_memoria_do_outro(app):
+    app.config['FRAGMENT_CACHE'] = 'memoria'
+    outro = create_app({'SQLALCHEMY_DATABASE_URI': app.config['SQLALCHEMY_DATABASE_URI'], 'FRAGMENT_CACHE_DIR': app.config['FRAGMENT_CACHE_DIR'],
+                        'JOBS_ENABLED': False}, instance_path=app.instance_path)
+    chamadas = []
+    renderizar = lambda: chamadas.append(1) or f'<p>{len(chamadas)}</p>'
+    assert fragmento('teste', ('clube',), renderizar) == '<p>1</p>'
+    with outro.app_context():
+        db.session.execute(update(Clube).where(Clube.nome == 'Clube de Teatro').values(descricao='Mudou no outro worker'))
+        db.session.commit()
+        db.session.remove()
+        db.engine.dispose()
+    assert fragmento('teste', ('clube',), renderizar) == '<p>2</p>'
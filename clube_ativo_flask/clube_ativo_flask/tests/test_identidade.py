@@ -0,0 +1,55 @@
+from sqlalchemy import delete, func, insert, select
+
+from nucleo import db
+from modelos import membros_clube_tabela, Clube, User
+from identidade import carregar_identidade
+from senhas import senhas
+from tests.conftest import entrar
+
+MEMBRO = '202511110002'
+
+
+def clube_id(nome):
+    return db.session.scalars(select(Clube.id).filter_by(nome=nome)).one()
+
+
+def test_acesso_ao_forum_consulta_o_banco_e_nao_o_cache(client):
+    user = entrar(client, MEMBRO)
+    programacao = clube_id('Clube de Programação')
+    assert client.get(f'/clube/{programacao}/forum').status_code == 200
+    assert programacao in carregar_identidade(user.id).clube_ids
+    # outro worker remove a matrícula sem conseguir invalidar o cache deste processo
+    mc = membros_clube_tabela.c
+    db.session.execute(delete(membros_clube_tabela).where(mc.user_id == user.id, mc.clube_id == programacao))
+    db.session.commit()
+    assert client.get(f'/clube/{programacao}/forum').status_code == 302
+    assert client.get(f'/api/v1/clubes/{programacao}/topicos').status_code == 403
+
+
+def test_excluir_conta_desconta_clubes_lidos_do_banco(client):
+    user = entrar(client, MEMBRO)
+    client.get('/clubes')  # identidade fica em cache sem o clube abaixo
+    esportes = clube_id('Clube de Esportes')
+    db.session.execute(insert(membros_clube_tabela).values(user_id=user.id, clube_id=esportes))
+    db.session.execute(Clube.__table__.update().where(Clube.id == esportes).values(member_count=Clube.member_count + 1))
+    db.session.commit()
+    resposta = client.post('/account/delete', data={'password': '123456'})
+    assert resposta.status_code == 302
+    assert db.session.get(User, user.id) is None
+    db.session.expire_all()
+    mc = membros_clube_tabela.c
+    reais = dict(db.session.execute(select(mc.clube_id, func.count()).group_by(mc.clube_id)).all())
+    for clube in Clube.query:
+        assert clube.member_count == reais.get(clube.id, 0), clube.nome
+
+
+def test_troca_de_senha_confere_o_hash_do_banco(client):
+    user = entrar(client, MEMBRO)
+    client.get('/account')  # identidade em cache com o hash atual
+    db.session.execute(db.update(User).where(User.id == user.id).values(password_hash=senhas().gerar('trocada-em-outro-worker')))
+    db.session.commit()
+    dados = {'old_password': '123456', 'new_password': 'nova', 'confirm_password': 'nova'}
+    assert 'A senha antiga está incorreta' in client.post('/account/change_password', data=dados, follow_redirects=True).get_data(as_text=True)
+    dados['old_password'] = 'trocada-em-outro-worker'
+    assert 'Senha alterada com sucesso' in client.post('/account/change_password', data=dados, follow_redirects=True).get_data(as_text=True)
+    assert carregar_identidade(user.id).user.password_hash == db.session.get(User, user.id).password_hash
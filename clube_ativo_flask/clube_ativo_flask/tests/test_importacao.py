@@ -0,0 +1,34 @@
+import io
+from datetime import date
+
+from sqlalchemy import event, select
+
+from importacao import exportar_dados, importar_dados
+from nucleo import db
+from modelos import CardapioRU
+
+CABECALHO = 'data,prato_principal,vegetariano,acompanhamento,salada,sobremesa\n'
+
+
+def test_chave_repetida_no_lote_fica_com_a_ultima_linha(app):
+    arquivo = io.StringIO(CABECALHO + '2030-03-04,Peixe,Quiche,Arroz,Alface,Pudim\n'
+                                      '2030-03-05,Carne,Lasanha,Purê,Rúcula,Fruta\n'
+                                      '04/03/2030,Frango,Omelete,Arroz,Alface,Gelatina\n')
+    lotes = []
+    event.listen(db.engine, 'before_cursor_execute', lambda conn, cursor, sql, parametros, contexto, executemany:
+                 lotes.append(len(parametros) if executemany else len(parametros) // 6) if sql.startswith('INSERT INTO cardapio_ru') else None)
+    assert importar_dados('cardapio', arquivo, 'csv') == (3, [])
+    assert sum(lotes) == 2  # a linha repetida não chega ao banco
+    cardapio = db.session.scalars(select(CardapioRU).filter_by(data=date(2030, 3, 4))).one()
+    assert (cardapio.prato_principal, cardapio.sobremesa) == ('Frango', 'Gelatina')
+
+
+def test_linhas_invalidas_sao_relatadas_e_as_validas_gravadas(app):
+    arquivo = io.StringIO('{"data": "2030-04-01", "prato_principal": "A", "vegetariano": "B", "acompanhamento": "C", "salada": "D", "sobremesa": "E"}\n'
+                          'não é json\n'
+                          '{"data": "31/02/2030", "prato_principal": "A"}\n')
+    validas, erros = importar_dados('cardapio', arquivo, 'jsonl')
+    assert validas == 1 and [numero for numero, _ in erros] == [2, 3]
+    saida = io.StringIO()
+    exportar_dados('cardapio', saida, 'csv')
+    assert '2030-04-01,A,B,C,D,E' in saida.getvalue()
@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+
+from app import INSCRITO, LISTA_ESPERA, reservar_vaga, cancelar_inscricao
+from nucleo import db
+from modelos import inscricao_evento_tabela, lista_espera_tabela, Clube, Evento
+from tests.conftest import entrar, usuario
+
+
+def evento_de_uma_vaga():
+    clube_id = db.session.scalars(select(Clube.id).filter_by(nome='Clube de Teatro')).one()
+    evento = Evento(titulo='Ensaio aberto', descricao='Palco pequeno', vagas=1, clube_id=clube_id,
+                    data_evento=datetime.now(timezone.utc) + timedelta(days=3))
+    db.session.add(evento)
+    db.session.commit()
+    return evento.id
+
+
+def test_evento_lotado_vai_para_a_lista_de_espera_e_promove_no_cancelamento(app):
+    evento_id = evento_de_uma_vaga()
+    primeiro, segundo = usuario('202511110001').id, usuario('202511110002').id
+    with db.engine.begin() as conn:
+        assert reservar_vaga(conn, primeiro, evento_id) == INSCRITO
+        assert reservar_vaga(conn, segundo, evento_id) == LISTA_ESPERA
+        assert reservar_vaga(conn, primeiro, evento_id) is None
+        assert reservar_vaga(conn, segundo, evento_id) == LISTA_ESPERA  # não entra duas vezes na fila
+    with db.engine.begin() as conn: assert cancelar_inscricao(conn, primeiro, evento_id) == segundo
+    inscritos = set(db.session.scalars(select(inscricao_evento_tabela.c.user_id).where(inscricao_evento_tabela.c.evento_id == evento_id)))
+    assert inscritos == {segundo}
+    assert db.session.scalars(select(lista_espera_tabela.c.user_id).where(lista_espera_tabela.c.evento_id == evento_id)).all() == []
+    assert db.session.get(Evento, evento_id).inscritos_count == 1
+
+
+def test_rota_de_inscricao_avisa_lista_de_espera(client):
+    evento_id = evento_de_uma_vaga()
+    entrar(client, '202511110001')
+    assert 'Inscrição realizada' in client.post(f'/evento/{evento_id}/inscrever', follow_redirects=True).get_data(as_text=True)
+    entrar(client, '202511110002')
+    assert 'lista de espera' in client.post(f'/evento/{evento_id}/inscrever', follow_redirects=True).get_data(as_text=True)
+
+
+def test_inscricoes_simultaneas_nao_vendem_vaga_a_mais(app):
+    resultado = app.test_cli_runner().invoke(args=['loadtest-inscricoes', '--inscricoes', '60', '--vagas', '10', '--threads', '8'])
+    assert resultado.exit_code == 0, resultado.output
+    assert 'Nenhuma vaga vendida a mais.' in resultado.output
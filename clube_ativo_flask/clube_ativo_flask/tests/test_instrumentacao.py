@@ -0,0 +1,26 @@
+import re
+
+import pytest
+
+from tests.conftest import entrar
+
+
+def test_server_timing_conta_as_consultas(client):
+    entrar(client, '202511110002')
+    resposta = client.get('/clubes')
+    medicao = re.match(r'db;dur=[\d.]+;desc="(\d+) consultas", render;dur=[\d.]+, total;dur=[\d.]+', resposta.headers['Server-Timing'])
+    assert medicao and int(medicao[1]) > 0
+
+
+def test_orcamento_de_consultas_estourado_falha_em_modo_de_teste(client, app):
+    entrar(client, '202511110002')
+    app.config['QUERY_BUDGET'] = 1
+    with pytest.raises(AssertionError, match='orçamento: 1'):
+        client.get('/eventos')
+
+
+def test_perf_report_lista_os_endpoints_medidos(client, app):
+    entrar(client, '202511110002')
+    client.get('/ranking')
+    saida = app.test_cli_runner().invoke(args=['perf-report']).output
+    assert 'main.ranking' in saida and 'p95 ms' in saida
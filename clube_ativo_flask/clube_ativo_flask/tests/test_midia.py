@@ -0,0 +1,67 @@
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import select
+
+from nucleo import db
+from midia import agendar_variantes
+from modelos import Clube, ClubeMedia
+from tests.conftest import entrar
+
+LIDER = '202511110001'
+
+
+def enviar(client, clube_id, conteudo, nome):
+    return client.post(f'/clube/{clube_id}/media', data={'media_file': (io.BytesIO(conteudo), nome), 'descricao': 'Ata'},
+                       content_type='multipart/form-data', follow_redirects=True)
+
+
+def arquivos(app):
+    pasta = app.config['CLUB_MEDIA_FOLDER']
+    return sorted(os.listdir(pasta)) if os.path.isdir(pasta) else []
+
+
+def programacao():
+    return db.session.scalars(select(Clube.id).filter_by(nome='Clube de Programação')).one()
+
+
+def test_upload_recebe_o_nome_pelo_hash_e_o_tipo_pelos_bytes(client, app):
+    entrar(client, LIDER)
+    clube_id = programacao()
+    conteudo = b'%PDF-1.4\n' + b'x' * 200_000
+    assert 'Arquivo enviado com sucesso' in enviar(client, clube_id, conteudo, 'ata.pdf').get_data(as_text=True)
+    media = db.session.scalars(select(ClubeMedia).filter_by(clube_id=clube_id)).one()
+    assert media.mime_type == 'application/pdf' and media.tamanho_bytes == len(conteudo)
+    assert media.filename.startswith(f'clube{clube_id}_') and media.filename.endswith('.pdf')
+    assert arquivos(app) == [media.filename]
+    enviar(client, clube_id, conteudo, 'copia.pdf')  # mesmo conteúdo, mesmo arquivo
+    assert arquivos(app) == [media.filename]
+
+
+def test_extensao_falsa_e_recusada_pelo_conteudo(client, app):
+    entrar(client, LIDER)
+    resposta = enviar(client, programacao(), b'<?php echo "oi"; ?>', 'foto.png')
+    assert 'Tipo de arquivo inválido' in resposta.get_data(as_text=True)
+    assert db.session.scalars(select(ClubeMedia)).all() == []
+    assert arquivos(app) == []
+
+
+def test_arquivo_acima_do_limite_e_interrompido(client, app):
+    entrar(client, LIDER)
+    app.config['MAX_UPLOAD_MB'] = 1
+    resposta = enviar(client, programacao(), b'%PDF-1.4\n' + b'x' * (3 * 1024 * 1024 // 2), 'grande.pdf')
+    assert 'maior que o limite de 1 MB' in resposta.get_data(as_text=True)
+    assert arquivos(app) == []
+    app.config['MAX_CONTENT_LENGTH'] = 4096
+    resposta = enviar(client, programacao(), b'%PDF-1.4\n' + b'x' * 8192, 'grande.pdf')
+    assert resposta.status_code == 200 and 'maior que o limite' in resposta.get_data(as_text=True)
+
+
+def test_pool_de_miniaturas_e_um_so_por_aplicacao(app):
+    app.config['MEDIA_WORKERS'] = 3
+    def agendar(_):
+        with app.app_context(): return agendar_variantes('media', 0, app.config['CLUB_MEDIA_FOLDER'], 'ata.pdf', 'pdf')
+    with ThreadPoolExecutor(max_workers=8) as executor: tarefas = list(executor.map(agendar, range(16)))
+    for tarefa in tarefas: tarefa.result()
+    assert app.extensions['pool_media']._max_workers == 3
@@ -0,0 +1,60 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import func, insert, select, text
+
+from app import create_app
+from nucleo import db, escrever, fila_escrita
+from modelos import Clube
+from tests.conftest import entrar
+
+
+@pytest.fixture(autouse=True)
+def sem_fila_entre_testes(app):
+    yield
+    app.config['DB_WRITE_QUEUE'] = False
+
+
+def test_conexoes_sqlite_recebem_os_pragmas_de_producao(app):
+    assert db.session.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+    assert db.session.execute(text('PRAGMA busy_timeout')).scalar() == app.config['SQLITE_BUSY_TIMEOUT_MS']
+
+
+def test_sqlite_pragmas_desligado_mantem_o_padrao(tmp_path):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'padrao.db'}", 'SQLITE_PRAGMAS': False},
+                     instance_path=str(tmp_path / 'instance'))
+    with app.app_context():
+        assert db.session.execute(text('PRAGMA journal_mode')).scalar() == 'delete'
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_fila_de_escrita_devolve_resultados_e_excecoes_a_cada_chamador(app):
+    app.config['DB_WRITE_QUEUE'] = True
+
+    def criar_clube(conn, nome):
+        if nome.endswith('7'): raise ValueError(nome)
+        return conn.execute(insert(Clube.__table__).values(nome=nome, descricao='-', categoria='Teste')).inserted_primary_key[0]
+
+    def chamar(i):
+        with app.app_context():
+            try: return escrever(criar_clube, f'Clube da fila {i}')
+            except ValueError as erro: return str(erro)
+
+    with ThreadPoolExecutor(max_workers=8) as executor: resultados = list(executor.map(chamar, range(40)))
+    fila_escrita().parar()
+    assert [r for r in resultados if isinstance(r, str)] == [f'Clube da fila {i}' for i in range(40) if i % 10 == 7]
+    assert len({r for r in resultados if isinstance(r, int)}) == 36
+    assert db.session.scalar(select(func.count(Clube.id)).where(Clube.nome.like('Clube da fila %'))) == 36
+
+
+def test_rotas_escrevem_pela_fila_quando_ligada(client, app):
+    app.config['DB_WRITE_QUEUE'] = True
+    entrar(client, '202522220001')
+    clube = db.session.scalars(select(Clube).filter_by(nome='Clube de Esportes')).one()
+    antes = clube.member_count
+    assert client.post(f'/clube/{clube.id}/join').status_code == 302
+    fila_escrita().parar()
+    db.session.refresh(clube)
+    assert clube.member_count == antes + 1
+
@@ -0,0 +1,37 @@
+from datetime import date, datetime
+
+from sqlalchemy import select
+
+from nucleo import db, codificar_cursor, decodificar_cursor, paginar_keyset
+from modelos import Noticia
+from tests.conftest import entrar
+
+
+def test_cursor_ida_e_volta():
+    instante = datetime(2025, 9, 1, 12, 30)
+    assert decodificar_cursor(codificar_cursor(instante, 7)) == (instante, 7)
+    assert decodificar_cursor(codificar_cursor(date(2025, 9, 1), 3), date) == (date(2025, 9, 1), 3)
+    assert decodificar_cursor(codificar_cursor('Teatro', 2), str) == ('Teatro', 2)
+    assert decodificar_cursor('lixo') is None
+
+
+def test_paginas_cobrem_tudo_sem_repetir_com_datas_empatadas(app):
+    empate = datetime(2025, 3, 1, 9, 0)
+    db.session.add_all(Noticia(titulo=f'Nota {i}', conteudo='...', data_publicacao=empate) for i in range(7))
+    db.session.commit()
+    esperado = [n.id for n in db.session.scalars(select(Noticia).order_by(Noticia.data_publicacao.desc(), Noticia.id.desc()))]
+    vistos, cursor = [], None
+    while True:
+        itens, cursor = paginar_keyset(Noticia.query, Noticia.data_publicacao, cursor, desc=True, por_pagina=3)
+        vistos += [n.id for n in itens]
+        if cursor is None: break
+    assert vistos == esperado
+
+
+def test_lista_de_eventos_segue_o_cursor(client, app):
+    app.config['ITENS_POR_PAGINA'] = 1
+    entrar(client, '202511110002')
+    primeira = client.get('/eventos')
+    assert primeira.status_code == 200
+    assert b'cursor=' in primeira.data
+    assert client.get('/eventos?cursor=invalido').status_code == 200
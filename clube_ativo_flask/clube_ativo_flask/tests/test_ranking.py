@@ -0,0 +1,28 @@
+from sqlalchemy import func, select
+
+from nucleo import db
+from modelos import membros_clube_tabela, Clube
+from ranking import RANKING_METRICAS, get_ranking
+from tests.conftest import entrar
+
+LIDER_TEATRO = '202522220001'
+
+
+def test_ranking_ordena_pelos_totais_do_banco(app):
+    membros = dict(db.session.execute(select(membros_clube_tabela.c.clube_id, func.count()).group_by(membros_clube_tabela.c.clube_id)).all())
+    ranking = get_ranking('membros')
+    assert [linha['membros'] for linha in ranking] == sorted((linha['membros'] for linha in ranking), reverse=True)
+    assert all(linha['membros'] == membros.get(linha['id'], 0) for linha in ranking)
+    assert len(ranking) == db.session.scalar(select(func.count(Clube.id)))
+    for metrica in RANKING_METRICAS: assert len(get_ranking(metrica)) == len(ranking)
+
+
+def test_entrar_num_clube_invalida_o_snapshot(client):
+    esportes = db.session.scalars(select(Clube.id).filter_by(nome='Clube de Esportes')).one()
+    antes = {linha['id']: linha['membros'] for linha in get_ranking('membros')}[esportes]
+    entrar(client, LIDER_TEATRO)
+    client.post(f'/clube/{esportes}/join')
+    assert {linha['id']: linha['membros'] for linha in get_ranking('membros')}[esportes] == antes + 1
+    resposta = client.get('/ranking?metrica=forum')
+    assert resposta.status_code == 200
+    assert client.get('/ranking?metrica=inexistente').status_code == 200
@@ -0,0 +1,76 @@
+from sqlalchemy import delete, insert, select
+
+from app import cache_selos, conceder_selos, selos_por_nome
+from nucleo import db
+from modelos import user_badges_tabela, Badge, Clube, User
+from tests.conftest import entrar, usuario
+
+LIDER_TEATRO = '202522220001'
+
+
+def selos(user_id):
+    return set(db.session.scalars(select(Badge.nome).join(user_badges_tabela, user_badges_tabela.c.badge_id == Badge.id)
+                                  .where(user_badges_tabela.c.user_id == user_id)))
+
+
+def clube_id(nome):
+    return db.session.scalars(select(Clube.id).filter_by(nome=nome)).one()
+
+
+def test_contagem_de_clubes_vem_do_banco(client):
+    user = entrar(client, LIDER_TEATRO)
+    assert 'Socialite do Campus' not in selos(user.id)
+    client.post(f"/clube/{clube_id('Clube de Esportes')}/join")
+    assert 'Socialite do Campus' not in selos(user.id)
+    resposta = client.post(f"/clube/{clube_id('Clube de Robótica')}/join", follow_redirects=True)
+    assert 'Socialite do Campus' in selos(user.id)
+    assert 'Selo Desbloqueado: &#34;Socialite do Campus&#34;' in resposta.get_data(as_text=True)
+
+
+def test_selo_ja_gravado_por_outro_worker_nao_quebra_a_entrada(client):
+    user = entrar(client, LIDER_TEATRO)
+    client.get('/clubes')  # identidade em cache antes do selo abaixo
+    socialite = db.session.scalars(select(Badge.id).filter_by(nome='Socialite do Campus')).one()
+    db.session.execute(insert(user_badges_tabela).values(user_id=user.id, badge_id=socialite))
+    db.session.commit()
+    client.post(f"/clube/{clube_id('Clube de Esportes')}/join")
+    resposta = client.post(f"/clube/{clube_id('Clube de Robótica')}/join")
+    assert resposta.status_code == 302
+    assert 'Socialite do Campus' in selos(user.id)
+
+
+def test_conceder_selos_e_idempotente(app):
+    user = usuario(LIDER_TEATRO)
+    with db.engine.begin() as conn:
+        assert conceder_selos(conn, user.id, 'clube') == []  # já tinha 'Explorador de Clubes' pelo seed
+    assert 'Explorador de Clubes' in selos(user.id)
+
+
+def test_cadastro_concede_membro_pioneiro(client):
+    resposta = client.post('/register', data={'email': 'novo@ifpb.edu.br', 'username': '202533330001', 'password': 'segredo'})
+    assert resposta.status_code == 302
+    novo = db.session.scalars(select(User).filter_by(username='202533330001')).one()
+    assert selos(novo.id) == {'Membro Pioneiro'}
+
+
+def test_primeiro_topico_concede_pioneiro_do_forum(client):
+    user = entrar(client, LIDER_TEATRO)
+    client.post(f"/clube/{clube_id('Clube de Teatro')}/forum/novo", data={'titulo': 'Ensaio', 'conteudo': 'Sábado às 14h.'})
+    assert 'Pioneiro do Fórum' in selos(user.id)
+
+
+def test_cache_de_selos_e_relido_quando_a_tabela_muda(app):
+    with db.engine.connect() as conn: ids = selos_por_nome(conn)
+    assert cache_selos()['ids'] is ids
+    db.session.add(Badge(nome='Maratonista', descricao='Cinco eventos no mês.', icon_class='fas fa-running'))
+    db.session.commit()
+    assert cache_selos()['ids'] is None
+
+
+def test_selo_criado_depois_de_o_cache_encher_e_concedido(app):
+    user = usuario(LIDER_TEATRO)
+    db.session.execute(delete(user_badges_tabela).where(user_badges_tabela.c.user_id == user.id))
+    db.session.commit()
+    # cache cheio antes de outro processo semear 'Explorador de Clubes'
+    cache_selos()['ids'] = {nome: i for nome, i in db.session.execute(select(Badge.nome, Badge.id)) if nome != 'Explorador de Clubes'}
+    with db.engine.begin() as conn: assert 'Explorador de Clubes' in conceder_selos(conn, user.id, 'clube')
@@ -0,0 +1,30 @@
+from sqlalchemy import func, select, update
+
+from app import semear_fixtures
+from nucleo import db
+from modelos import Clube, FeedItem, ForumTopico, User
+from tests.conftest import usuario
+
+
+def test_semear_de_novo_nao_grava_nada(app):
+    contagens = lambda: [db.session.scalar(select(func.count(modelo.id))) for modelo in (User, Clube, FeedItem)]
+    antes = contagens()
+    assert all(resumo == (0, 0) for resumo in semear_fixtures().values())
+    assert contagens() == antes
+    assert 'Fixtures já estavam em dia' in app.test_cli_runner().invoke(args=['seed-db']).output
+
+
+def test_seed_db_preserva_dados_dos_usuarios_e_so_corrige_as_fixtures(app):
+    membro = usuario('202511110002')
+    membro.password_hash = 'senha-trocada-pelo-usuario'
+    clube = db.session.scalars(select(Clube).filter_by(nome='Clube de Teatro')).one()
+    db.session.add(ForumTopico(titulo='Audições', conteudo='Sexta às 14h', user_id=membro.id, clube_id=clube.id))
+    db.session.execute(update(Clube).where(Clube.id == clube.id).values(descricao='Editada à mão'))
+    db.session.commit()
+    resultado = app.test_cli_runner().invoke(args=['seed-db'])
+    assert resultado.exit_code == 0, resultado.output
+    assert 'clube: 0 novas, 1 alteradas' in resultado.output
+    db.session.expire_all()
+    assert usuario('202511110002').password_hash == 'senha-trocada-pelo-usuario'
+    assert db.session.scalars(select(ForumTopico).filter_by(titulo='Audições')).one()
+    assert db.session.get(Clube, clube.id).descricao != 'Editada à mão'
@@ -0,0 +1,53 @@
+import pytest
+
+from senhas import HashSobrecarregado, parametros_hash, senhas
+from nucleo import db
+from tests.conftest import usuario
+
+MEMBRO = '202511110002'
+
+
+def test_parametros_hash_preenche_os_padroes_do_werkzeug():
+    assert parametros_hash('scrypt') == parametros_hash('scrypt:32768:8:1')
+    assert parametros_hash('scrypt:16384') != parametros_hash('scrypt')
+    assert parametros_hash('pbkdf2') == parametros_hash('pbkdf2:sha256')
+    assert parametros_hash('pbkdf2:sha256:1000') != parametros_hash('pbkdf2:sha256:10000')
+
+
+def test_precisa_refazer_compara_parametros_e_nao_texto(app):
+    app.config['PASSWORD_HASH_METHOD'] = 'scrypt'
+    assert not senhas().precisa_refazer('scrypt:32768:8:1$sal$hash')
+    assert senhas().precisa_refazer('scrypt:16384:8:1$sal$hash')
+    assert senhas().precisa_refazer('pbkdf2:sha256:1000$sal$hash')
+
+
+def test_login_refaz_o_hash_quando_o_metodo_muda(app, client):
+    app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:2000'
+    assert client.post('/login', data={'username': MEMBRO, 'password': '123456'}).status_code == 302
+    db.session.expire_all()
+    assert usuario(MEMBRO).password_hash.startswith('pbkdf2:sha256:2000$')
+
+
+def test_rajada_de_tentativas_recebe_429(app, client):
+    for _ in range(app.config['LOGIN_RAJADA_USUARIO']):
+        assert client.post('/login', data={'username': MEMBRO, 'password': 'errada'}).status_code == 200
+    resposta = client.post('/login', data={'username': MEMBRO, 'password': '123456'})
+    assert resposta.status_code == 429 and int(resposta.headers['Retry-After']) > 0
+
+
+def test_pool_de_processos_usa_spawn(app):
+    app.config['PASSWORD_HASH_POOL'] = 'processos'
+    pool = senhas()
+    try:
+        hash_senha = pool.gerar('segredo')
+        assert pool.verificar(hash_senha, 'segredo') and not pool.verificar(hash_senha, 'outra')
+        assert pool.executor._mp_context.get_start_method() == 'spawn'
+    finally: pool.parar()
+
+
+def test_hash_que_passa_do_prazo_vira_sobrecarga(app):
+    app.config.update(PASSWORD_HASH_POOL='processos', PASSWORD_HASH_TIMEOUT=0.001)
+    pool = senhas()
+    try:
+        with pytest.raises(HashSobrecarregado): pool.gerar('segredo')  # o pool spawn nem terminou de subir
+    finally: pool.parar()
@@ -0,0 +1,36 @@
+from datetime import date, timedelta
+
+from sqlalchemy import select
+
+from nucleo import db
+from modelos import CardapioRU
+from tests.conftest import entrar
+
+
+def test_cardapio_json_responde_304_ate_o_cardapio_mudar(client):
+    resposta = client.get('/cardapio.json')
+    assert resposta.status_code == 200 and len(resposta.get_json()['itens']) == 5
+    etag = resposta.headers['ETag']
+    assert client.get('/cardapio.json', headers={'If-None-Match': etag}).status_code == 304
+    segunda = date.today() - timedelta(days=date.today().weekday())
+    db.session.scalars(select(CardapioRU).filter_by(data=segunda)).one().prato_principal = 'Moqueca de peixe'
+    db.session.commit()
+    resposta = client.get('/cardapio.json', headers={'If-None-Match': etag})
+    assert resposta.status_code == 200 and resposta.headers['ETag'] != etag
+    assert resposta.get_json()['itens'][0]['prato_principal'] == 'Moqueca de peixe'
+    entrar(client, '202511110002')
+    assert 'Moqueca de peixe' in client.get('/cardapio').get_data(as_text=True)
+
+
+def test_ics_traz_a_semana_e_responde_304(client):
+    resposta = client.get('/cardapio.ics')
+    corpo = resposta.get_data(as_text=True)
+    assert resposta.mimetype == 'text/calendar' and corpo.startswith('BEGIN:VCALENDAR\r\n')
+    assert corpo.count('BEGIN:VEVENT') == 5
+    assert client.get('/cardapio.ics', headers={'If-None-Match': resposta.headers['ETag']}).status_code == 304
+
+
+def test_periodos_fora_do_formato_dao_404(client):
+    assert client.get('/cardapio.json?semana=2025-W99').status_code == 404
+    assert client.get('/calendario_academico.json?mes=setembro').status_code == 404
+    assert client.get('/cardapio.xml').status_code == 404
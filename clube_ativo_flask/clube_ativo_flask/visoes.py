@@ -0,0 +1,154 @@
+import os
+import json
+import hashlib
+from datetime import datetime, timezone, date, timedelta
+from flask import Response, current_app, request, abort
+from sqlalchemy import event, select, delete, inspect
+from sqlalchemy.orm import Session
+from nucleo import bp, db, configuracao, escrever, escrita_derivada, upsert
+from modelos import CardapioRU, CalendarioAcademico, VisaoCalendario
+
+# --- VISÕES DE SEMANA E MÊS (CARDÁPIO E CALENDÁRIO) ---
+# Cardápio por semana ISO e calendário por mês, lidos já montados de visao_calendario e refeitos após o flush
+# que altera as tabelas; os feeds .json e .ics respondem 304. 'flask calendario-materializar' refaz tudo.
+VISOES_CALENDARIO = {'semana': CardapioRU, 'mes': CalendarioAcademico}
+VISOES_POR_MODELO = {modelo: tipo for tipo, modelo in VISOES_CALENDARIO.items()}
+# Períodos incluídos no .ics, relativos ao atual: (anteriores, seguintes).
+JANELA_ICS = {'semana': (1, 8), 'mes': (1, 12)}
+
+@configuracao
+def configurar_visoes(app):
+    app.config.setdefault('CALENDARIO_FEED_MAX_AGE', int(os.getenv('CALENDARIO_FEED_MAX_AGE', 300)))
+
+def periodo(tipo, dia):
+    """(chave, início, fim exclusivo) da semana ISO ou do mês que contém dia."""
+    if tipo == 'semana':
+        inicio = dia - timedelta(days=dia.weekday())
+        ano, semana, _ = inicio.isocalendar()
+        return f'{ano}-W{semana:02d}', inicio, inicio + timedelta(days=7)
+    inicio = dia.replace(day=1)
+    return f'{inicio:%Y-%m}', inicio, (inicio + timedelta(days=32)).replace(day=1)
+
+def deslocar_periodo(tipo, inicio, n):
+    """Início do período n posições depois (ou antes, se n < 0) do que começa em inicio."""
+    if tipo == 'semana': return inicio + timedelta(weeks=n)
+    mes = inicio.year * 12 + inicio.month - 1 + n
+    return date(mes // 12, mes % 12 + 1, 1)
+
+def periodo_pedido(tipo, chave=None):
+    """Período da chave vinda da URL ('2025-W37' ou '2025-09'), ou o atual se não houver; 404 se for inválida."""
+    if not chave: return periodo(tipo, date.today())
+    try:
+        if tipo == 'semana':
+            ano, semana = chave.split('-W')
+            dia = date.fromisocalendar(int(ano), int(semana), 1)
+        else: dia = datetime.strptime(chave, '%Y-%m').date()
+    except ValueError: abort(404)
+    if not date.min.year < dia.year < date.max.year: abort(404)  # os links de anterior/seguinte precisam existir
+    return periodo(tipo, dia)
+
+def montar_visao(conn, tipo, chave, inicio, fim):
+    """(JSON do período, etag); as linhas vêm de um range scan no índice da data."""
+    tabela = VISOES_CALENDARIO[tipo].__table__
+    itens = [{nome: valor.isoformat() if isinstance(valor, date) else valor for nome, valor in linha.items()} for linha in
+             conn.execute(select(tabela).where(tabela.c.data >= inicio, tabela.c.data < fim).order_by(tabela.c.data, tabela.c.id)).mappings()]
+    dados = json.dumps({'tipo': tipo, 'chave': chave, 'inicio': inicio.isoformat(), 'fim': (fim - timedelta(days=1)).isoformat(), 'itens': itens},
+                       ensure_ascii=False, sort_keys=True)
+    return dados, hashlib.sha256(dados.encode()).hexdigest()[:16], bool(itens)
+
+def materializar_visoes(conn, periodos):
+    """Remonta as visões dos períodos {(tipo, dia)}; grava só as que mudaram e apaga as que ficaram vazias."""
+    vc, alteradas = VisaoCalendario.__table__.c, 0
+    for tipo, chave, inicio, fim in sorted({(tipo, *periodo(tipo, dia)) for tipo, dia in periodos}):
+        dados, etag, tem_itens = montar_visao(conn, tipo, chave, inicio, fim)
+        atual = conn.execute(select(vc.etag).where(vc.tipo == tipo, vc.chave == chave)).scalar()
+        if not tem_itens:
+            if atual is not None: conn.execute(delete(VisaoCalendario.__table__).where(vc.tipo == tipo, vc.chave == chave))
+        elif atual != etag:
+            upsert(conn, VisaoCalendario.__table__, ('tipo', 'chave'), [{'tipo': tipo, 'chave': chave, 'inicio': inicio, 'dados': dados, 'etag': etag,
+                                                                         'atualizado_em': datetime.now(timezone.utc)}])
+        else: continue
+        alteradas += 1
+    return alteradas
+
+def visao_calendario(tipo, chave, inicio, fim):
+    """A visão gravada do período; se não houver, monta na hora (e grava, se tiver dados)."""
+    visao = db.session.get(VisaoCalendario, (tipo, chave))
+    if visao is not None: return visao
+    with db.engine.connect() as conn: dados, etag, tem_itens = montar_visao(conn, tipo, chave, inicio, fim)
+    if tem_itens: escrever(materializar_visoes, {(tipo, inicio)})
+    return VisaoCalendario(tipo=tipo, chave=chave, inicio=inicio, dados=dados, etag=etag, atualizado_em=None)
+
+@event.listens_for(Session, 'after_flush')
+def atualizar_visoes(session, contexto):
+    pendentes = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        tipo = VISOES_POR_MODELO.get(type(obj))
+        if tipo is None: continue
+        # A data antiga também: mudar um item de semana refaz as duas.
+        pendentes.update((tipo, dia) for dia in (obj.data, *inspect(obj).attrs.data.history.deleted) if dia is not None)
+    if pendentes:
+        escrita_derivada(session, 'Visões do calendário não atualizadas; rode "flask calendario-materializar".', materializar_visoes, pendentes)
+
+def rematerializar_visoes():
+    """Apaga e refaz todas as visões a partir das tabelas de origem; retorna quantas foram gravadas."""
+    with db.engine.begin() as conn:
+        conn.execute(delete(VisaoCalendario.__table__))
+        periodos = {(tipo, dia) for tipo, modelo in VISOES_CALENDARIO.items() for dia in conn.execute(select(modelo.data).distinct()).scalars()}
+        return materializar_visoes(conn, periodos)
+
+def texto_ics(valor):
+    return str(valor).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+def linha_ics(linha):
+    # RFC 5545: linhas de até 75 octetos, continuadas com um espaço no início.
+    bruto, partes = linha.encode(), []
+    while len(bruto) > 75:
+        corte = 75 if not partes else 74
+        while corte and (bruto[corte] & 0xC0) == 0x80: corte -= 1  # não parte um caractere UTF-8 no meio
+        partes.append(bruto[:corte].decode()); bruto = bruto[corte:]
+    partes.append(bruto.decode())
+    return '\r\n '.join(partes)
+
+def eventos_ics(tipo, dados, carimbo):
+    for item in dados['itens']:
+        dia = date.fromisoformat(item['data'])
+        if tipo == 'semana':
+            uid, resumo = f"cardapio-{item['data']}", f"RU: {item['prato_principal']}"
+            descricao = (f"Vegetariano: {item['vegetariano']}\nAcompanhamento: {item['acompanhamento']}\n"
+                         f"Salada: {item['salada']}\nSobremesa: {item['sobremesa']}")
+        else: uid, resumo, descricao = f"calendario-{item['id']}", item['descricao'], item['tipo']
+        yield from ('BEGIN:VEVENT', f'UID:{uid}@hub-comunitario', f'DTSTAMP:{carimbo:%Y%m%dT%H%M%SZ}', f'DTSTART;VALUE=DATE:{dia:%Y%m%d}',
+                    f'DTEND;VALUE=DATE:{dia + timedelta(days=1):%Y%m%d}', f'SUMMARY:{texto_ics(resumo)}', f'DESCRIPTION:{texto_ics(descricao)}', 'END:VEVENT')
+
+def resposta_condicional(corpo, mimetype, etag, modificado_em):
+    resposta = Response(corpo, mimetype=mimetype)
+    resposta.set_etag(etag)
+    if modificado_em is not None: resposta.last_modified = modificado_em.replace(tzinfo=timezone.utc)
+    resposta.cache_control.public = True
+    resposta.cache_control.max_age = current_app.config['CALENDARIO_FEED_MAX_AGE']
+    return resposta.make_conditional(request)
+
+def feed_calendario(tipo, formato, chave, nome):
+    if formato == 'json':
+        chave, inicio, fim = periodo_pedido(tipo, chave)
+        visao = visao_calendario(tipo, chave, inicio, fim)
+        return resposta_condicional(visao.dados, 'application/json', visao.etag, visao.atualizado_em)
+    if formato != 'ics': abort(404)
+    # Uma consulta pelo intervalo (tipo, inicio) cobre a janela inteira.
+    antes, depois = JANELA_ICS[tipo]
+    atual = periodo(tipo, date.today())[1]
+    primeiro, ultimo = deslocar_periodo(tipo, atual, -antes), deslocar_periodo(tipo, atual, depois + 1)
+    visoes = VisaoCalendario.query.filter(VisaoCalendario.tipo == tipo, VisaoCalendario.inicio >= primeiro, VisaoCalendario.inicio < ultimo) \
+        .order_by(VisaoCalendario.inicio).all()
+    modificado_em = max((v.atualizado_em for v in visoes), default=None)
+    etag = hashlib.sha256(':'.join([primeiro.isoformat(), *(v.etag for v in visoes)]).encode()).hexdigest()[:16]
+    linhas = ['BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//Hub Comunitario//Calendario//PT-BR', 'CALSCALE:GREGORIAN', f'X-WR-CALNAME:{texto_ics(nome)}']
+    for visao in visoes: linhas += eventos_ics(tipo, json.loads(visao.dados), visao.atualizado_em)
+    linhas.append('END:VCALENDAR')
+    return resposta_condicional(''.join(linha_ics(l) + '\r\n' for l in linhas), 'text/calendar', etag, modificado_em)
+
+@bp.cli.command('calendario-materializar')
+def calendario_materializar_command():
+    """Refaz as visões por semana (cardápio) e por mês (calendário acadêmico) a partir das tabelas."""
+    print(f"{rematerializar_visoes()} visões gravadas.")